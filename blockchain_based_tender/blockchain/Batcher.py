@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import Future
+from time import monotonic
+
+from .Merkle import hash_leaf, merkle_proof, merkle_root
+
+# `action` of a block that seals a batch of events
+BATCH_ACTION = 'Event Batch'
+
+
+def is_batch_block(block):
+    return is_batch_data(block.data)
+
+
+def is_batch_data(data):
+    return isinstance(data, dict) and data.get('action') == BATCH_ACTION and 'events' in data
+
+
+def iter_block_events(block):
+    """
+    Yields (event_index, event) for every event recorded in a block: each
+    event of a batch block, or the block's own data otherwise.
+    """
+    return iter_data_events(block.data)
+
+
+def iter_data_events(data):
+    """iter_block_events() for the `data` of a block."""
+    if is_batch_data(data):
+        yield from enumerate(data['events'])
+    else:
+        yield 0, data
+
+
+def build_receipt(block, event_index, leaves=None):
+    """
+    Reference proving that event `event_index` is included in `block`:
+    the block's position and hash plus the Merkle path from the event to the
+    block's merkle_root (empty for single-event blocks).
+    """
+    receipt = {
+        'block_index': block.index,
+        'block_hash': block.hash,
+        'event_index': event_index,
+        'merkle_root': None,
+        'merkle_proof': [],
+    }
+    if is_batch_block(block):
+        if leaves is None:
+            leaves = [hash_leaf(event) for event in block.data['events']]
+        receipt['merkle_root'] = block.data['merkle_root']
+        receipt['merkle_proof'] = merkle_proof(leaves, event_index)
+    return receipt
+
+
+class EventBatcher:
+    """
+    Group commit for a Blockchain. Events submitted within `window` seconds
+    of the first pending one (or until `max_events` are waiting) are sealed
+    by a background thread into a single block:
+
+        {'action': 'Event Batch', 'merkle_root': ..., 'events': [...]}
+
+    submit() returns a Future that resolves to the event's receipt (see
+    build_receipt), so one block is mined per batch instead of per event.
+    """
+    def __init__(self, blockchain, window=0.05, max_events=100):
+        self.blockchain = blockchain
+        self.window = window
+        self.max_events = max_events
+        self._condition = threading.Condition()
+        # Pending (event, future) pairs, oldest first
+        self._pending = []
+        self._deadline = None
+        self._thread = None
+
+    def submit(self, data):
+        future = Future()
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chain-batcher', daemon=True)
+                self._thread.start()
+            if not self._pending:
+                self._deadline = monotonic() + self.window
+            self._pending.append((data, future))
+            # Wake the sealer to start the window, or to seal a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.max_events:
+                self._condition.notify()
+        return future
+
+    def flush(self):
+        """
+        Seals whatever is pending now instead of waiting for the window to end.
+        """
+        with self._condition:
+            self._deadline = monotonic()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                while len(self._pending) < self.max_events:
+                    remaining = self._deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_events]
+                del self._pending[:self.max_events]
+            try:
+                self._seal(batch)
+            except Exception as exc:
+                # The batch fails as a whole; the thread goes on with the next one
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _seal(self, batch):
+        events = [data for data, _ in batch]
+        leaves = [hash_leaf(event) for event in events]
+        block = self.blockchain.add_block({
+            'action': BATCH_ACTION,
+            'merkle_root': merkle_root(leaves),
+            'events': events,
+        })
+        # Every receipt is built before any future resolves
+        receipts = [build_receipt(block, event_index, leaves) for event_index in range(len(batch))]
+        for (_, future), receipt in zip(batch, receipts):
+            future.set_result(receipt)
@@ -1,5 +1,6 @@
 import hashlib
 import json
+from itertools import count
 from time import time
 from datetime import datetime
 from django.utils import timezone
@@ -36,12 +37,117 @@ def serialize_model_data(instance, fields_to_include):
     return data
 
 
+def compute_block_hash(index, timestamp, data, previous_hash, nonce):
+    """
+    SHA-256 over the canonical JSON form of the block fields.
+    """
+    block_string = json.dumps({
+        'index': index,
+        'timestamp': timestamp,
+        'data': data,
+        'previous_hash': previous_hash,
+        'nonce': nonce
+    }, sort_keys=True).encode()
+    return hashlib.sha256(block_string).hexdigest()
+
+
+# json.dumps(..., sort_keys=True) builds a new encoder on every call
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True)
+
+
+def canonical_payload(data):
+    """
+    The bytes `data` takes inside the canonical JSON of compute_block_hash.
+    """
+    return _CANONICAL_ENCODER.encode(data).encode()
+
+
+def hash_template(index, timestamp, data, previous_hash):
+    """
+    Splits the canonical JSON used by compute_block_hash into the bytes before
+    and after the nonce digits. With sort_keys the fields are ordered
+    data, index, nonce, previous_hash, timestamp, so
+    prefix + str(nonce) + suffix is byte-for-byte the same string.
+    """
+    return canonical_hash_template(index, timestamp, canonical_payload(data), previous_hash)
+
+
+def canonical_hash_template(index, timestamp, payload, previous_hash):
+    """
+    hash_template() for a payload already encoded by canonical_payload().
+    """
+    prefix = b'{"data": ' + payload + b', "index": ' + json_scalar(index) + b', "nonce": '
+    suffix = b', "previous_hash": ' + json_scalar(previous_hash) + b', "timestamp": ' + json_scalar(timestamp) + b'}'
+    return prefix, suffix
+
+
+def json_scalar(value):
+    """
+    json.dumps(value).encode(), without the encoder's overhead for the
+    usual block fields (ints, finite floats, hex strings).
+    """
+    kind = type(value)
+    if kind is int:
+        return b'%d' % value
+    if kind is float and value - value == 0:
+        # Same as json: repr for finite numbers
+        return repr(value).encode()
+    if kind is str and value.isascii() and value.isalnum():
+        return b'"' + value.encode() + b'"'
+    return json.dumps(value).encode()
+
+
+def difficulty_target(difficulty):
+    """
+    Returns the raw-digest bound for 'difficulty' leading hex zeros: a digest
+    qualifies iff it compares below this value (None means any digest does).
+    """
+    if difficulty <= 0:
+        return None
+    return (16 ** (64 - difficulty)).to_bytes(32, 'big')
+
+
+def find_nonce(prefix, suffix, difficulty, start=0, stop=None, stop_event=None, check_interval=1024):
+    """
+    Searches nonces from `start` (up to `stop`, or forever) using a SHA-256
+    state that has already absorbed `prefix`. Returns (nonce, hex hash) for the
+    first qualifying nonce, or None if the range is exhausted or `stop_event`
+    gets set.
+    """
+    base = hashlib.sha256(prefix)
+    target = difficulty_target(difficulty)
+    nonces = count(start) if stop is None else range(start, stop)
+    for nonce in nonces:
+        if stop_event is not None and nonce % check_interval == 0 and stop_event.is_set():
+            return None
+        state = base.copy()
+        state.update(b'%d' % nonce + suffix)
+        digest = state.digest()
+        if target is None or digest < target:
+            return nonce, digest.hex()
+    return None
+
+
+# Marks a Block whose `data` has not been decoded from its payload yet
+_UNDECODED = object()
+
+
 class Block:
     """
     Represents a single block in the chain. 
     Each block stores data (e.g., a Tender or a Bid), a timestamp, 
     a link to the previous block, and its own cryptographic hash.
+
+    Blocks compare equal when all their fields are equal, so a block read
+    back from a chain (see Columnar.ColumnarBlockList) equals the one stored.
+
+    The canonical encoding of `data` (canonical_payload) is computed once and
+    shared by calculate_hash(), mining and to_json(); assigning `data` drops
+    it. Treat `data` as immutable: changes made inside it are not noticed.
     """
+    __slots__ = ('index', 'timestamp', '_data', 'previous_hash', 'nonce', 'hash', '_payload')
+    FIELDS = ('index', 'timestamp', 'data', 'previous_hash', 'nonce', 'hash')
+
     def __init__(self, index, timestamp, data, previous_hash=''):
         self.index = index
         self.timestamp = timestamp or time()
@@ -51,28 +157,91 @@ class Block:
         self.nonce = 0 # Nonce for proof-of-work (simplified)
         self.hash = self.calculate_hash()
 
+    @classmethod
+    def from_dict(cls, block_data):
+        """
+        Rebuilds a stored block as-is. The stored hash is kept without being
+        recomputed; use Blockchain.verify() to check it.
+        """
+        block = cls.__new__(cls)
+        block.index = block_data['index']
+        block.timestamp = block_data['timestamp']
+        block.data = block_data['data']
+        block.previous_hash = block_data['previous_hash']
+        block.nonce = block_data['nonce']
+        block.hash = block_data['hash']
+        return block
+
+    @classmethod
+    def from_canonical(cls, index, timestamp, payload, previous_hash, nonce, block_hash):
+        """
+        Rebuilds a stored block from its canonical payload bytes. `data` is
+        decoded from them only when first read.
+        """
+        block = cls.__new__(cls)
+        block.index = index
+        block.timestamp = timestamp
+        block._data = _UNDECODED
+        block._payload = payload
+        block.previous_hash = previous_hash
+        block.nonce = nonce
+        block.hash = block_hash
+        return block
+
+    @property
+    def data(self):
+        data = self._data
+        if data is _UNDECODED:
+            data = self._data = json.loads(self._payload)
+        return data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._payload = None
+
+    @property
+    def canonical_data(self):
+        """The canonical encoding of `data` (see canonical_payload), cached."""
+        payload = self._payload
+        if payload is None:
+            payload = self._payload = canonical_payload(self._data)
+        return payload
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    def __hash__(self):
+        return hash(self.hash)
+
     def calculate_hash(self):
         """
-        Creates a SHA-256 hash of the block's contents.
+        Creates a SHA-256 hash of the block's contents. Same result as
+        compute_block_hash, without serializing `data` again.
         """
-        block_string = json.dumps({
-            'index': self.index,
-            'timestamp': self.timestamp,
-            'data': self.data,
-            'previous_hash': self.previous_hash,
-            'nonce': self.nonce
-        }, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        prefix, suffix = self.mining_template()
+        return hashlib.sha256(prefix + json_scalar(self.nonce) + suffix).hexdigest()
 
-    def mine_block(self, difficulty):
+    def mining_template(self):
+        """hash_template() of this block, from the cached payload bytes."""
+        return canonical_hash_template(self.index, self.timestamp, self.canonical_data, self.previous_hash)
+
+    def mine_block(self, difficulty, miner=None):
         """
         A simplified Proof-of-Work algorithm. Finds a hash that starts 
         with 'difficulty' number of leading zeros.
+
+        If a Miner.ParallelMiner is given the nonce search is spread over its
+        process pool; the resulting nonce and hash are the same either way.
         """
-        target = '0' * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+        if self.hash[:difficulty] != '0' * difficulty:
+            if miner is not None:
+                self.nonce, self.hash = miner.mine(self, difficulty)
+            else:
+                prefix, suffix = self.mining_template()
+                self.nonce, self.hash = find_nonce(prefix, suffix, difficulty, self.nonce + 1)
         print(f"Block Mined! Hash: {self.hash}")
 
     def to_dict(self):
@@ -87,4 +256,18 @@ class Block:
             'nonce': self.nonce,
             'hash': self.hash
         }
+
+    def to_json(self):
+        """
+        to_dict() as JSON bytes, with `data` written from the cached
+        canonical payload instead of being serialized again.
+        """
+        return (
+            b'{"index": ' + json_scalar(self.index)
+            + b', "timestamp": "' + datetime.fromtimestamp(self.timestamp).isoformat().encode()
+            + b'", "data": ' + self.canonical_data
+            + b', "previous_hash": ' + json_scalar(self.previous_hash)
+            + b', "nonce": ' + json_scalar(self.nonce)
+            + b', "hash": ' + json_scalar(self.hash) + b'}'
+        )
     
\ No newline at end of file
@@ -1,28 +1,147 @@
 from .Block import Block
+from .Columnar import ColumnarBlockList
+from .Index import ChainIndex
+from .Proofs import HeaderTree
+from .Miner import get_miner
+from .Snapshot import (
+    SNAPSHOT_TAIL_BLOCKS, SNAPSHOT_VERSION, LazyBlockList,
+    read_snapshot_header, read_snapshot_index, snapshot_path, write_snapshot,
+)
+from .Storage import ChainStorageError, MemoryStorage, block_to_record, get_storage
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock
 from time import time
-import json
-import os
+
+def mine_genesis_block(difficulty, miner=None):
+    """
+    Mines the first block of a new chain. Every chain, whether held by a
+    Blockchain or stored as a tender's rows, starts with a block built here.
+    """
+    genesis_block = Block(0, time(), "Genesis Block", "0")
+    genesis_block.mine_block(difficulty, miner)
+    return genesis_block
+
+
+def find_invalid_block(chain, start=1):
+    """
+    Checks blocks chain[start:] against their contents and predecessors.
+    Returns (index, reason) for the first bad block, or None.
+    """
+    start = max(start, 1)
+    if start >= len(chain):
+        return None
+    # Each block is read once (reading from a ColumnarBlockList builds it)
+    previous_block = chain[start - 1]
+    for i in range(start, len(chain)):
+        current_block = chain[i]
+
+        # 1. Check if the block's hash is correct (re-calculating the hash)
+        if current_block.hash != current_block.calculate_hash():
+            return i, "stored hash does not match block contents"
+
+        # 2. Check if it links to the correct previous block
+        if current_block.previous_hash != previous_block.hash:
+            return i, "previous_hash does not match the preceding block"
+
+        previous_block = current_block
+
+    return None
+
+
+class ChainValidationResult:
+    """
+    Outcome of Blockchain.validate(). Truthy when the chain is valid;
+    otherwise `failed_index` and `reason` say which block failed and why.
+    `checked` is the number of blocks verified in this pass.
+    """
+    def __init__(self, valid, failed_index, reason, checked):
+        self.valid = valid
+        self.failed_index = failed_index
+        self.reason = reason
+        self.checked = checked
+
+    def __bool__(self):
+        return self.valid
+
+    def __str__(self):
+        if self.valid:
+            return f"valid ({self.checked} blocks checked)"
+        return f"block {self.failed_index}: {self.reason}"
+
+    def to_dict(self):
+        return {
+            'valid': self.valid,
+            'failed_index': self.failed_index,
+            'reason': self.reason,
+            'checked': self.checked
+        }
+
 
 class Blockchain:
     """
     Manages the chain of blocks. Stores the chain in a simple JSON file for persistence.
+
+    storage='json' rewrites the whole JSON array on every save; storage='log'
+    keeps an append-only log (see Storage.AppendLogStorage) where adding a
+    block costs one record write, flushed according to `fsync`;
+    storage='binary' is the same log in the compact binary format of
+    Encoding.py (see Storage.BinaryLogStorage); storage='memory' never
+    touches the disk. Any backend object from Storage (e.g.
+    DatabaseStorage) can also be passed directly.
+
+    mining_workers > 1 mines blocks on a shared process pool of that size.
+
+    Stored blocks are loaded as trusted (hashes are not recomputed). `verify`
+    chooses when they are checked: None leaves it to the caller (see verify()),
+    'sync' checks before the constructor returns, 'deferred' starts the check
+    in the background and keeps its Future in `self.verification`.
+
+    Several processes may share one chain file (e.g. gunicorn workers):
+    add_block() takes the storage's exclusive lock and first picks up blocks
+    appended by the others (see refresh()), so the chain never forks.
+
+    Blocks are indexed by hash, tender_id, action and timestamp as they are
+    loaded or appended (see Index.ChainIndex); get_block_by_hash(),
+    get_blocks_for_tender(), get_blocks_by_action() and get_blocks_between()
+    answer from those indexes instead of scanning `chain`.
+
+    With `snapshot_interval` set (and a storage that can resume, i.e. 'log',
+    'binary' or the database), a snapshot is written every that many blocks and the
+    constructor starts from the latest one, replaying only the blocks
+    appended after it (see Snapshot.py). `chain` is then a LazyBlockList
+    that reads the older blocks on first use.
+
+    The blocks are held in a Columnar.ColumnarBlockList rather than a list
+    of Block objects: reading `chain[i]` builds the Block on demand.
     """
-    def __init__(self, chain_file='blockchain_data.json', difficulty=2, genesis_data=None):
-        self.chain = []
+    def __init__(self, chain_file='blockchain_data.json', difficulty=2, genesis_data=None,
+                 storage='json', fsync='always', mining_workers=1, verify=None, snapshot_interval=None):
+        self.chain = ColumnarBlockList()
         
 
         self.difficulty = difficulty
         self.chain_file = chain_file
+        self.storage = get_storage(storage, chain_file, fsync=fsync)
+        self.miner = get_miner(mining_workers)
+        self.verification = None
+        # Serializes writers within this process; storage.lock() covers other processes
+        self._write_lock = RLock()
+        self.index = ChainIndex()
+        # Built on the first proof request (see Proofs.HeaderTree)
+        self.header_tree = HeaderTree()
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_file = None
+        if snapshot_interval and hasattr(self.storage, 'resume'):
+            self.snapshot_file = snapshot_path(chain_file)
 
         self.load_chain()
+        self._apply_verify_mode(verify)
 
     def create_genesis_block(self):
         """
         The first block in the chain.
         """
-        genesis_block = Block(0, time(), "Genesis Block", "0")
-        genesis_block.mine_block(self.difficulty)
-        self.chain.append(genesis_block)
+        self.chain.append(mine_genesis_block(self.difficulty, self.miner))
 
     def get_latest_block(self):
         """
@@ -36,119 +155,319 @@ class Blockchain:
         """
         Creates a new block, mines it, and adds it to the chain.
         """
-        latest_block = self.get_latest_block()
-        new_index = 0
-        previous_hash = '0'
-        
-        if latest_block:
-            new_index = latest_block.index + 1
-            previous_hash = latest_block.hash
-
-        new_block = Block(new_index, time(), new_data, previous_hash)
-        new_block.mine_block(self.difficulty)
-        self.chain.append(new_block)
-        self.save_chain()
+        snapshot = None
+        with self._write_lock, self.storage.lock():
+            # Build on the real tail, which another process may have moved
+            self.refresh()
+            latest_block = self.get_latest_block()
+            new_index = 0
+            previous_hash = '0'
+            
+            if latest_block:
+                new_index = latest_block.index + 1
+                previous_hash = latest_block.hash
+
+            new_block = Block(new_index, time(), new_data, previous_hash)
+            new_block.mine_block(self.difficulty, self.miner)
+            self.chain.append(new_block)
+            self.storage.append(self, new_block)
+            self.index.sync(self.chain)
+            if self.snapshot_file and self.storage.record_count % self.snapshot_interval == 0:
+                snapshot = self._snapshot_data()
+        # The snapshot file is written once the storage lock is released
+        if snapshot:
+            write_snapshot(self.snapshot_file, *snapshot)
         return new_block
 
+    def refresh(self):
+        """
+        Appends the blocks other processes have stored since this instance
+        last read or wrote the storage; only the new tail is read. Returns
+        the number of blocks picked up.
+        """
+        with self._write_lock:
+            known = self.storage.record_count
+            records = self.storage.load_new()
+            if not records and records is not None:
+                return 0
+
+            # Blocks not yet persisted (a fresh genesis) are dropped in favour of the stored ones
+            persisted = self.chain[:known]
+            if records is None or (persisted and records[0]['previous_hash'] != persisted[-1].hash):
+                # The storage was rewritten: load it again from the start
+                self._set_loaded_records(self.storage.load())
+                return max(len(self.chain) - len(persisted), 0)
+            new_blocks = ColumnarBlockList.from_records(records)
+
+            self.chain = persisted + new_blocks
+            self.index.sync(self.chain)
+            return len(new_blocks)
+
     def is_chain_valid(self):
         """
         Verifies the integrity of the entire chain by checking hash links.
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
+        return self.validate(full=True).valid
 
-            # 1. Check if the block's hash is correct (re-calculating the hash)
-            if current_block.hash != current_block.calculate_hash():
-                return False
+    def validate(self, full=False):
+        """
+        Checks stored hashes and links and returns a ChainValidationResult
+        naming the first bad block and the reason.
 
-            # 2. Check if it links to the correct previous block
-            if current_block.previous_hash != previous_block.hash:
-                return False
+        By default only blocks after the persisted validation checkpoint are
+        checked, and the checkpoint is moved forward on success. full=True
+        re-verifies every block (for audits) and also refreshes the checkpoint.
+        """
+        # The list object is only ever appended to; refresh() replaces it instead
+        chain = self.chain
+        start = 1
+        checkpoint = None if full else self.storage.load_checkpoint()
+        if checkpoint:
+            checkpoint_index, checkpoint_hash = checkpoint
+            if checkpoint_index >= len(chain) or chain[checkpoint_index].hash != checkpoint_hash:
+                return ChainValidationResult(False, checkpoint_index, "block no longer matches the validation checkpoint", 0)
+            start = checkpoint_index + 1
 
-        return True
+        failure = find_invalid_block(chain, start)
+        if failure:
+            failed_index, reason = failure
+            return ChainValidationResult(False, failed_index, reason, failed_index - start)
+
+        # Only blocks that are already persisted can become the checkpoint
+        last_index = min(len(chain), self.storage.record_count) - 1
+        if last_index > 0 and (checkpoint is None or last_index > checkpoint[0]):
+            self.storage.save_checkpoint(last_index, chain[last_index].hash)
+
+        return ChainValidationResult(True, None, None, max(len(chain) - start, 0))
+
+    def verify(self, deferred=False):
+        """
+        Runs validate() over the loaded blocks. With deferred=True the
+        check runs on a background thread and a concurrent.futures.Future
+        resolving to the result is returned instead.
+        """
+        if deferred:
+            return _get_verification_executor().submit(self.validate)
+        return self.validate()
+
+    def _apply_verify_mode(self, verify):
+        if verify is None:
+            return
+        if verify == 'sync':
+            result = self.verify()
+            if not result:
+                raise ValueError(f"Blockchain in {self.chain_file} failed verification: {result}")
+        elif verify == 'deferred':
+            self.verification = self.verify(deferred=True)
+        else:
+            raise ValueError(f"Unknown verify mode: {verify!r}")
 
     def save_chain(self):
         """
-        Saves the chain to a JSON file.
-        """
-        serializable_chain = []
-        for block in self.chain:
-            serializable_chain.append({
-                'index': block.index,
-                'timestamp': block.timestamp,
-                'data': block.data,
-                'previous_hash': block.previous_hash,
-                'hash': block.hash,
-                'nonce': block.nonce
-            })
-        
-        with open(self.chain_file, 'w') as f:
-            json.dump(serializable_chain, f, indent=4)
+        Saves the whole chain to the storage file.
+        """
+        with self._write_lock, self.storage.lock():
+            self.storage.save(self.to_list_of_dicts())
 
     def load_chain(self):
         """
-        Loads the chain from the JSON file. Creates Genesis block if file not found.
+        Loads the chain from the storage file. Creates Genesis block if file not found.
         """
-        if os.path.exists(self.chain_file) and os.path.getsize(self.chain_file) > 0:
+        if self._resume_from_snapshot():
+            return
+        if self.storage.exists():
             try:
-                with open(self.chain_file, 'r') as f:
-                    raw_chain = json.load(f)
-                
-                self.chain = []
-                for block_data in raw_chain:
-                    block = Block(
-                        block_data['index'], 
-                        block_data['timestamp'], 
-                        block_data['data'], 
-                        block_data['previous_hash']
-                    )
-                    block.hash = block_data['hash']
-                    block.nonce = block_data['nonce']
-                    self.chain.append(block)
+                self._set_loaded_records(self.storage.load())
                 print(f"Blockchain loaded with {len(self.chain)} blocks.")
                 
-            except (json.JSONDecodeError, KeyError, IndexError):
+            except (ValueError, KeyError, IndexError):
                 print("Error loading chain. Creating new Genesis block.")
                 self.create_genesis_block()
         else:
             print("No blockchain data found. Creating Genesis block.")
             self.create_genesis_block()
+        self.index.sync(self.chain)
+
+    def _set_loaded_records(self, records):
+        # Stored records go straight into the columns and the index, without a Block each
+        self.chain = ColumnarBlockList.from_records(records)
+        self.index.rebuild(records)
+
+    def get_block_by_hash(self, block_hash):
+        """
+        Returns the block with the given hash, or None. O(1).
+        """
+        blocks = self._blocks_at([self._synced_index().position_of_hash(block_hash)])
+        return blocks[0] if blocks else None
+
+    def get_blocks_for_tender(self, tender_id):
+        """
+        Returns the blocks recording events of a tender (by the events'
+        tender_id, batch blocks included), in chain order.
+        """
+        return self._blocks_at(self._synced_index().positions_for_tender(tender_id))
+
+    def get_blocks_by_action(self, action):
+        """
+        Returns the blocks recording the given action, in chain order.
+        """
+        return self._blocks_at(self._synced_index().positions_for_action(action))
+
+    def get_blocks_between(self, start=None, end=None):
+        """
+        Returns the blocks with start <= timestamp < end (seconds, as in
+        Block.timestamp; None leaves that side open), in time order. O(log n)
+        plus the number of blocks returned.
+        """
+        return self._blocks_at(self._synced_index().positions_between(start, end))
+
+    def get_proof_root(self):
+        """
+        Returns {'chain_length', 'chain_root'}: the Merkle root over the
+        block headers that inclusion proofs are checked against.
+        """
+        length, root = self.header_tree.head(self.chain)
+        return {'chain_length': length, 'chain_root': root}
+
+    def get_inclusion_proof(self, block_hash, event_index=0):
+        """
+        Returns a compact proof that event `event_index` of the block with
+        the given hash is in this chain (see Proofs.verify_inclusion_proof),
+        or None if there is no such block.
+        """
+        block = self.get_block_by_hash(block_hash)
+        if block is None:
+            return None
+        return self.header_tree.build_proof(self.chain, block.index, event_index)
+
+    def _synced_index(self):
+        # Picks up blocks added to `chain` by any path since the last sync
+        self.index.sync(self.chain, load=True)
+        return self.index
+
+    def _blocks_at(self, positions):
+        chain = self.chain
+        return [chain[position] for position in positions if position is not None and position < len(chain)]
+
+    def write_snapshot(self):
+        """
+        Writes a snapshot of the stored chain now (see Snapshot.py). Returns
+        the number of blocks it covers, or 0 if snapshots are not enabled.
+        """
+        if not self.snapshot_file:
+            return 0
+        with self._write_lock, self.storage.lock():
+            self.refresh()
+            snapshot = self._snapshot_data()
+        if not snapshot:
+            return 0
+        write_snapshot(self.snapshot_file, *snapshot)
+        return snapshot[0]['block_count']
+
+    def _snapshot_data(self):
+        """
+        (header, index state) of a snapshot of the stored blocks, or None if
+        blocks not yet in the storage are held in memory. Called with the
+        storage lock held, so the storage position matches the head.
+        """
+        chain = self.chain
+        count = self.storage.record_count
+        if not count or len(chain) != count:
+            return None
+        self.index.sync(chain, load=True)
+        index_state = self.index.to_state()
+        if index_state is None:
+            return None
+        checkpoint = self.storage.load_checkpoint()
+        header = {
+            'version': SNAPSHOT_VERSION,
+            'block_count': count,
+            'head_hash': chain[count - 1].hash,
+            'storage': self.storage.snapshot_state(),
+            'checkpoint': list(checkpoint) if checkpoint else None,
+            'tail': [block_to_record(block) for block in chain[max(0, count - SNAPSHOT_TAIL_BLOCKS):count]],
+        }
+        return header, index_state
+
+    def _resume_from_snapshot(self):
+        """
+        Starts from the latest snapshot if the storage still matches it.
+        """
+        if not self.snapshot_file:
+            return False
+        header = read_snapshot_header(self.snapshot_file)
+        if header is None or not self.storage.resume(header['storage'], header['block_count'], header['head_hash']):
+            return False
+
+        tail = ColumnarBlockList.from_records(header['tail'])
+        count = header['block_count']
+        self.chain = LazyBlockList(count - len(tail), self._prefix_loader(tail[0].previous_hash), tail)
+        snapshot_file, head_hash = self.snapshot_file, header['head_hash']
+        self.index.restore(lambda: read_snapshot_index(snapshot_file, head_hash), count, tail[-1])
+        if header.get('checkpoint') and self.storage.load_checkpoint() is None:
+            self.storage.save_checkpoint(*header['checkpoint'])
+
+        replayed = self.refresh()
+        print(f"Blockchain resumed from snapshot at block {count}, {replayed} newer blocks replayed.")
+        return True
+
+    def _prefix_loader(self, expected_hash):
+        def load_prefix(count):
+            blocks = ColumnarBlockList.from_records(self.storage.read_prefix(count))
+            if blocks and blocks[-1].hash != expected_hash:
+                raise ChainStorageError(f"Stored blocks before the snapshot of {self.chain_file} do not match it")
+            return blocks
+        return load_prefix
 
     def to_list_of_dicts(self):
         """
         Returns the chain as a list of dictionaries.
         """
-        serializable_chain = []
-        for block in self.chain:
-            serializable_chain.append({
-                'index': block.index,
-                'timestamp': block.timestamp,
-                'data': block.data,
-                'previous_hash': block.previous_hash,
-                'hash': block.hash,
-                'nonce': block.nonce
-            })
-        return serializable_chain
+        chain = self.chain
+        if isinstance(chain, ColumnarBlockList):
+            return chain.to_records()
+        return [block_to_record(block) for block in chain]
     
     @classmethod
-    def load_from_list_of_dicts(cls, chain_list, chain_file='blockchain_data.json', difficulty=2):
+    def load_from_list_of_dicts(cls, chain_list, chain_file='blockchain_data.json', difficulty=2, verify=None):
         """
         Creates a Blockchain instance from a list of block dictionaries.
+        The chain lives in memory (nothing is read from or written to
+        `chain_file`). Blocks are trusted as stored; `verify` works as in
+        the constructor.
         """
-        blockchain = cls(chain_file=chain_file, difficulty=difficulty)
-        blockchain.chain = []
-        for block_data in chain_list:
-            block = Block(
-                block_data['index'],
-                block_data['timestamp'],
-                block_data['data'],
-                block_data['previous_hash']
-            )
-            block.hash = block_data['hash']
-            block.nonce = block_data['nonce']
-            blockchain.chain.append(block)
-        return blockchain
-
-# Global instance of the Blockchain for easy access across the Django app
-tender_blockchain = Blockchain(chain_file='tender_blockchain.json', difficulty=4)
+        return cls(chain_file=chain_file, difficulty=difficulty,
+                   storage=MemoryStorage(chain_list), verify=verify)
+
+
+_verification_executor = None
+_verification_executor_lock = Lock()
+
+
+def _get_verification_executor():
+    global _verification_executor
+    with _verification_executor_lock:
+        if _verification_executor is None:
+            _verification_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chain-verify')
+        return _verification_executor
+
+# Global instance of the Blockchain for easy access across the Django app.
+# Created by get_tender_blockchain() on first use: importing this module must not
+# read tender_blockchain.json or mine its genesis block.
+tender_blockchain = None
+_tender_blockchain_lock = Lock()
+
+
+def get_tender_blockchain():
+    """
+    Returns the shared tender_blockchain, loading it on the first call.
+    Safe to call from several threads at once.
+    """
+    global tender_blockchain
+    chain = tender_blockchain
+    if chain is not None:
+        return chain
+    with _tender_blockchain_lock:
+        if tender_blockchain is None:
+            tender_blockchain = Blockchain(chain_file='tender_blockchain.json', difficulty=4)
+        return tender_blockchain
@@ -0,0 +1,267 @@
+"""
+Compact in-memory store for the blocks of a chain.
+
+Instead of one Block object (plus its payload dict) per block,
+ColumnarBlockList keeps every field in a column:
+
+    index, nonce      array('q')
+    timestamp         array('d')
+    hash, prev. hash  32 raw bytes per block in a bytearray
+    data              the canonical payload (Block.canonical_data) of every
+                      block in one bytearray, with the end offset of each
+                      in array('Q')
+
+Values a column cannot hold exactly (the genesis "0" previous_hash, an int
+timestamp, ...) are kept as they are in a small per-position dict. Block
+objects are only built when a block is read, and compare equal to the block
+that was stored, so the list can stand in for a list of Blocks. They carry
+the stored payload bytes, so hashing them needs no JSON at all and `data`
+is decoded only if it is read.
+"""
+import json
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+from threading import Lock
+
+from .Block import Block, canonical_payload
+from .Encoding import raw_hash
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_NO_HASH = bytes(32)
+
+
+class ColumnarBlockList(Sequence):
+    """
+    A chain's blocks in columns. Supports what Blockchain and its callers do
+    with `chain`: len(), indexing, slicing (a contiguous slice is again a
+    ColumnarBlockList), iteration, append(), extend() and `+`.
+
+    Appends are not locked against readers: every column gets the new block
+    before the payload offset that makes it count in len(), so a reader
+    never sees half a block.
+    """
+    def __init__(self, blocks=()):
+        self._indices = array('q')
+        self._nonces = array('q')
+        self._timestamps = array('d')
+        self._hashes = bytearray()
+        self._previous_hashes = bytearray()
+        self._payloads = bytearray()
+        self._payload_ends = array('Q')
+        # position -> {field: value} for values kept outside the columns
+        self._special = {}
+        self._lock = Lock()
+        self.extend(blocks)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds the list from stored block records (see Storage.block_to_record).
+        Each column is filled in one pass over all the records; only the
+        payloads are encoded one by one.
+        """
+        blocks = cls()
+        with blocks._lock:
+            blocks._extend_records(records)
+        return blocks
+
+    def __len__(self):
+        return len(self._payload_ends)
+
+    def _append_fields(self, index, timestamp, payload, previous_hash, block_hash, nonce):
+        position = len(self._payload_ends)
+        special = {}
+        for field, value, column in (('index', index, self._indices), ('nonce', nonce, self._nonces)):
+            if type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+                column.append(value)
+            else:
+                column.append(0)
+                special[field] = value
+        if type(timestamp) is float:
+            self._timestamps.append(timestamp)
+        else:
+            self._timestamps.append(0.0)
+            special['timestamp'] = timestamp
+        for field, value, column in (('previous_hash', previous_hash, self._previous_hashes),
+                                     ('hash', block_hash, self._hashes)):
+            raw = raw_hash(value)
+            if raw is None:
+                column += _NO_HASH
+                special[field] = value
+            else:
+                column += raw
+        self._payloads += payload
+        if special:
+            self._special[position] = special
+        # Last: only now does len() count the block
+        self._payload_ends.append(len(self._payloads))
+
+    def _extend_records(self, records):
+        base = len(self._payload_ends)
+        special = {}
+
+        def keep_special(field, values, bad, placeholder):
+            for offset in bad:
+                special.setdefault(base + offset, {})[field] = values[offset]
+                values[offset] = placeholder
+
+        indices = [record['index'] for record in records]
+        nonces = [record['nonce'] for record in records]
+        for field, values in (('index', indices), ('nonce', nonces)):
+            keep_special(field, values, [
+                offset for offset, value in enumerate(values)
+                if type(value) is not int or not _INT64_MIN <= value <= _INT64_MAX
+            ], 0)
+        timestamps = [record['timestamp'] for record in records]
+        keep_special('timestamp', timestamps,
+                     [offset for offset, value in enumerate(timestamps) if type(value) is not float], 0.0)
+
+        raw_hashes = []
+        for field in ('previous_hash', 'hash'):
+            values = [record[field] for record in records]
+            keep_special(field, values, [
+                offset for offset, value in enumerate(values) if type(value) is not str or len(value) != 64
+            ], _NO_HASH.hex())
+            joined = ''.join(values)
+            try:
+                raw = bytes.fromhex(joined)
+            except ValueError:
+                raw = None
+            if raw is None or raw.hex() != joined:
+                # Some value is not lowercase hex: sort them out one by one
+                bad = [offset for offset, value in enumerate(values) if raw_hash(value) is None]
+                keep_special(field, values, bad, _NO_HASH.hex())
+                raw = bytes.fromhex(''.join(values))
+            raw_hashes.append(raw)
+
+        payloads = [canonical_payload(record['data']) for record in records]
+        ends = array('Q', accumulate(map(len, payloads), initial=len(self._payloads)))
+
+        self._indices += array('q', indices)
+        self._nonces += array('q', nonces)
+        self._timestamps += array('d', timestamps)
+        self._previous_hashes += raw_hashes[0]
+        self._hashes += raw_hashes[1]
+        self._payloads += b''.join(payloads)
+        self._special.update(special)
+        # Last: only now are the blocks counted by len()
+        self._payload_ends += ends[1:]
+
+    def append(self, block):
+        with self._lock:
+            self._append_fields(block.index, block.timestamp, block.canonical_data, block.previous_hash,
+                                block.hash, block.nonce)
+
+    def extend(self, blocks):
+        if isinstance(blocks, ColumnarBlockList):
+            blocks = blocks._copy(0, len(blocks))
+            with self._lock:
+                self._extend_columns(blocks)
+            return
+        for block in blocks:
+            self.append(block)
+
+    def _extend_columns(self, other):
+        base = len(self._payloads)
+        offset = len(self._payload_ends)
+        self._indices += other._indices
+        self._nonces += other._nonces
+        self._timestamps += other._timestamps
+        self._hashes += other._hashes
+        self._previous_hashes += other._previous_hashes
+        self._payloads += other._payloads
+        for position, special in other._special.items():
+            self._special[offset + position] = special
+        self._payload_ends += array('Q', [end + base for end in other._payload_ends])
+
+    def _block(self, position):
+        start = self._payload_ends[position - 1] if position else 0
+        block = Block.from_canonical(
+            self._indices[position],
+            self._timestamps[position],
+            bytes(self._payloads[start:self._payload_ends[position]]),
+            self._previous_hashes[32 * position:32 * position + 32].hex(),
+            self._nonces[position],
+            self._hashes[32 * position:32 * position + 32].hex(),
+        )
+        special = self._special.get(position)
+        if special:
+            for field, value in special.items():
+                setattr(block, field, value)
+        return block
+
+    def _copy(self, start, stop):
+        copy = ColumnarBlockList()
+        if stop <= start:
+            return copy
+        base = self._payload_ends[start - 1] if start else 0
+        copy._indices = self._indices[start:stop]
+        copy._nonces = self._nonces[start:stop]
+        copy._timestamps = self._timestamps[start:stop]
+        copy._hashes = self._hashes[32 * start:32 * stop]
+        copy._previous_hashes = self._previous_hashes[32 * start:32 * stop]
+        copy._payloads = self._payloads[base:self._payload_ends[stop - 1]]
+        copy._special = {
+            position - start: special for position, special in list(self._special.items())
+            if start <= position < stop
+        }
+        ends = self._payload_ends[start:stop]
+        # A leading slice (the usual one, see Blockchain.refresh) needs no shifting
+        copy._payload_ends = ends if not base else array('Q', [end - base for end in ends])
+        return copy
+
+    def __getitem__(self, key):
+        length = len(self._payload_ends)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(length)
+            if step == 1:
+                return self._copy(start, stop)
+            return [self._block(position) for position in range(start, stop, step)]
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError('block index out of range')
+        return self._block(key)
+
+    def __iter__(self):
+        for position in range(len(self._payload_ends)):
+            yield self._block(position)
+
+    def __add__(self, other):
+        combined = self._copy(0, len(self))
+        combined.extend(other)
+        return combined
+
+    def to_records(self):
+        """
+        The stored records (Storage.block_to_record) of every block, with all
+        payloads parsed by a single json.loads.
+        """
+        length = len(self._payload_ends)
+        ends = self._payload_ends[:length]
+        payloads = self._payloads[:ends[-1]] if length else b''
+        chunks = []
+        start = 0
+        for end in ends:
+            chunks.append(payloads[start:end])
+            start = end
+        data = json.loads(b'[' + b','.join(chunks) + b']')
+        hashes = self._hashes
+        previous_hashes = self._previous_hashes
+        records = [
+            {
+                'index': self._indices[position],
+                'timestamp': self._timestamps[position],
+                'data': data[position],
+                'previous_hash': previous_hashes[32 * position:32 * position + 32].hex(),
+                'hash': hashes[32 * position:32 * position + 32].hex(),
+                'nonce': self._nonces[position],
+            }
+            for position in range(length)
+        ]
+        for position, special in list(self._special.items()):
+            if position < length:
+                records[position].update(special)
+        return records
@@ -0,0 +1,288 @@
+"""
+Compact binary encoding of block records (format version 1).
+
+A binary chain file starts with FILE_HEADER (b'BCHN' and the version byte),
+followed by one frame per block:
+
+    varint body length | body | CRC-32 of the body (4 bytes, big-endian)
+
+and the body holds the record fields:
+
+    flags           1 byte, see FLAG_*
+    index           varint
+    timestamp       float64 (big-endian), or a zigzag varint if it was an int
+    nonce           varint
+    previous_hash   32 raw bytes, or varint length + UTF-8 if it is not 64 lowercase hex digits
+    hash            the same
+    data            varint length + canonical JSON (sorted keys, no spaces, UTF-8)
+
+Every field decodes to exactly the value that was encoded (an int timestamp
+stays an int, "0" stays "0"), so Block.calculate_hash() gives the same hash
+as for the JSON record.
+"""
+import json
+import struct
+import zlib
+
+MAGIC = b'BCHN'
+FORMAT_VERSION = 1
+FILE_HEADER = MAGIC + bytes([FORMAT_VERSION])
+
+FLAG_INT_TIMESTAMP = 0x01
+FLAG_RAW_PREVIOUS_HASH = 0x02
+FLAG_RAW_HASH = 0x04
+
+_FLOAT = struct.Struct('>d')
+_CRC = struct.Struct('>I')
+
+
+class IncompleteRecord(ValueError):
+    """The buffer ends inside a frame (e.g. a write still in progress or torn)."""
+
+
+class CorruptRecord(ValueError):
+    """A complete frame whose checksum or contents are wrong."""
+
+
+def encode_varint(value, out):
+    if value < 0:
+        raise ValueError(f"varint must not be negative: {value}")
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise IncompleteRecord("buffer ends inside a varint")
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def raw_hash(value):
+    # Only 64 lowercase hex digits survive bytes.fromhex(...).hex() unchanged
+    if isinstance(value, str) and len(value) == 64:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            return None
+        if raw.hex() == value:
+            return raw
+    return None
+
+
+def _encode_text(value, out):
+    encoded = value.encode('utf-8')
+    encode_varint(len(encoded), out)
+    out += encoded
+
+
+def encode_block_record(record):
+    """
+    Returns the frame for one block record (the dict stored by Storage).
+    """
+    body = bytearray(1)
+    flags = 0
+    encode_varint(record['index'], body)
+
+    timestamp = record['timestamp']
+    if isinstance(timestamp, int):
+        flags |= FLAG_INT_TIMESTAMP
+        # zigzag
+        encode_varint(timestamp * 2 if timestamp >= 0 else -timestamp * 2 - 1, body)
+    else:
+        body += _FLOAT.pack(timestamp)
+
+    encode_varint(record['nonce'], body)
+
+    for field, flag in (('previous_hash', FLAG_RAW_PREVIOUS_HASH), ('hash', FLAG_RAW_HASH)):
+        raw = raw_hash(record[field])
+        if raw is None:
+            _encode_text(record[field], body)
+        else:
+            flags |= flag
+            body += raw
+
+    _encode_text(json.dumps(record['data'], sort_keys=True, separators=(',', ':'), ensure_ascii=False), body)
+    body[0] = flags
+
+    frame = bytearray()
+    encode_varint(len(body), frame)
+    frame += body
+    frame += _CRC.pack(zlib.crc32(body))
+    return bytes(frame)
+
+
+def decode_block_record(buf, pos=0):
+    """
+    Decodes the frame starting at `pos`. Returns (record, position after the
+    frame). Raises IncompleteRecord if the buffer ends first, CorruptRecord
+    if the frame is damaged.
+    """
+    length, start = decode_varint(buf, pos)
+    end = start + length
+    if end + _CRC.size > len(buf):
+        raise IncompleteRecord("buffer ends inside a record")
+    body = bytes(buf[start:end])
+    if zlib.crc32(body) != _CRC.unpack_from(buf, end)[0]:
+        raise CorruptRecord(f"checksum mismatch in the record at byte {pos}")
+
+    try:
+        flags = body[0]
+        index, p = decode_varint(body, 1)
+        if flags & FLAG_INT_TIMESTAMP:
+            zigzag, p = decode_varint(body, p)
+            timestamp = zigzag >> 1 if not zigzag & 1 else -(zigzag >> 1) - 1
+        else:
+            timestamp = _FLOAT.unpack_from(body, p)[0]
+            p += _FLOAT.size
+        nonce, p = decode_varint(body, p)
+
+        hashes = []
+        for flag in (FLAG_RAW_PREVIOUS_HASH, FLAG_RAW_HASH):
+            if flags & flag:
+                hashes.append(body[p:p + 32].hex())
+                p += 32
+            else:
+                size, p = decode_varint(body, p)
+                hashes.append(body[p:p + size].decode('utf-8'))
+                p += size
+
+        size, p = decode_varint(body, p)
+        data = json.loads(body[p:p + size].decode('utf-8'))
+        if p + size != len(body):
+            raise CorruptRecord(f"unexpected bytes in the record at byte {pos}")
+    except (IncompleteRecord, IndexError, struct.error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise CorruptRecord(f"malformed record at byte {pos}: {exc}") from exc
+
+    record = {
+        'index': index,
+        'timestamp': timestamp,
+        'data': data,
+        'previous_hash': hashes[0],
+        'hash': hashes[1],
+        'nonce': nonce,
+    }
+    return record, end + _CRC.size
+
+
+def decode_block_records(buf, pos=0):
+    """
+    Decodes consecutive frames from `pos` until the end of `buf` or the
+    first frame that is incomplete or damaged (decode_block_record(buf, end)
+    then tells which). Returns (records, start of the last record or None,
+    end). Same result as calling decode_block_record() in a loop, but the
+    payloads are parsed by a single json.loads over all of them.
+    """
+    first = pos
+    fields = []
+    payloads = []
+    last_start = None
+    size = len(buf)
+    crc32 = zlib.crc32
+    unpack_float = _FLOAT.unpack_from
+    unpack_crc = _CRC.unpack_from
+    while pos < size:
+        try:
+            # One- and two-byte varints are decoded inline
+            length = buf[pos]
+            start = pos + 1
+            if length & 0x80:
+                second = buf[start]
+                if second & 0x80:
+                    length, start = decode_varint(buf, pos)
+                else:
+                    length = (length & 0x7f) | second << 7
+                    start += 1
+            end = start + length
+            if end + 4 > size:
+                break
+            body = buf[start:end]
+            if crc32(body) != unpack_crc(buf, end)[0]:
+                break
+
+            flags = body[0]
+            index = body[1]
+            p = 2
+            if index & 0x80:
+                index, p = decode_varint(body, 1)
+            if flags & FLAG_INT_TIMESTAMP:
+                zigzag, p = decode_varint(body, p)
+                timestamp = zigzag >> 1 if not zigzag & 1 else -(zigzag >> 1) - 1
+            else:
+                timestamp = unpack_float(body, p)[0]
+                p += 8
+            nonce = body[p]
+            p += 1
+            if nonce & 0x80:
+                nonce, p = decode_varint(body, p - 1)
+            if flags & FLAG_RAW_PREVIOUS_HASH:
+                previous_hash = body[p:p + 32].hex()
+                p += 32
+            else:
+                text_size, p = decode_varint(body, p)
+                previous_hash = body[p:p + text_size].decode('utf-8')
+                p += text_size
+            if flags & FLAG_RAW_HASH:
+                block_hash = body[p:p + 32].hex()
+                p += 32
+            else:
+                text_size, p = decode_varint(body, p)
+                block_hash = body[p:p + text_size].decode('utf-8')
+                p += text_size
+            payload_size = body[p]
+            p += 1
+            if payload_size & 0x80:
+                second = body[p]
+                if second & 0x80:
+                    payload_size, p = decode_varint(body, p - 1)
+                else:
+                    payload_size = (payload_size & 0x7f) | second << 7
+                    p += 1
+            if p + payload_size != length:
+                break
+        except (IncompleteRecord, IndexError, struct.error, UnicodeDecodeError):
+            break
+        fields.append((index, timestamp, previous_hash, block_hash, nonce))
+        payloads.append(body[p:])
+        last_start = pos
+        pos = end + 4
+
+    try:
+        data = json.loads(b'[' + b','.join(payloads) + b']')
+        if len(data) != len(payloads):
+            raise ValueError("payload holds more than one JSON value")
+    except ValueError:
+        # A payload with a valid checksum that is not one JSON value: find it record by record
+        records = []
+        last_start = None
+        pos = first
+        while pos < size:
+            try:
+                record, end = decode_block_record(buf, pos)
+            except ValueError:
+                break
+            records.append(record)
+            last_start, pos = pos, end
+        return records, last_start, pos
+
+    records = [
+        {
+            'index': index,
+            'timestamp': timestamp,
+            'data': payload,
+            'previous_hash': previous_hash,
+            'hash': block_hash,
+            'nonce': nonce,
+        }
+        for (index, timestamp, previous_hash, block_hash, nonce), payload in zip(fields, data)
+    ]
+    return records, last_start, pos
@@ -1,23 +1,124 @@
+from concurrent.futures import Future
+from threading import Lock
+from django.conf import settings
+from .Batcher import EventBatcher, build_receipt, iter_block_events
 from .Chain import Blockchain
+from .Storage import DatabaseStorage
+
+# Формат хранения глобальной цепочки: 'json' (весь файл), 'log' (только добавление),
+# 'binary' (только добавление, компактный двоичный формат) или 'database' (строки tenders.ChainBlock)
+GLOBAL_CHAIN_STORAGE = getattr(settings, 'BLOCKCHAIN_STORAGE', 'json')
+GLOBAL_CHAIN_FILE = {
+    'log': 'blockchain_data.jsonl',
+    'binary': 'blockchain_data.bin',
+}.get(GLOBAL_CHAIN_STORAGE, 'blockchain_data.json')
+
+
+def _global_chain_storage():
+    if GLOBAL_CHAIN_STORAGE == 'database':
+        from tenders.models import ChainBlock, ChainCheckpoint
+        return DatabaseStorage(ChainBlock, checkpoint_model=ChainCheckpoint, chain='global')
+    return GLOBAL_CHAIN_STORAGE
+
+# Групповая запись: события, пришедшие в течение окна (секунды), запечатываются
+# в один блок с корнем Меркла. 0 - по блоку на каждое событие, как раньше.
+GLOBAL_CHAIN_BATCH_WINDOW = getattr(settings, 'BLOCKCHAIN_BATCH_WINDOW', 0)
+GLOBAL_CHAIN_BATCH_MAX_EVENTS = getattr(settings, 'BLOCKCHAIN_BATCH_MAX_EVENTS', 100)
+
+# Единственный экземпляр глобальной цепочки, которая фиксирует все тендеры, и ее
+# группировщик событий. Создаются при первом обращении (см. _global_tender_chain),
+# поэтому импорт модуля (urls, миграции, команды) не читает файл цепочки
+GLOBAL_TENDER_CHAIN = None
+GLOBAL_EVENT_BATCHER = None
+_global_chain_lock = Lock()
+
+
+def _global_tender_chain():
+    """
+    Returns GLOBAL_TENDER_CHAIN, loading it (and starting GLOBAL_EVENT_BATCHER)
+    on the first call. Safe to call from several threads at once.
+    """
+    global GLOBAL_TENDER_CHAIN, GLOBAL_EVENT_BATCHER
+    chain = GLOBAL_TENDER_CHAIN
+    if chain is not None:
+        return chain
+    with _global_chain_lock:
+        if GLOBAL_TENDER_CHAIN is None:
+            chain = Blockchain(
+                chain_file=GLOBAL_CHAIN_FILE,
+                genesis_data={'message': 'Global Tender Registry initialized (Chain 2)'},
+                storage=_global_chain_storage(),
+                fsync=getattr(settings, 'BLOCKCHAIN_FSYNC', 'always'),
+                mining_workers=getattr(settings, 'BLOCKCHAIN_MINING_WORKERS', 1),
+                snapshot_interval=getattr(settings, 'BLOCKCHAIN_SNAPSHOT_INTERVAL', None),
+            )
+            if GLOBAL_CHAIN_BATCH_WINDOW:
+                GLOBAL_EVENT_BATCHER = EventBatcher(
+                    chain,
+                    window=GLOBAL_CHAIN_BATCH_WINDOW,
+                    max_events=GLOBAL_CHAIN_BATCH_MAX_EVENTS,
+                )
+            # Последним: другие потоки видят цепочку только вместе с группировщиком
+            GLOBAL_TENDER_CHAIN = chain
+        return GLOBAL_TENDER_CHAIN
+
+
+def submit_tender_event_to_global_chain(data):
+    """
+    Ставит событие в Глобальную Цепочку и возвращает Future с квитанцией
+    (block_index, block_hash, merkle_root, merkle_proof), доказывающей включение события.
+    """
+    chain = _global_tender_chain()
+    if GLOBAL_EVENT_BATCHER is not None:
+        return GLOBAL_EVENT_BATCHER.submit(data)
+    future = Future()
+    block = chain.add_block(data)
+    future.set_result(build_receipt(block, 0))
+    return future
+
+
+def flush_global_chain_events():
+    """Запечатывает ожидающие события, не дожидаясь конца окна."""
+    # Пока цепочка не создана, группировщика нет и запечатывать нечего
+    if GLOBAL_EVENT_BATCHER is not None:
+        GLOBAL_EVENT_BATCHER.flush()
 
-# Создаем единственный экземпляр глобальной цепочки, которая фиксирует все тендеры
-GLOBAL_TENDER_CHAIN = Blockchain(
-    genesis_data={'message': 'Global Tender Registry initialized (Chain 2)'}
-)
 
 def add_tender_event_to_global_chain(data):
     """
     Добавляет событие, связанное с тендером, в Глобальную Цепочку.
     """
-    GLOBAL_TENDER_CHAIN.add_block(data)
-    # Возвращаем хэш последнего блока, чтобы использовать его как "ссылку"
-    return GLOBAL_TENDER_CHAIN.chain[-1].hash
+    receipt = submit_tender_event_to_global_chain(data).result()
+    # Возвращаем хэш блока, чтобы использовать его как "ссылку"
+    return receipt['block_hash']
 
 def get_global_chain():
     """Возвращает текущий экземпляр Глобальной Цепочки."""
-    return GLOBAL_TENDER_CHAIN
+    chain = _global_tender_chain()
+    # Другие процессы (воркеры gunicorn, run_chain_worker) могли дописать блоки:
+    # читаем только новый хвост хранилища
+    chain.refresh()
+    return chain
 
 def get_global_chain_data():
     """Возвращает данные Глобальной Цепочки в виде списка объектов Block для сериализации."""
     # Возвращаем именно chain, так как views.py использует cls=BlockChainJSONEncoder
-    return GLOBAL_TENDER_CHAIN.chain
\ No newline at end of file
+    return get_global_chain().chain
+
+def get_tender_anchor_proof(tender_id, local_chain_root_hash=None):
+    """
+    Возвращает доказательство включения (см. Proofs.verify_anchor_proof) для
+    события Глобальной Цепочки, которое якорит local_chain_root_hash тендера
+    (по умолчанию - последний якорь тендера), или None, если якоря нет.
+    """
+    chain = get_global_chain()
+    # Блоки тендера берутся из индекса, начиная с самого нового
+    for block in reversed(chain.get_blocks_for_tender(tender_id)):
+        events = list(iter_block_events(block))
+        for event_index, event in reversed(events):
+            if not isinstance(event, dict) or str(event.get('tender_id')) != str(tender_id):
+                continue
+            anchored_hash = event.get('local_chain_root_hash')
+            if anchored_hash is not None and local_chain_root_hash in (None, anchored_hash):
+                return chain.get_inclusion_proof(block.hash, event_index)
+    return None
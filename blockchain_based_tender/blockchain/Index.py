@@ -0,0 +1,161 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from threading import Lock
+
+from .Batcher import iter_data_events
+
+
+class ChainIndex:
+    """
+    Secondary indexes over a list of blocks:
+
+        hash      -> block index
+        tender_id -> indices of the blocks recording an event of that tender
+        action    -> indices of the blocks recording that action
+        (timestamp, index) pairs kept sorted, for time ranges
+
+    Events inside batch blocks are indexed under their own tender_id and
+    action (the batch block is also listed under its 'Event Batch' action).
+    tender_id keys are compared as strings, so 7 and "7" are the same tender.
+
+    sync() brings the indexes up to date with the chain list. When the list
+    has only grown it indexes just the new tail; if the blocks already
+    indexed were replaced (the store was reloaded), it starts over.
+
+    An index restored from a snapshot (see restore()) reads the saved state
+    only on the first sync(load=True), merging in the blocks indexed since.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self):
+        self._by_hash = {}
+        self._by_tender = {}
+        self._by_action = {}
+        self._timestamps = []
+        self._size = 0
+        # Hash of the last block indexed: blocks read from a ColumnarBlockList
+        # are new objects every time, so identity cannot tell a replaced chain
+        self._last_hash = None
+        # Loads the state saved in a snapshot (see restore)
+        self._load_state = None
+
+    def sync(self, chain, load=False):
+        """
+        Indexes the blocks added to `chain`. With `load`, a state restored
+        from a snapshot is read in first, so lookups see every block.
+        """
+        with self._lock:
+            if load and self._load_state is not None and not self._merge_saved_state():
+                self._clear()
+            size = self._size
+            if size > len(chain) or (size and chain[size - 1].hash != self._last_hash):
+                self._clear()
+                size = 0
+            for position in range(size, len(chain)):
+                block = chain[position]
+                self._add(position, block.hash, block.timestamp, block.data)
+            self._size = len(chain)
+            self._last_hash = chain[-1].hash if chain else None
+
+    def rebuild(self, records):
+        """
+        Starts over from the stored records of a freshly loaded chain, so
+        the loader does not have to build a Block for each of them.
+        """
+        with self._lock:
+            self._clear()
+            for position, record in enumerate(records):
+                self._add(position, record['hash'], record['timestamp'], record['data'])
+            self._size = len(records)
+            self._last_hash = records[-1]['hash'] if records else None
+
+    def to_state(self):
+        """The indexes as JSON-serializable data (for Snapshot.write_snapshot)."""
+        with self._lock:
+            if self._load_state is not None and not self._merge_saved_state():
+                return None
+            return {
+                'by_hash': dict(self._by_hash),
+                'by_tender': {key: list(positions) for key, positions in self._by_tender.items()},
+                'by_action': {key: list(positions) for key, positions in self._by_action.items()},
+                'timestamps': list(self._timestamps),
+            }
+
+    def restore(self, load_state, size, last_block):
+        """
+        Starts from the indexes of a snapshot covering the first `size`
+        blocks, the last of which is `last_block`. `load_state` returns the
+        saved state (to_state()) and is called on the first sync(load=True).
+        """
+        with self._lock:
+            self._clear()
+            self._size = size
+            self._last_hash = last_block.hash
+            self._load_state = load_state
+
+    def _merge_saved_state(self):
+        load_state, self._load_state = self._load_state, None
+        try:
+            state = load_state()
+            by_hash = state['by_hash']
+            by_tender = state['by_tender']
+            by_action = state['by_action']
+            timestamps = [tuple(entry) for entry in state['timestamps']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        # Blocks indexed after the snapshot come after the saved ones
+        by_hash.update(self._by_hash)
+        for saved, added in ((by_tender, self._by_tender), (by_action, self._by_action)):
+            for key, positions in added.items():
+                saved.setdefault(key, []).extend(positions)
+        self._by_hash = by_hash
+        self._by_tender = by_tender
+        self._by_action = by_action
+        self._timestamps = list(merge(timestamps, self._timestamps))
+        return True
+
+    def _add(self, position, block_hash, timestamp, data):
+        self._by_hash[block_hash] = position
+        for _, event in iter_data_events(data):
+            if isinstance(event, dict):
+                if 'tender_id' in event:
+                    _add_position(self._by_tender, str(event['tender_id']), position)
+                if 'action' in event:
+                    _add_position(self._by_action, event['action'], position)
+        if isinstance(data, dict) and 'action' in data:
+            _add_position(self._by_action, data['action'], position)
+
+        entry = (timestamp, position)
+        if not self._timestamps or entry >= self._timestamps[-1]:
+            self._timestamps.append(entry)
+        else:
+            # Clocks of different processes can be slightly out of step
+            insort(self._timestamps, entry)
+
+    def position_of_hash(self, block_hash):
+        with self._lock:
+            return self._by_hash.get(block_hash)
+
+    def positions_for_tender(self, tender_id):
+        with self._lock:
+            return list(self._by_tender.get(str(tender_id), ()))
+
+    def positions_for_action(self, action):
+        with self._lock:
+            return list(self._by_action.get(action, ()))
+
+    def positions_between(self, start=None, end=None):
+        """Positions of blocks with start <= timestamp < end, in time order."""
+        with self._lock:
+            low = 0 if start is None else bisect_left(self._timestamps, (start,))
+            high = len(self._timestamps) if end is None else bisect_left(self._timestamps, (end,))
+            return [position for _, position in self._timestamps[low:high]]
+
+
+def _add_position(index, key, position):
+    positions = index.setdefault(key, [])
+    # Several events of one block give a single position
+    if not positions or positions[-1] != position:
+        positions.append(position)
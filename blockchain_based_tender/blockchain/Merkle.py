@@ -0,0 +1,124 @@
+import hashlib
+import json
+
+# Domain separation between leaves and inner nodes (as in RFC 6962), so an
+# inner node can never be passed off as a leaf.
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def hash_leaf(data):
+    """
+    Merkle leaf hash of an event (any JSON-serializable value).
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(LEAF_PREFIX + payload).hexdigest()
+
+
+def hash_node(left, right):
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def merkle_root(leaves):
+    """
+    Root over a list of leaf hashes. An odd node at the end of a level is
+    promoted unchanged rather than paired with itself.
+    """
+    if not leaves:
+        return hashlib.sha256(b'').hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        next_level = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+
+def merkle_proof(leaves, index):
+    """
+    Sibling path for leaves[index]: a list of [side, hash] pairs from the
+    bottom up, where side is 'L' or 'R' for the sibling's position.
+    """
+    proof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(['L' if sibling < index else 'R', level[sibling]])
+        next_level = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+        index //= 2
+    return proof
+
+
+def apply_merkle_proof(leaf, proof):
+    """
+    Root that `leaf` hashes up to through `proof` (from merkle_proof).
+    """
+    current = leaf
+    for side, sibling in proof:
+        current = hash_node(sibling, current) if side == 'L' else hash_node(current, sibling)
+    return current
+
+
+def verify_merkle_proof(leaf, proof, root):
+    """
+    Checks that `leaf` hashes up to `root` through `proof` (from merkle_proof).
+    """
+    return apply_merkle_proof(leaf, proof) == root
+
+
+class MerkleTree:
+    """
+    Merkle tree that grows one leaf at a time. Every level is kept, so
+    append() rehashes only the right edge and root() and proof() cost
+    O(log n); both give the same results as merkle_root() and
+    merkle_proof() over the leaves appended so far.
+    """
+    def __init__(self, leaves=()):
+        # levels[0] are the leaves, levels[-1] holds the root
+        self.levels = [[]]
+        for leaf in leaves:
+            self.append(leaf)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def append(self, leaf):
+        self.levels[0].append(leaf)
+        height = 0
+        while len(self.levels[height]) > 1:
+            level = self.levels[height]
+            index = len(level) - 1
+            if index % 2:
+                parent = hash_node(level[index - 1], level[index])
+            else:
+                # Odd node at the end of the level is promoted unchanged
+                parent = level[index]
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            upper = self.levels[height + 1]
+            if index // 2 < len(upper):
+                upper[index // 2] = parent
+            else:
+                upper.append(parent)
+            height += 1
+
+    def root(self):
+        if not self.levels[0]:
+            return merkle_root([])
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        proof = []
+        for level in self.levels:
+            if len(level) <= 1:
+                break
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(['L' if sibling < index else 'R', level[sibling]])
+            index //= 2
+        return proof
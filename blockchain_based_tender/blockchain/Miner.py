@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from .Block import find_nonce
+
+# Nonces handed to a worker in one task
+CHUNK_SIZE = 20000
+# How often (in attempts) a worker checks whether another worker already won
+STOP_CHECK_INTERVAL = 1024
+
+# Set in each worker process by _init_worker
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def search_nonce_range(prefix, suffix, difficulty, start, count):
+    """
+    Scans nonces [start, start + count) and returns (nonce, hash) for the first
+    one that meets the difficulty, or None if there is none or mining was stopped.
+    """
+    return find_nonce(prefix, suffix, difficulty, start, start + count,
+                      stop_event=_stop_event, check_interval=STOP_CHECK_INTERVAL)
+
+
+class ParallelMiner:
+    """
+    Proof-of-work over a process pool. The nonce space is cut into chunks that
+    are handed out in order; results are also consumed in order, so the nonce
+    found is the lowest valid one - exactly what the sequential loop in
+    Block.mine_block would find. Once it is known, the remaining workers are
+    told to stop through a shared event.
+    """
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._stop_event = None
+        # A pool mines one block at a time
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            context = multiprocessing.get_context()
+            self._stop_event = context.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._stop_event,),
+            )
+        return self._executor
+
+    def mine(self, block, difficulty):
+        """
+        Returns (nonce, hash) for the lowest nonce >= block.nonce meeting the difficulty.
+        The block itself is not modified.
+        """
+        with self._lock:
+            executor = self._get_executor()
+            # The block is serialized once here; workers only get the template bytes
+            prefix, suffix = block.mining_template()
+            fields = (prefix, suffix, difficulty)
+            pending = deque()
+            next_start = block.nonce
+
+            def submit():
+                nonlocal next_start
+                pending.append(executor.submit(search_nonce_range, *fields, next_start, self.chunk_size))
+                next_start += self.chunk_size
+
+            for _ in range(self.workers * 2):
+                submit()
+
+            try:
+                while True:
+                    result = pending.popleft().result()
+                    if result is not None:
+                        return result
+                    submit()
+            finally:
+                self._stop_event.set()
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                self._stop_event.clear()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+_miners = {}
+_miners_lock = threading.Lock()
+
+
+def get_miner(workers):
+    """
+    Returns a shared ParallelMiner with the given pool size, or None when
+    workers <= 1 (plain sequential mining).
+    """
+    if not workers or workers <= 1:
+        return None
+    with _miners_lock:
+        if workers not in _miners:
+            _miners[workers] = ParallelMiner(workers)
+        return _miners[workers]
@@ -0,0 +1,117 @@
+"""
+Compact inclusion proofs for events of a chain (e.g. a tender's anchor in
+the global chain).
+
+Every block is summarised by a header leaf
+
+    hash_leaf({'index', 'timestamp', 'previous_hash', 'nonce', 'hash', 'event_root'})
+
+where event_root is the Merkle root over the block's events (the batch's
+merkle_root, or the leaf of the block's own data). The header leaves of the
+whole chain form a second Merkle tree whose root, published together with
+the chain length, is what an auditor trusts (as a signed tree head in
+RFC 6962). A proof carries the event, its path to event_root, the header
+and the header's path to the chain root, so checking it costs O(log n)
+hashes and needs none of the other blocks.
+
+Besides the standard library this module needs only Merkle.py and
+Batcher.py, so auditors can run verify_inclusion_proof() with those three
+files alone.
+"""
+from threading import Lock
+
+from .Batcher import iter_block_events
+from .Merkle import MerkleTree, apply_merkle_proof, hash_leaf, merkle_proof, merkle_root
+
+HEADER_FIELDS = ('index', 'timestamp', 'previous_hash', 'nonce', 'hash')
+
+
+def _block_events(block):
+    return [event for _, event in iter_block_events(block)]
+
+
+def block_header(block, event_root):
+    header = {field: getattr(block, field) for field in HEADER_FIELDS}
+    header['event_root'] = event_root
+    return header
+
+
+class HeaderTree:
+    """
+    Merkle tree over the header leaves of a chain, kept in step with the
+    chain list like Index.ChainIndex: sync() hashes only blocks added since
+    the last call and starts over if the blocks already covered were replaced.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._tree = MerkleTree()
+        self._last_hash = None
+
+    def sync(self, chain):
+        size = len(self._tree)
+        if size > len(chain) or (size and chain[size - 1].hash != self._last_hash):
+            self._tree = MerkleTree()
+            size = 0
+        for block in chain[size:]:
+            event_root = merkle_root([hash_leaf(event) for event in _block_events(block)])
+            self._tree.append(hash_leaf(block_header(block, event_root)))
+        self._last_hash = chain[-1].hash if chain else None
+
+    def head(self, chain):
+        """(chain length, chain root) for the current chain."""
+        with self._lock:
+            self.sync(chain)
+            return len(self._tree), self._tree.root()
+
+    def build_proof(self, chain, position, event_index=0):
+        """
+        Inclusion proof for event `event_index` of the block at `position`.
+        """
+        with self._lock:
+            self.sync(chain)
+            block = chain[position]
+            events = _block_events(block)
+            leaves = [hash_leaf(event) for event in events]
+            return {
+                'event': events[event_index],
+                'event_index': event_index,
+                'event_proof': merkle_proof(leaves, event_index),
+                'block': block_header(block, merkle_root(leaves)),
+                'block_proof': self._tree.proof(position),
+                'chain_length': len(self._tree),
+                'chain_root': self._tree.root(),
+            }
+
+
+def verify_inclusion_proof(proof, trusted_root=None):
+    """
+    Checks a proof from HeaderTree.build_proof: the event hashes up to the
+    block's event_root, and the block header up to the chain root. Pass the
+    chain root obtained from a trusted source as `trusted_root`; without it
+    only the proof's own consistency is checked. O(log n) hashes.
+    """
+    try:
+        event_root = apply_merkle_proof(hash_leaf(proof['event']), proof['event_proof'])
+        if event_root != proof['block']['event_root']:
+            return False
+        header = {field: proof['block'][field] for field in HEADER_FIELDS}
+        header['event_root'] = event_root
+        chain_root = apply_merkle_proof(hash_leaf(header), proof['block_proof'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    if chain_root != proof['chain_root']:
+        return False
+    return trusted_root is None or chain_root == trusted_root
+
+
+def verify_anchor_proof(proof, tender_id, local_chain_root_hash, trusted_root=None):
+    """
+    Checks that `proof` shows the global chain anchoring `local_chain_root_hash`
+    as the local chain head of tender `tender_id`.
+    """
+    event = proof.get('event')
+    if not isinstance(event, dict):
+        return False
+    if str(event.get('tender_id')) != str(tender_id) or event.get('local_chain_root_hash') != local_chain_root_hash:
+        return False
+    return verify_inclusion_proof(proof, trusted_root)
@@ -0,0 +1,139 @@
+"""
+Chain snapshots for fast startup.
+
+A snapshot file sits next to the chain file (`<chain file>.snapshot`) and
+holds two JSON lines:
+
+    1. the header: block count, head hash, the storage position just past
+       the head (see Storage.*.snapshot_state), the validation checkpoint
+       and the last SNAPSHOT_TAIL_BLOCKS block records
+    2. the state of the chain's secondary indexes (see Index.ChainIndex)
+
+On startup a Blockchain reads only the header, asks the storage to resume
+after the head (the log checks a single record, the database a single row)
+and replays the blocks appended since. Older blocks and the index state are
+read the first time something needs them, so boot time does not grow with
+the length of the chain.
+"""
+import json
+import os
+import tempfile
+from collections.abc import Sequence
+from threading import Lock
+
+SNAPSHOT_VERSION = 1
+# Blocks kept in the snapshot itself: enough for the newest pages and the head
+SNAPSHOT_TAIL_BLOCKS = 100
+
+
+def snapshot_path(chain_file):
+    return f"{chain_file}.snapshot"
+
+
+def write_snapshot(path, header, index_state):
+    """
+    Atomically replaces the snapshot at `path`.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(header, separators=(',', ':')) + '\n')
+            f.write(json.dumps(index_state, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot_header(path):
+    """
+    Returns the snapshot header, or None if there is no usable snapshot.
+    """
+    try:
+        with open(path, 'r') as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or header.get('version') != SNAPSHOT_VERSION or not header.get('tail'):
+        return None
+    return header
+
+
+def read_snapshot_index(path, head_hash):
+    """
+    Returns the index state saved with the snapshot whose head is
+    `head_hash`, or None if the file has been replaced by a different one.
+    """
+    with open(path, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get('head_hash') != head_hash:
+            return None
+        return json.loads(f.readline())
+
+
+class LazyBlockList(Sequence):
+    """
+    The blocks of a chain resumed from a snapshot. Only the blocks from
+    position `lazy_count` on are in memory; the first access to an earlier
+    position calls `load_prefix(lazy_count)` once to read the rest.
+
+    Supports what Blockchain and its callers do with `chain`: len(),
+    indexing, slicing (slices of the loaded part never trigger the load),
+    iteration, append() and `+ list`.
+    """
+    def __init__(self, lazy_count, load_prefix, blocks):
+        self._load_prefix = load_prefix
+        # (number of blocks not loaded yet, the loaded blocks after them); replaced as a whole
+        self._state = (lazy_count, blocks)
+        self._lock = Lock()
+
+    @property
+    def lazy_count(self):
+        return self._state[0]
+
+    def _materialize(self):
+        with self._lock:
+            lazy_count, blocks = self._state
+            if lazy_count:
+                self._state = (0, self._load_prefix(lazy_count) + blocks)
+        return self._state[1]
+
+    def __len__(self):
+        lazy_count, blocks = self._state
+        return lazy_count + len(blocks)
+
+    def __getitem__(self, key):
+        lazy_count, blocks = self._state
+        length = lazy_count + len(blocks)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(length)
+            if step == 1 and start >= lazy_count:
+                return blocks[start - lazy_count:max(start, stop) - lazy_count]
+            if step == 1 and start == 0 and stop >= lazy_count:
+                # Prefix of the chain (e.g. the persisted part in Blockchain.refresh)
+                return LazyBlockList(lazy_count, self._load_prefix, blocks[:stop - lazy_count])
+            return self._materialize()[key]
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError('block index out of range')
+        if key < lazy_count:
+            return self._materialize()[key]
+        return blocks[key - lazy_count]
+
+    def __iter__(self):
+        return iter(self._materialize() if self._state[0] else self._state[1])
+
+    def __reversed__(self):
+        # Newest first, reading the older blocks only if the caller gets that far
+        for position in range(len(self) - 1, -1, -1):
+            yield self[position]
+
+    def append(self, block):
+        with self._lock:
+            self._state[1].append(block)
+
+    def __add__(self, other):
+        lazy_count, blocks = self._state
+        return LazyBlockList(lazy_count, self._load_prefix, blocks + list(other))
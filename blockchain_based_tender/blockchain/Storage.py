@@ -0,0 +1,702 @@
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+from django.db import DatabaseError, transaction
+
+from .Encoding import (
+    FILE_HEADER, FORMAT_VERSION, CorruptRecord, IncompleteRecord, decode_block_record, decode_block_records,
+    decode_varint, encode_block_record,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Fields of a stored block record
+RECORD_FIELDS = ('index', 'timestamp', 'data', 'previous_hash', 'hash', 'nonce')
+
+
+class ChainStorageError(Exception):
+    """
+    Raised when a chain file is damaged in a way that cannot be repaired automatically.
+    """
+    pass
+
+
+def block_to_record(block):
+    """
+    Returns the on-disk record for a Block (same keys as the JSON chain files).
+    """
+    return {
+        'index': block.index,
+        'timestamp': block.timestamp,
+        'data': block.data,
+        'previous_hash': block.previous_hash,
+        'hash': block.hash,
+        'nonce': block.nonce
+    }
+
+
+class FileLock:
+    """
+    Exclusive lock held through the file at `path` (created if missing).
+    Other processes, and other threads of this one, block until it is
+    released; the thread holding it may enter it again.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def __enter__(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            f = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK gives up after 10 seconds; keep waiting like flock
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            self._local.file = f
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        f = self._local.file
+        self._local.file = None
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+
+class FileCheckpointMixin:
+    """
+    Keeps the validation checkpoint (see Blockchain.validate) in a small
+    side file next to the chain file.
+    """
+    @property
+    def checkpoint_path(self):
+        return f"{self.path}.checkpoint"
+
+    def load_checkpoint(self):
+        """
+        Returns (index, hash) of the last validated block, or None.
+        """
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            return checkpoint['index'], checkpoint['hash']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_checkpoint(self, index, block_hash):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'index': index, 'hash': block_hash}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def lock(self):
+        """
+        Exclusive append lock shared by every process using this chain file.
+        """
+        if getattr(self, '_lock', None) is None:
+            self._lock = FileLock(f"{self.path}.lock")
+        return self._lock
+
+
+class MemoryStorage:
+    """
+    Keeps the records in a list and never touches the disk. Used for chains
+    built from data that is already in memory (e.g. a tender's local chain).
+    """
+    def __init__(self, records=None):
+        self.records = list(records or [])
+        self.checkpoint = None
+
+    @property
+    def record_count(self):
+        return len(self.records)
+
+    def load_checkpoint(self):
+        return self.checkpoint
+
+    def save_checkpoint(self, index, block_hash):
+        self.checkpoint = (index, block_hash)
+
+    def lock(self):
+        # Nobody else can write to this process's memory
+        return nullcontext()
+
+    def exists(self):
+        return bool(self.records)
+
+    def load_new(self):
+        return []
+
+    def load(self):
+        return self.records
+
+    def save(self, records):
+        self.records = list(records)
+
+    def append(self, blockchain, block):
+        pending = blockchain.chain[len(self.records):] or [block]
+        self.records.extend(block_to_record(b) for b in pending)
+
+
+class DatabaseStorage:
+    """
+    Stores blocks as rows of a Django model that has the RECORD_FIELDS
+    columns. `scope` holds the filters selecting this chain's rows, e.g.
+    DatabaseStorage(ChainBlock, chain='global'). The validation checkpoint is
+    kept in `checkpoint_model` (one row per scope, with index and hash
+    columns); without one it is only remembered for the life of the object.
+    """
+    def __init__(self, model, checkpoint_model=None, **scope):
+        self.model = model
+        self.checkpoint_model = checkpoint_model
+        self.scope = scope
+        self.checkpoint = None
+        # Number of rows known to be stored
+        self.record_count = 0
+
+    def _rows(self):
+        return self.model.objects.filter(**self.scope)
+
+    def exists(self):
+        try:
+            return self._rows().exists()
+        except DatabaseError:
+            # Table not created yet (e.g. while `migrate` itself is running)
+            return False
+
+    def load(self):
+        records = list(self._rows().order_by('index').values(*RECORD_FIELDS))
+        self.record_count = len(records)
+        return records
+
+    def load_new(self):
+        """
+        Returns the rows added (by any process) after the ones already loaded.
+        """
+        records = list(
+            self._rows().filter(index__gte=self.record_count).order_by('index').values(*RECORD_FIELDS)
+        )
+        self.record_count += len(records)
+        return records
+
+    # --- Snapshots (see Snapshot.py) ---
+
+    def snapshot_state(self):
+        return {}
+
+    def resume(self, state, record_count, head_hash):
+        """
+        Continues after a snapshot of the first `record_count` rows if the
+        last of them still has `head_hash`; load_new() then returns only the
+        rows after it. Returns False if the chain no longer matches.
+        """
+        if not record_count:
+            return False
+        stored_hash = self._rows().filter(index=record_count - 1).values_list('hash', flat=True).first()
+        if stored_hash != head_hash:
+            return False
+        self.record_count = record_count
+        return True
+
+    def read_prefix(self, count):
+        """The first `count` records, without changing what load_new() returns."""
+        return list(self._rows().filter(index__lt=count).order_by('index').values(*RECORD_FIELDS))
+
+    @contextmanager
+    def lock(self):
+        """
+        Holds a transaction with the chain's last row locked (PostgreSQL/MySQL;
+        SQLite serializes writers itself). unique (chain, index) rejects a
+        second writer in any case.
+        """
+        with transaction.atomic():
+            list(self._rows().select_for_update().order_by('-index').values_list('pk', flat=True)[:1])
+            yield
+
+    def save(self, records):
+        with transaction.atomic():
+            self._rows().delete()
+            self.model.objects.bulk_create([self.model(**self.scope, **record) for record in records])
+        self.record_count = len(records)
+
+    def append(self, blockchain, block):
+        pending = blockchain.chain[self.record_count:] or [block]
+        self.model.objects.bulk_create(
+            [self.model(**self.scope, **block_to_record(b)) for b in pending]
+        )
+        self.record_count += len(pending)
+
+    def load_checkpoint(self):
+        if self.checkpoint_model is None:
+            return self.checkpoint
+        return self.checkpoint_model.objects.filter(**self.scope).values_list('index', 'hash').first()
+
+    def save_checkpoint(self, index, block_hash):
+        if self.checkpoint_model is None:
+            self.checkpoint = (index, block_hash)
+            return
+        self.checkpoint_model.objects.update_or_create(
+            **self.scope, defaults={'index': index, 'hash': block_hash}
+        )
+
+
+class JSONFileStorage(FileCheckpointMixin):
+    """
+    The original persistence format: the whole chain as one JSON array,
+    rewritten on every save.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.record_count = 0
+        # (mtime, size) of the file as last read or written
+        self._file_state = None
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """
+        Returns the list of block records stored in the file.
+        """
+        with open(self.path, 'r') as f:
+            file_state = os.fstat(f.fileno())
+            records = json.load(f)
+        self._file_state = (file_state.st_mtime_ns, file_state.st_size)
+        self.record_count = len(records)
+        return records
+
+    def load_new(self):
+        """
+        Returns the records written by other processes since the last
+        load/save. Costs one stat() when the file has not changed; otherwise
+        the array has to be parsed again. Returns None if the file no longer
+        starts with the records already known.
+        """
+        if self._stat() == self._file_state or not self.exists():
+            return []
+        known = self.record_count
+        try:
+            records = self.load()
+        except ValueError:
+            # Unreadable file: keep the chain in memory, the next save rewrites it
+            self._file_state = self._stat()
+            return []
+        if len(records) < known:
+            return None
+        return records[known:]
+
+    def save(self, records):
+        """
+        Rewrites the whole file with the given records. The new file replaces
+        the old one atomically, so readers never see it half written.
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f, indent=4)
+        os.replace(tmp_path, self.path)
+        self._file_state = self._stat()
+        self.record_count = len(records)
+
+    def append(self, blockchain, block):
+        """
+        A JSON array cannot be extended in place, so the whole chain is rewritten.
+        """
+        self.save(blockchain.to_list_of_dicts())
+
+
+class AppendLogStorage(FileCheckpointMixin):
+    """
+    Append-only log: one compact JSON record per line, so adding a block
+    writes only that block no matter how long the chain is.
+
+    fsync='always' flushes every record to disk before append() returns,
+    fsync='never' leaves it to the OS. A record is only valid once its
+    trailing newline is written; a torn last record left by a crash is
+    cut off on the next load.
+
+    Subclasses change the record format by overriding FILE_HEADER,
+    _encode() and _parse() (see BinaryLogStorage).
+    """
+    FSYNC_POLICIES = ('always', 'never')
+    # Bytes every file of this format starts with
+    FILE_HEADER = b''
+
+    def __init__(self, path, fsync='always', legacy_file=None):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        # JSON array file to import the first time the log is opened
+        self.legacy_file = legacy_file
+        # Number of records known to be on disk
+        self.record_count = 0
+        # Identity of the log file, the byte offset just past the last record
+        # read and the offset where that record starts
+        self._inode = None
+        self._offset = 0
+        self._head_offset = None
+
+    def exists(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            return True
+        if self.legacy_file and JSONFileStorage(self.legacy_file).exists():
+            with self.lock():
+                # Another process may have imported it while we waited
+                if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                    records = JSONFileStorage(self.legacy_file).load()
+                    type(self)(self.path, fsync=self.fsync).save(records)
+            return True
+        return False
+
+    def load(self):
+        """
+        Reads every complete record, truncating a torn tail if one is found.
+        """
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+            inode = os.fstat(f.fileno()).st_ino
+
+        records, good_offset, head_offset = self._parse(raw)
+        if good_offset < len(raw):
+            # Possibly a sibling's append in progress: only writers hold the
+            # lock, so whatever is still unfinished under it is really torn
+            with self.lock():
+                with open(self.path, 'r+b') as f:
+                    raw = f.read()
+                    inode = os.fstat(f.fileno()).st_ino
+                    records, good_offset, head_offset = self._parse(raw)
+                    if good_offset < len(raw):
+                        print(f"Truncating torn record at byte {good_offset} of {self.path}.")
+                        f.truncate(good_offset)
+                        self._sync(f)
+
+        self._inode = inode
+        self._offset = good_offset
+        self._head_offset = head_offset
+        self.record_count = len(records)
+        return records
+
+    def load_new(self):
+        """
+        Returns the records appended by other processes since the last
+        load/append, reading only the bytes after them. Returns None if the
+        log was replaced (see save) and has to be loaded again.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            stat = os.fstat(f.fileno())
+            if self._inode is not None and stat.st_ino != self._inode or stat.st_size < self._offset:
+                return None
+            if stat.st_size == self._offset:
+                return []
+            f.seek(self._offset)
+            raw = f.read()
+
+        # A record still being written is incomplete and is left for later
+        records, consumed, head_offset = self._parse(raw, tail_only=True, start=self._offset)
+        if records:
+            self._head_offset = self._offset + head_offset
+        self._inode = stat.st_ino
+        self._offset += consumed
+        self.record_count += len(records)
+        return records
+
+    # --- Snapshots (see Snapshot.py) ---
+
+    def snapshot_state(self):
+        return {'offset': self._offset, 'head_offset': self._head_offset}
+
+    def resume(self, state, record_count, head_hash):
+        """
+        Continues after a snapshot taken when the first `record_count`
+        records ended at byte state['offset']. Only the last of them (from
+        state['head_offset']) is read to check that it still has
+        `head_hash`; load_new() then returns the records after it. Returns
+        False if the log no longer matches.
+        """
+        offset = state.get('offset')
+        head_offset = state.get('head_offset')
+        if not record_count or not offset or head_offset is None or not 0 <= head_offset < offset:
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size < offset:
+                    return False
+                f.seek(head_offset)
+                raw = f.read(offset - head_offset)
+        except OSError:
+            return False
+        records, consumed, _ = self._parse(raw, tail_only=True, start=head_offset)
+        if len(records) != 1 or consumed != len(raw) or records[0].get('hash') != head_hash:
+            return False
+        self._inode = stat.st_ino
+        self._offset = offset
+        self._head_offset = head_offset
+        self.record_count = record_count
+        return True
+
+    def read_prefix(self, count):
+        """The first `count` records, without changing what load_new() returns."""
+        with open(self.path, 'rb') as f:
+            records = self._parse(f.read())[0]
+        if len(records) < count:
+            raise ChainStorageError(f"{self.path} holds {len(records)} records, {count} expected")
+        return records[:count]
+
+    def _encode(self, record):
+        return encode_log_record(record)
+
+    def _parse(self, raw, tail_only=False, start=0):
+        """
+        Splits raw log bytes (read from byte `start` of the file) into
+        records. Returns (records, length of the valid prefix, offset in
+        `raw` where the last record starts). With tail_only a bad record is
+        treated as unfinished rather than as corruption.
+        """
+        # Common case first: every complete line is a record, parsed by one json.loads
+        end = raw.rfind(b'\n') + 1
+        lines = raw[:end].split(b'\n')[:-1]
+        filled = [line for line in lines if line.strip()]
+        try:
+            records = json.loads(b'[' + b','.join(filled) + b']')
+        except ValueError:
+            records = None
+        if records is not None and len(records) == len(filled) and all(type(record) is dict for record in records):
+            head_offset = None
+            offset = end
+            for line in reversed(lines):
+                offset -= len(line) + 1
+                if line.strip():
+                    head_offset = offset
+                    break
+            return records, end, head_offset
+        return self._parse_lines(raw, tail_only, start)
+
+    def _parse_lines(self, raw, tail_only, start):
+        """_parse() one line at a time, to find where the log goes bad."""
+        records = []
+        good_offset = 0
+        head_offset = None
+        offset = 0
+        while offset < len(raw):
+            end = raw.find(b'\n', offset)
+            if end == -1:
+                # Last record was never terminated: the write was interrupted
+                break
+            line = raw[offset:end]
+            line_start, offset = offset, end + 1
+            if not line.strip():
+                good_offset = offset
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                if not tail_only and raw.find(b'\n', offset) != -1:
+                    # Damage in the middle of the log is not a torn write
+                    raise ChainStorageError(f"Corrupt record at byte {start + good_offset} of {self.path}")
+                break
+            good_offset = offset
+            head_offset = line_start
+        return records, good_offset, head_offset
+
+    def save(self, records):
+        """
+        Atomically replaces the log with the given records.
+        """
+        encoded = [self._encode(record) for record in records]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.FILE_HEADER)
+            f.write(b''.join(encoded))
+            self._sync(f)
+            stat = os.fstat(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._wrote(stat, encoded)
+        self.record_count = len(records)
+
+    def append(self, blockchain, block):
+        """
+        Writes the blocks not yet on disk (normally just `block`) to the end of the log.
+        """
+        pending = blockchain.chain[self.record_count:] or [block]
+        encoded = [self._encode(block_to_record(b)) for b in pending]
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(self.FILE_HEADER)
+            f.write(b''.join(encoded))
+            self._sync(f)
+            stat = os.fstat(f.fileno())
+        self._wrote(stat, encoded)
+        self.record_count += len(pending)
+
+    def _wrote(self, stat, encoded):
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        if encoded:
+            self._head_offset = stat.st_size - len(encoded[-1])
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync == 'always':
+            os.fsync(f.fileno())
+
+
+class BinaryLogStorage(AppendLogStorage):
+    """
+    Append-only log in the compact binary format of Encoding.py: raw 32-byte
+    hashes, varint index and nonce and a length-prefixed canonical payload,
+    each record framed with its length and a CRC-32. Locking, fsync, torn
+    tail repair, load_new() and snapshots work as for the JSON lines log.
+    """
+    FILE_HEADER = FILE_HEADER
+
+    def _encode(self, record):
+        return encode_block_record(record)
+
+    def _parse(self, raw, tail_only=False, start=0):
+        offset = 0
+        if start == 0:
+            if len(raw) < len(FILE_HEADER) and FILE_HEADER.startswith(raw):
+                # Header of a new file not written completely yet
+                return [], 0, None
+            if not raw.startswith(FILE_HEADER):
+                raise ChainStorageError(f"{self.path} is not a binary chain file of version {FORMAT_VERSION}")
+            offset = len(FILE_HEADER)
+        records, head_offset, good_offset = decode_block_records(raw, offset)
+        if good_offset < len(raw) and not tail_only:
+            try:
+                decode_block_record(raw, good_offset)
+            except CorruptRecord:
+                if _frame_end(raw, good_offset) < len(raw) and raw[good_offset:].strip(b'\x00'):
+                    # Damage in the middle of the log is not a torn write
+                    raise ChainStorageError(f"Corrupt record at byte {start + good_offset} of {self.path}")
+            except IncompleteRecord:
+                pass
+        return records, good_offset, head_offset
+
+
+def _frame_end(raw, offset):
+    length, body_start = decode_varint(raw, offset)
+    return body_start + length + 4
+
+
+def encode_log_record(record):
+    return json.dumps(record, sort_keys=True, separators=(',', ':')).encode() + b'\n'
+
+
+def convert_json_to_log(json_path, log_path, fsync='always'):
+    """
+    Migrates a JSON array chain file to the append-only log format.
+    Returns the number of blocks written.
+    """
+    records = JSONFileStorage(json_path).load()
+    AppendLogStorage(log_path, fsync=fsync).save(records)
+    return len(records)
+
+
+def convert_log_to_json(log_path, json_path):
+    """
+    Writes an append-only log back out as a JSON array chain file.
+    Returns the number of blocks written.
+    """
+    records = AppendLogStorage(log_path).load()
+    JSONFileStorage(json_path).save(records)
+    return len(records)
+
+
+# Chain file formats that convert_chain_file can convert between
+CHAIN_FILE_FORMATS = ('json', 'log', 'binary')
+
+
+def chain_file_storage(file_format, path, fsync='always'):
+    """
+    Storage for a chain file of the given format (one of CHAIN_FILE_FORMATS).
+    """
+    if file_format == 'json':
+        return JSONFileStorage(path)
+    if file_format == 'log':
+        return AppendLogStorage(path, fsync=fsync)
+    if file_format == 'binary':
+        return BinaryLogStorage(path, fsync=fsync)
+    raise ValueError(f"Unknown chain file format: {file_format!r}")
+
+
+def detect_chain_format(path):
+    """
+    Tells the format of an existing chain file from its first bytes.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(len(FILE_HEADER))
+    if head == FILE_HEADER:
+        return 'binary'
+    if head.lstrip().startswith(b'['):
+        return 'json'
+    return 'log'
+
+
+def convert_chain_file(source, destination, to, fsync='always'):
+    """
+    Rewrites the chain file `source` (any of CHAIN_FILE_FORMATS, detected)
+    as `destination` in format `to`. Returns the number of blocks written.
+    """
+    records = chain_file_storage(detect_chain_format(source), source).load()
+    chain_file_storage(to, destination, fsync=fsync).save(records)
+    return len(records)
+
+
+def get_storage(storage, chain_file, fsync='always'):
+    """
+    Builds the storage backend for a chain: 'json' (default), 'log',
+    'binary' or 'memory'. A ready-made backend (e.g. a DatabaseStorage) is
+    used as given. A 'log' (.jsonl) or 'binary' (.bin) file imports the
+    JSON array file of the same name the first time it is opened.
+    """
+    if hasattr(storage, 'load'):
+        return storage
+    if storage == 'memory':
+        return MemoryStorage()
+    if storage in (None, 'json'):
+        return JSONFileStorage(chain_file)
+    if storage == 'log':
+        legacy_file = None
+        if chain_file.endswith('.jsonl'):
+            legacy_file = chain_file[:-1]
+        return AppendLogStorage(chain_file, fsync=fsync, legacy_file=legacy_file)
+    if storage == 'binary':
+        legacy_file = None
+        if chain_file.endswith('.bin'):
+            legacy_file = chain_file[:-len('.bin')] + '.json'
+        return BinaryLogStorage(chain_file, fsync=fsync, legacy_file=legacy_file)
+    raise ValueError(f"Unknown chain storage: {storage!r}")
@@ -0,0 +1,445 @@
+"""
+Micro-benchmarks for the blockchain module.
+
+Run from the project directory, e.g.:
+
+    python -m blockchain.benchmarks mining --difficulty 5 --workers 1 2 4 8
+    python -m blockchain.benchmarks hashing --payload-sizes 1 100 1000
+    python -m blockchain.benchmarks stress --storage log --processes 8 --blocks 50
+    python -m blockchain.benchmarks startup --blocks 10000 100000 --tail 100
+    python -m blockchain.benchmarks formats --blocks 10000 100000
+    python -m blockchain.benchmarks memory --blocks 100000 1000000
+    python -m blockchain.benchmarks validation --blocks 100000
+    python -m blockchain.benchmarks imports --repeat 5
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter, time
+
+from .Block import Block, compute_block_hash, find_nonce, hash_template
+from .Chain import Blockchain, find_invalid_block
+from .Columnar import ColumnarBlockList
+from .Miner import ParallelMiner
+from .Storage import CHAIN_FILE_FORMATS, AppendLogStorage, block_to_record, chain_file_storage
+
+
+def sample_bid_payload(size=1):
+    """
+    A bid-like payload; `size` repeats the proposal text to make it larger.
+    """
+    return {
+        'action': 'Bid Submitted',
+        'bid_data': {
+            'id': 42,
+            'tender': 7,
+            'bidder': 'benchmark',
+            'price': 123456.78,
+            'proposal': 'Supply and installation of equipment. ' * size,
+            'timestamp': '2025-10-21T10:00:00+05:00',
+        },
+    }
+
+
+def bench_mining(args):
+    blocks = [
+        Block(i + 1, time(), sample_bid_payload(args.payload_size), '0' * 64)
+        for i in range(args.blocks)
+    ]
+
+    # Sequential reference: nonces and hashes every parallel run must reproduce
+    expected = []
+    attempts = 0
+    start = perf_counter()
+    for block in blocks:
+        target = '0' * args.difficulty
+        nonce, block_hash = block.nonce, block.hash
+        while block_hash[:args.difficulty] != target:
+            nonce += 1
+            block.nonce = nonce
+            block_hash = block.calculate_hash()
+        block.nonce = 0
+        expected.append((nonce, block_hash))
+        attempts += nonce + 1
+    baseline = perf_counter() - start
+    print(f"difficulty={args.difficulty} blocks={args.blocks} attempts={attempts}")
+    print(f"{'sequential':>12}: {baseline:8.3f}s {attempts / baseline:12.0f} H/s  x1.00")
+
+    for workers in args.workers:
+        miner = ParallelMiner(workers)
+        # Start the pool before timing
+        miner.mine(Block(0, time(), 'warmup', '0'), 1)
+        start = perf_counter()
+        results = [miner.mine(block, args.difficulty) for block in blocks]
+        elapsed = perf_counter() - start
+        miner.shutdown()
+        if results != expected:
+            sys.exit(f"workers={workers}: parallel result differs from sequential mining")
+        print(f"{f'{workers} workers':>12}: {elapsed:8.3f}s {attempts / elapsed:12.0f} H/s  "
+              f"x{baseline / elapsed:.2f}")
+
+
+def bench_hashing(args):
+    for size in args.payload_sizes:
+        block = Block(1, time(), sample_bid_payload(size), '0' * 64)
+
+        # The template path must give the same hashes as calculate_hash
+        prefix, suffix = hash_template(block.index, block.timestamp, block.data, block.previous_hash)
+        for nonce in (0, 7, 12345, args.attempts - 1):
+            block.nonce = nonce
+            if find_nonce(prefix, suffix, 0, nonce, nonce + 1) != (nonce, block.calculate_hash()):
+                sys.exit(f"payload x{size}: template hash differs at nonce {nonce}")
+
+        start = perf_counter()
+        for nonce in range(args.attempts):
+            block.nonce = nonce
+            block.calculate_hash()
+        per_attempt = (perf_counter() - start) / args.attempts
+
+        start = perf_counter()
+        # 64 leading zeros is never met, so every nonce in the range is tried
+        prefix, suffix = hash_template(block.index, block.timestamp, block.data, block.previous_hash)
+        find_nonce(prefix, suffix, 64, 0, args.attempts)
+        per_attempt_template = (perf_counter() - start) / args.attempts
+
+        print(f"payload {len(prefix) + len(suffix):>8} B: calculate_hash {1 / per_attempt:10.0f} H/s, "
+              f"template {1 / per_attempt_template:10.0f} H/s  x{per_attempt / per_attempt_template:.1f}")
+
+
+def _append_worker(chain_file, storage, worker_id, blocks, barrier):
+    # Block.mine_block and load_chain print for every block
+    with contextlib.redirect_stdout(io.StringIO()):
+        chain = Blockchain(chain_file=chain_file, difficulty=1, storage=storage, fsync='never')
+        barrier.wait()
+        for seq in range(blocks):
+            chain.add_block({'worker': worker_id, 'seq': seq})
+
+
+def run_append_stress(chain_file, storage='log', processes=4, blocks=20):
+    """
+    Starts `processes` processes that each open the same chain file and
+    append `blocks` blocks at once, then reloads the file and checks that it
+    holds one valid chain with every block exactly once. Returns a list of
+    problems (empty on success).
+    """
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(processes)
+    workers = [
+        context.Process(target=_append_worker, args=(chain_file, storage, worker_id, blocks, barrier))
+        for worker_id in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    problems = [f"worker {i} exited with code {w.exitcode}" for i, w in enumerate(workers) if w.exitcode]
+    with contextlib.redirect_stdout(io.StringIO()):
+        chain = Blockchain(chain_file=chain_file, difficulty=1, storage=storage)
+    result = chain.validate(full=True)
+    if not result:
+        problems.append(f"chain is invalid: {result}")
+    if len(chain.chain) != 1 + processes * blocks:
+        problems.append(f"expected {1 + processes * blocks} blocks, found {len(chain.chain)}")
+
+    # Each worker's blocks must all be there, in the order it added them
+    sequences = {}
+    for block in chain.chain[1:]:
+        if not isinstance(block.data, dict) or 'worker' not in block.data:
+            problems.append(f"unexpected block {block.index}: {block.data!r}")
+            continue
+        sequences.setdefault(block.data['worker'], []).append(block.data['seq'])
+    for worker_id in range(processes):
+        if sequences.get(worker_id) != list(range(blocks)):
+            problems.append(f"worker {worker_id}: blocks lost or out of order")
+    return problems
+
+
+def bench_stress(args):
+    with tempfile.TemporaryDirectory() as directory:
+        chain_file = os.path.join(directory, 'stress.' + {'log': 'jsonl', 'binary': 'bin'}.get(args.storage, 'json'))
+        start = perf_counter()
+        problems = run_append_stress(chain_file, args.storage, args.processes, args.blocks)
+        elapsed = perf_counter() - start
+    total = args.processes * args.blocks
+    print(f"storage={args.storage} processes={args.processes} blocks={total}: "
+          f"{elapsed:.3f}s {total / elapsed:.0f} blocks/s")
+    if problems:
+        sys.exit("\n".join(problems))
+    print("one valid chain, no blocks lost")
+
+
+def sample_chain_records(blocks, payload_size=1):
+    """
+    Records of a linked chain of `blocks` bid blocks (not mined).
+    """
+    records = []
+    previous_hash = '0'
+    for index in range(blocks):
+        block = Block(index, time(), sample_bid_payload(payload_size), previous_hash)
+        records.append(block_to_record(block))
+        previous_hash = block.hash
+    return records
+
+
+def write_sample_log(path, blocks, payload_size=1):
+    """
+    Writes a linked chain of `blocks` bid blocks (not mined) to an append-only log.
+    """
+    AppendLogStorage(path, fsync='never').save(sample_chain_records(blocks, payload_size))
+
+
+def _open_log_chain(path, snapshot_interval=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Blockchain(chain_file=path, difficulty=0, storage='log', fsync='never',
+                          snapshot_interval=snapshot_interval)
+
+
+def bench_startup(args):
+    # Large enough that the benchmark's own appends never write a new snapshot
+    interval = 10 ** 12
+    for size in args.blocks:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chain.jsonl')
+            write_sample_log(path, size, args.payload_size)
+            chain = _open_log_chain(path, interval)
+            chain.write_snapshot()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for seq in range(args.tail):
+                    chain.add_block({'action': 'Bid Submitted', 'seq': seq})
+
+            timings = {}
+            for label, snapshot_interval in (('full', None), ('snapshot', interval)):
+                best = None
+                for _ in range(args.repeat):
+                    start = perf_counter()
+                    opened = _open_log_chain(path, snapshot_interval)
+                    elapsed = perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                    if len(opened.chain) != len(chain.chain) or opened.get_latest_block().hash != chain.get_latest_block().hash:
+                        sys.exit(f"{size} blocks: {label} startup loaded a different chain")
+                timings[label] = best
+
+        print(f"{size:>9} blocks: full load {timings['full']:8.3f}s, "
+              f"snapshot + {args.tail} replayed {timings['snapshot']:8.3f}s  x{timings['full'] / timings['snapshot']:.0f}")
+
+
+def bench_formats(args):
+    suffixes = {'json': '.json', 'log': '.jsonl', 'binary': '.bin'}
+    for size in args.blocks:
+        records = sample_chain_records(size, args.payload_size)
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for file_format in CHAIN_FILE_FORMATS:
+                path = os.path.join(directory, 'chain' + suffixes[file_format])
+                save_time = load_time = None
+                for _ in range(args.repeat):
+                    storage = chain_file_storage(file_format, path, fsync='never')
+                    start = perf_counter()
+                    storage.save(records)
+                    elapsed = perf_counter() - start
+                    save_time = elapsed if save_time is None else min(save_time, elapsed)
+
+                    storage = chain_file_storage(file_format, path, fsync='never')
+                    start = perf_counter()
+                    loaded = storage.load()
+                    elapsed = perf_counter() - start
+                    load_time = elapsed if load_time is None else min(load_time, elapsed)
+                if loaded != records:
+                    sys.exit(f"{size} blocks: {file_format} did not round-trip the records")
+                results[file_format] = (os.path.getsize(path), save_time, load_time)
+
+            # Hashes recomputed from the records read back match the stored ones
+            for record in loaded:
+                if Block.from_dict(record).calculate_hash() != record['hash']:
+                    sys.exit(f"{size} blocks: block {record['index']} hashes differently after {file_format}")
+
+        base_size, base_save, base_load = results['json']
+        for file_format, (file_size, save_time, load_time) in results.items():
+            print(f"{size:>9} blocks {file_format:>6}: {file_size / 2 ** 20:8.2f} MiB ({file_size / base_size:4.0%}), "
+                  f"save {save_time:7.3f}s (x{base_save / save_time:.1f}), "
+                  f"load {load_time:7.3f}s (x{base_load / load_time:.1f})")
+
+
+def _measure_representation(path, representation, results):
+    # Run in its own process so memory freed by one measurement does not skew the next
+    tracemalloc.start()
+    records = AppendLogStorage(path).load()
+    if representation == 'blocks':
+        chain = [Block.from_dict(record) for record in records]
+    else:
+        chain = ColumnarBlockList.from_records(records)
+    del records
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = perf_counter()
+    for block in chain:
+        pass
+    results.put((representation, size, perf_counter() - start))
+
+
+def bench_memory(args):
+    context = multiprocessing.get_context()
+    for size in args.blocks:
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chain.jsonl')
+            write_sample_log(path, size, args.payload_size)
+            for representation in ('blocks', 'columnar'):
+                queue = context.Queue()
+                process = context.Process(target=_measure_representation, args=(path, representation, queue))
+                process.start()
+                label, memory, iteration = queue.get()
+                process.join()
+                results[label] = (memory, iteration)
+
+        blocks_memory = results['blocks'][0]
+        for label, (memory, iteration) in results.items():
+            print(f"{size:>9} blocks {label:>8}: {memory / 2 ** 20:9.1f} MiB, {memory / size:6.0f} B/block "
+                  f"({memory / blocks_memory:4.0%}), iterating {iteration:6.2f}s")
+
+
+def bench_validation(args):
+    for size in args.blocks:
+        chain = ColumnarBlockList.from_records(sample_chain_records(size, args.payload_size))
+
+        # As before the cache: every block is built with decoded data and serialized again
+        start = perf_counter()
+        previous = None
+        for block in chain:
+            data = block.data
+            if compute_block_hash(block.index, block.timestamp, data, block.previous_hash, block.nonce) != block.hash:
+                sys.exit(f"{size} blocks: block {block.index} is invalid")
+            if previous is not None and block.previous_hash != previous.hash:
+                sys.exit(f"{size} blocks: block {block.index} is not linked")
+            previous = block
+        reserialized = perf_counter() - start
+
+        start = perf_counter()
+        if find_invalid_block(chain) is not None:
+            sys.exit(f"{size} blocks: the cached path found an invalid block")
+        cached = perf_counter() - start
+
+        start = perf_counter()
+        for block in chain:
+            json.dumps(block.to_dict())
+        api_dicts = perf_counter() - start
+
+        start = perf_counter()
+        for block in chain:
+            block.to_json()
+        api_json = perf_counter() - start
+
+        print(f"{size:>9} blocks: validate re-serializing {reserialized:7.3f}s, from cached payload {cached:7.3f}s "
+              f"x{reserialized / cached:.1f}; API json.dumps(to_dict) {api_dicts:7.3f}s, to_json {api_json:7.3f}s x{api_dicts / api_json:.1f}")
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# First use of the chains once the URLs are loaded: what importing them used to do
+_FIRST_USE_SCRIPT = """
+import django
+django.setup()
+import tenders.urls
+from blockchain.Chain import get_tender_blockchain
+from blockchain.GlobalChain import get_global_chain
+get_global_chain()
+get_tender_blockchain()
+"""
+
+
+def _run_in_empty_directory(command):
+    """
+    Runs `command` from a fresh directory, where the chain files are looked
+    up. Returns (seconds, files it created, blocks it mined).
+    """
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIR, DJANGO_SETTINGS_MODULE='blockchain_based_tender.settings')
+    with tempfile.TemporaryDirectory() as directory:
+        start = perf_counter()
+        result = subprocess.run(command, cwd=directory, env=environment, capture_output=True, text=True)
+        elapsed = perf_counter() - start
+        if result.returncode:
+            sys.exit(f"{' '.join(command)} failed:\n{result.stderr}")
+        return elapsed, sorted(os.listdir(directory)), result.stdout.count('Block Mined')
+
+
+def bench_imports(args):
+    commands = {
+        'manage.py check': [sys.executable, os.path.join(PROJECT_DIR, 'manage.py'), 'check'],
+        'check + first chain use': [sys.executable, '-c', _FIRST_USE_SCRIPT],
+    }
+    for label, command in commands.items():
+        runs = [_run_in_empty_directory(command) for _ in range(args.repeat)]
+        best = min(elapsed for elapsed, _, _ in runs)
+        _, files, mined = runs[0]
+        print(f"{label:>24}: {best:6.3f}s, blocks mined {mined}, chain files created: {', '.join(files) or 'none'}")
+        if label == 'manage.py check' and (files or mined):
+            sys.exit("manage.py check touched the chain files")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m blockchain.benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    mining = commands.add_parser('mining', help="Hashrate of ParallelMiner against sequential mining")
+    mining.add_argument('--difficulty', type=int, default=4)
+    mining.add_argument('--blocks', type=int, default=5)
+    mining.add_argument('--payload-size', type=int, default=1)
+    mining.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    mining.set_defaults(func=bench_mining)
+
+    hashing = commands.add_parser('hashing', help="Per-attempt hashing cost: calculate_hash against the byte template")
+    hashing.add_argument('--attempts', type=int, default=50000)
+    hashing.add_argument('--payload-sizes', type=int, nargs='+', default=[1, 100, 1000])
+    hashing.set_defaults(func=bench_hashing)
+
+    stress = commands.add_parser('stress', help="Concurrent appends from several processes to one chain file")
+    stress.add_argument('--storage', choices=CHAIN_FILE_FORMATS, default='log')
+    stress.add_argument('--processes', type=int, default=os.cpu_count() or 4)
+    stress.add_argument('--blocks', type=int, default=50, help="Blocks appended by each process")
+    stress.set_defaults(func=bench_stress)
+
+    startup = commands.add_parser('startup', help="Opening a log chain: full load against snapshot + tail replay")
+    startup.add_argument('--blocks', type=int, nargs='+', default=[1000, 10000, 100000])
+    startup.add_argument('--tail', type=int, default=100, help="Blocks appended after the snapshot")
+    startup.add_argument('--payload-size', type=int, default=1)
+    startup.add_argument('--repeat', type=int, default=3)
+    startup.set_defaults(func=bench_startup)
+
+    formats = commands.add_parser('formats', help="Size, save and load time of the chain file formats")
+    formats.add_argument('--blocks', type=int, nargs='+', default=[10000, 100000])
+    formats.add_argument('--payload-size', type=int, default=1)
+    formats.add_argument('--repeat', type=int, default=3)
+    formats.set_defaults(func=bench_formats)
+
+    memory = commands.add_parser('memory', help="Memory held by a loaded chain: Block objects against the columnar store")
+    memory.add_argument('--blocks', type=int, nargs='+', default=[100000, 1000000])
+    memory.add_argument('--payload-size', type=int, default=1)
+    memory.set_defaults(func=bench_memory)
+
+    validation = commands.add_parser('validation', help="Full validation and API output from the cached payload bytes")
+    validation.add_argument('--blocks', type=int, nargs='+', default=[10000, 100000])
+    validation.add_argument('--payload-size', type=int, default=1)
+    validation.set_defaults(func=bench_validation)
+
+    imports = commands.add_parser('imports', help="manage.py check must not load chain files or mine at import time")
+    imports.add_argument('--repeat', type=int, default=3)
+    imports.set_defaults(func=bench_imports)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -145,3 +145,29 @@ MESSAGE_TAGS = {
     messages.WARNING: 'alert-warning',
     messages.INFO: 'alert-info',
 }
+
+
+# Blockchain persistence
+# 'json' rewrites the whole chain file on every block; 'log' appends one record
+# per block to blockchain_data.jsonl, 'binary' to blockchain_data.bin in the compact
+# binary format (both import blockchain_data.json on first use);
+# 'database' stores blocks as tenders.ChainBlock rows.
+BLOCKCHAIN_STORAGE = 'json'
+# 'always' fsyncs every appended block, 'never' leaves flushing to the OS
+BLOCKCHAIN_FSYNC = 'always'
+# Size of the process pool used for proof-of-work (1 = mine in the request thread)
+BLOCKCHAIN_MINING_WORKERS = 1
+# Group commit for the global chain: events arriving within this many seconds are
+# sealed into one Merkle-rooted block (0 = one block per event)
+BLOCKCHAIN_BATCH_WINDOW = 0
+BLOCKCHAIN_BATCH_MAX_EVENTS = 100
+# With 'log', 'binary' or 'database' storage, write a snapshot of the global chain every this
+# many blocks; workers start from it and replay only newer blocks (None = off)
+BLOCKCHAIN_SNAPSHOT_INTERVAL = 1000
+# Where queued chain writes (tenders.ChainWrite) are mined: 'sync' (in the request,
+# after commit), 'thread' (background thread of the web process) or 'worker'
+# (separate process: python manage.py run_chain_worker)
+BLOCKCHAIN_SEALING = 'thread'
+# Seconds after which a sealer's unrenewed claim on a batch of writes counts as
+# abandoned (the sealer died) and another sealer takes the batch over
+BLOCKCHAIN_SEAL_CLAIM_TIMEOUT = 300
@@ -0,0 +1,360 @@
+"""
+Durable queue of chain writes.
+
+Views no longer mine blocks themselves: they store a ChainWrite row (in the
+same database as the tender) and return its receipt right away. A sealer
+mines the queued writes strictly in id order, fills in the block hash, the
+tender's local chain head and global_chain_link_hash, and marks the row
+'sealed' (or 'failed' with the error). A 'delete' write mines nothing: it
+deletes its tender once the writes queued for the deletion are sealed.
+Meanwhile the tender has status 'deleting' and takes no bids or edits; a
+deletion refused at sealing time is recorded on both chains as aborted.
+
+Several processes may run a sealer (every web worker with 'thread', extra
+run_chain_worker instances). Before mining, a sealer claims the oldest
+writes with one conditional UPDATE (status 'sealing', claimed_by = its
+token) and seals only the rows it claimed. Only one batch is claimed at a
+time, so blocks keep the queue order. A claim not renewed for
+SEAL_CLAIM_TIMEOUT seconds is taken to be left by a sealer that died and
+is taken over by the next one.
+
+Where the sealer runs is chosen by settings.BLOCKCHAIN_SEALING:
+
+    'sync'   - in the request thread, once its transaction has committed
+    'thread' - in a background thread of the web process
+    'worker' - in a separate process: python manage.py run_chain_worker
+"""
+import threading
+from datetime import timedelta
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from blockchain.GlobalChain import flush_global_chain_events, submit_tender_event_to_global_chain
+from .models import Bid, ChainWrite, Tender
+
+SEALING_MODE = getattr(settings, 'BLOCKCHAIN_SEALING', 'thread')
+# Writes fetched per pass; the global events of a pass are submitted together,
+# so with BLOCKCHAIN_BATCH_WINDOW set they share blocks
+SEAL_BATCH_SIZE = 100
+# Seconds after which an unrenewed claim counts as abandoned; a claim is
+# renewed after every write, so this only has to exceed mining one block
+SEAL_CLAIM_TIMEOUT = getattr(settings, 'BLOCKCHAIN_SEAL_CLAIM_TIMEOUT', 300)
+
+# One sealer at a time per process; across processes the claims keep them apart
+_seal_lock = threading.Lock()
+
+_sealer_thread = None
+_sealer_thread_lock = threading.Lock()
+_sealer_wakeup = threading.Event()
+
+
+# --- Постановка в очередь ---
+
+def enqueue_local_block(tender, data):
+    """Queues a block for the tender's local chain (Chain 1)."""
+    write = ChainWrite.objects.create(kind='local', tender=tender, data=data)
+    wake_sealer()
+    return write
+
+
+def enqueue_global_event(tender, data, anchor=True, link=True):
+    """
+    Queues an event for the global chain (Chain 2).
+
+    With `anchor`, local_chain_root_hash is filled in at sealing time, after
+    every local block queued before it has been mined. With `link`, the
+    block hash is stored in tender.global_chain_link_hash.
+    """
+    write = ChainWrite.objects.create(
+        kind='global',
+        tender=tender,
+        data=data,
+        anchor_local_chain=anchor,
+        link_tender=link,
+        anchor_fallback=tender.get_local_chain_root_hash() if tender else '',
+    )
+    wake_sealer()
+    return write
+
+
+def record_tender_event(tender, local_data, global_data=None, link=True):
+    """
+    Queues the usual pair of writes: a local block, then the global event that
+    anchors it. Returns the queued ChainWrite rows (the pending receipts).
+    """
+    writes = [enqueue_local_block(tender, local_data)]
+    if global_data is not None:
+        writes.append(enqueue_global_event(tender, global_data, link=link))
+    return writes
+
+
+def enqueue_tender_deletion(tender, local_data, global_data):
+    """
+    Queues the deletion of `tender`: its local and global events, then a
+    'delete' write that removes the tender once both are sealed. Returns the
+    queued rows.
+
+    The tender is set to 'deleting' in the same transaction, so no bid or
+    edit is accepted until the deletion is done. Raises ValueError if the
+    tender has bids or is already being deleted. If the deletion is refused
+    when its turn comes (a write failed, or a bid got in anyway), the
+    'delete' write fails, the tender gets its status back and, if the
+    deletion was already sealed on a chain, a "Tender Deletion Aborted"
+    event is queued after it.
+    """
+    with transaction.atomic():
+        previous_status = Tender.objects.filter(pk=tender.pk).values_list('status', flat=True).first()
+        # Одним UPDATE: заявка, сохраненная в промежутке, или второе удаление не совпадут
+        marked = (
+            Tender.objects.filter(pk=tender.pk, status=previous_status)
+            .exclude(status='deleting')
+            .filter(~Exists(Bid.objects.filter(tender=OuterRef('pk'))))
+            .update(status='deleting')
+        )
+        if not marked:
+            raise ValueError("the tender has bids or is already being deleted")
+        tender.status = 'deleting'
+
+        writes = record_tender_event(tender, local_data, global_data, link=False)
+        writes.append(ChainWrite.objects.create(
+            kind='delete',
+            tender=tender,
+            data={
+                'action': 'Delete Tender',
+                'after': [write.pk for write in writes],
+                'previous_status': previous_status,
+            },
+        ))
+        wake_sealer()
+    return writes
+
+
+def build_tender_event_writes(tender, local_data, global_data=None, link=True):
+    """
+    Unsaved ChainWrite rows for the same pair of writes as record_tender_event,
+    for callers that queue many events at once with enqueue_writes.
+    """
+    writes = [ChainWrite(kind='local', tender=tender, data=local_data)]
+    if global_data is not None:
+        writes.append(ChainWrite(
+            kind='global',
+            tender=tender,
+            data=global_data,
+            anchor_local_chain=True,
+            link_tender=link,
+            anchor_fallback=tender.get_local_chain_root_hash(),
+        ))
+    return writes
+
+
+def enqueue_writes(writes):
+    """Inserts unsaved ChainWrite rows in one query, keeping their order."""
+    writes = ChainWrite.objects.bulk_create(writes)
+    if writes:
+        wake_sealer()
+    return writes
+
+
+# --- Запуск обработчика ---
+
+def wake_sealer():
+    """Starts sealing once the current transaction commits, according to SEALING_MODE."""
+    if SEALING_MODE == 'sync':
+        transaction.on_commit(seal_pending_writes)
+    elif SEALING_MODE == 'thread':
+        transaction.on_commit(_wake_sealer_thread)
+    # 'worker': run_chain_worker polls the queue on its own
+
+
+def _wake_sealer_thread():
+    global _sealer_thread
+    with _sealer_thread_lock:
+        if _sealer_thread is None or not _sealer_thread.is_alive():
+            _sealer_thread = threading.Thread(target=_sealer_loop, name='chain-sealer', daemon=True)
+            _sealer_thread.start()
+    _sealer_wakeup.set()
+
+
+def _sealer_loop():
+    while True:
+        _sealer_wakeup.wait()
+        _sealer_wakeup.clear()
+        try:
+            seal_pending_writes()
+        except Exception as exc:
+            # The claim is released, the rows are picked up on the next wakeup
+            print(f"Chain sealer error: {exc}")
+        finally:
+            close_old_connections()
+
+
+# --- Запечатывание ---
+
+def seal_pending_writes():
+    """
+    Mines every pending write in queue order. Returns the number processed.
+    Returns early if another process is sealing: it goes on until the queue
+    is empty, including the writes queued meanwhile.
+    """
+    processed = 0
+    with _seal_lock:
+        while True:
+            writes = claim_writes()
+            if not writes:
+                return processed
+            try:
+                _seal_batch(writes)
+            except BaseException:
+                # Не ждать истечения захвата: следующий проход возьмет те же записи
+                _release_claim(writes[0].claimed_by)
+                raise
+            processed += len(writes)
+
+
+def claim_writes(limit=SEAL_BATCH_SIZE):
+    """
+    Claims the oldest `limit` unsealed writes for this sealer and returns
+    them. Returns [] if there are none, or if another sealer holds a live
+    claim (its batch comes first in the queue).
+    """
+    token = uuid4().hex
+    now = timezone.now()
+    abandoned = Q(status='sealing', claimed_at__lt=now - timedelta(seconds=SEAL_CLAIM_TIMEOUT))
+    live_claims = ChainWrite.objects.filter(status='sealing').exclude(abandoned)
+    ids = list(
+        ChainWrite.objects.filter(status__in=('pending', 'sealing'))
+        .order_by('pk').values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    # Одним UPDATE: строки, захваченные другим обработчиком в промежутке, не совпадут
+    claimed = (
+        ChainWrite.objects.filter(Q(status='pending') | abandoned, pk__in=ids)
+        .filter(~Exists(live_claims))
+        .update(status='sealing', claimed_by=token, claimed_at=now)
+    )
+    if not claimed:
+        return []
+    return list(ChainWrite.objects.filter(status='sealing', claimed_by=token).select_related('tender').order_by('pk'))
+
+
+def _renew_claim(token):
+    ChainWrite.objects.filter(status='sealing', claimed_by=token).update(claimed_at=timezone.now())
+    return monotonic()
+
+
+def _release_claim(token):
+    ChainWrite.objects.filter(status='sealing', claimed_by=token).update(status='pending', claimed_by='')
+
+
+def _seal_batch(writes):
+    token = writes[0].claimed_by
+    renewed = monotonic()
+    submitted = []
+    for write in writes:
+        if monotonic() - renewed > SEAL_CLAIM_TIMEOUT / 3:
+            renewed = _renew_claim(token)
+        if write.kind == 'delete':
+            # Удаление ждет результата всех записей перед ним, в том числе глобальных
+            _collect_global_writes(submitted)
+            submitted = []
+        try:
+            if write.kind == 'local':
+                if write.tender is None:
+                    raise ValueError("tender no longer exists")
+                block = write.tender.add_block_to_chain(write.data)
+                _mark_sealed(write, block.index, block.hash)
+            elif write.kind == 'delete':
+                _delete_tender(write)
+            else:
+                if write.anchor_local_chain:
+                    # Сохраняем событие в том виде, в каком оно попадет в блок
+                    write.data = dict(write.data, local_chain_root_hash=_local_chain_root_hash(write))
+                submitted.append((write, submit_tender_event_to_global_chain(write.data)))
+        except Exception as exc:
+            _mark_failed(write, exc)
+
+    _renew_claim(token)
+    _collect_global_writes(submitted)
+
+
+def _collect_global_writes(submitted):
+    """Waits for the receipts of the submitted global events and records them."""
+    flush_global_chain_events()
+    for write, future in submitted:
+        try:
+            receipt = future.result()
+        except Exception as exc:
+            _mark_failed(write, exc)
+            continue
+        if write.link_tender and write.tender_id:
+            Tender.objects.filter(pk=write.tender_id).update(global_chain_link_hash=receipt['block_hash'])
+        write.receipt = receipt
+        _mark_sealed(write, receipt['block_index'], receipt['block_hash'])
+
+
+def _delete_tender(write):
+    tender = write.tender
+    if tender is None:
+        raise ValueError("tender no longer exists")
+    statuses = dict(ChainWrite.objects.filter(pk__in=write.data['after']).values_list('pk', 'status'))
+    unsealed = [pk for pk in write.data['after'] if statuses.get(pk) != 'sealed']
+    if unsealed:
+        reason = f"chain writes {unsealed} were not sealed"
+    elif tender.bids.exists():
+        reason = "the tender has bids"
+    else:
+        tender.delete()
+        # SET_NULL уже обнулил строку в БД
+        write.tender = None
+        _mark_sealed(write, None, None)
+        return
+
+    _abort_tender_deletion(write, reason, recorded='sealed' in statuses.values())
+    raise ValueError(f"{reason}; the tender is kept")
+
+
+def _abort_tender_deletion(write, reason, recorded):
+    """
+    Gives the tender its status back and, if the deletion was `recorded` on
+    a chain, queues events saying it did not happen. They are not sealed
+    here: the running sealer picks them up on its next pass.
+    """
+    tender = write.tender
+    Tender.objects.filter(pk=tender.pk, status='deleting').update(status=write.data.get('previous_status'))
+    if not recorded:
+        return
+    ChainWrite.objects.bulk_create(build_tender_event_writes(
+        tender,
+        {'action': 'Tender Deletion Aborted (Local)', 'reason': reason},
+        {'action': 'Tender Deletion Aborted (Global)', 'tender_id': tender.pk, 'title': tender.title},
+    ))
+
+
+def _local_chain_root_hash(write):
+    """Current head of the tender's local chain; the value seen at enqueue time if the tender is gone."""
+    head_hash = None
+    if write.tender_id:
+        head_hash = Tender.objects.filter(pk=write.tender_id).values_list('local_chain_head_hash', flat=True).first()
+    return head_hash or write.anchor_fallback or '0'
+
+
+def _mark_sealed(write, block_index, block_hash):
+    write.status = 'sealed'
+    write.block_index = block_index
+    write.block_hash = block_hash
+    write.sealed_at = timezone.now()
+    write.save(update_fields=['status', 'block_index', 'block_hash', 'data', 'receipt', 'sealed_at'])
+
+
+def _mark_failed(write, exc):
+    write.status = 'failed'
+    write.error = str(exc)
+    write.sealed_at = timezone.now()
+    write.save(update_fields=['status', 'error', 'data', 'sealed_at'])
+    print(f"Chain write {write.pk} failed: {exc}")
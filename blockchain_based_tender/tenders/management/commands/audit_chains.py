@@ -0,0 +1,187 @@
+import json
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blockchain.Batcher import iter_block_events
+from blockchain.Block import Block
+from blockchain.Chain import find_invalid_block
+from blockchain.GlobalChain import get_global_chain
+from blockchain.Storage import RECORD_FIELDS
+from tenders.models import Tender, TenderChainBlock
+
+
+def audit_tender_batch(batch):
+    """
+    Runs in a worker process. `batch` is a list of
+    (tender_id, head_hash, length, records, anchored_hashes) tuples; returns
+    the list of mismatches found.
+    """
+    mismatches = []
+    for tender_id, head_hash, length, records, anchored_hashes in batch:
+        chain = [Block.from_dict(dict(zip(RECORD_FIELDS, record))) for record in records]
+
+        failure = find_invalid_block(chain)
+        if failure:
+            mismatches.append({
+                'type': 'local_chain_invalid',
+                'tender_id': tender_id,
+                'block_index': failure[0],
+                'detail': failure[1],
+            })
+
+        for position, block in enumerate(chain):
+            if block.index != position:
+                mismatches.append({
+                    'type': 'local_chain_gap',
+                    'tender_id': tender_id,
+                    'block_index': position,
+                    'detail': f"expected index {position}, found {block.index}",
+                })
+                break
+
+        actual_head = chain[-1].hash if chain else None
+        if len(chain) != length or actual_head != head_hash:
+            mismatches.append({
+                'type': 'local_chain_head_mismatch',
+                'tender_id': tender_id,
+                'detail': f"Tender records {length} blocks ending in {head_hash}, "
+                          f"table has {len(chain)} ending in {actual_head}",
+            })
+
+        local_hashes = {block.hash for block in chain}
+        for global_index, root_hash in anchored_hashes:
+            if root_hash in local_hashes or (root_hash == '0' and not chain):
+                continue
+            mismatches.append({
+                'type': 'anchor_not_found',
+                'tender_id': tender_id,
+                'global_block_index': global_index,
+                'detail': f"local_chain_root_hash {root_hash} is not a block of the local chain",
+            })
+    return mismatches
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifies every tender's local chain and reconciles the anchors recorded in the "
+        "global chain, in parallel. Writes one JSON object per mismatch, then a summary line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=500, help="Tenders per database batch / worker task")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            summary = self.audit(output, options['workers'], options['batch_size'])
+        finally:
+            if options['output']:
+                output.close()
+        if summary['mismatches']:
+            raise CommandError(f"{summary['mismatches']} mismatches found.")
+
+    def audit(self, output, workers, batch_size):
+        def report(entry):
+            output.write(json.dumps(entry) + '\n')
+
+        global_chain = get_global_chain()
+        global_result = global_chain.validate(full=True)
+        if not global_result:
+            report({'type': 'global_chain_invalid', **global_result.to_dict()})
+
+        # tender_id -> [(global block index, anchored local hash)]
+        anchors = defaultdict(list)
+        deleted_tender_ids = set()
+        for block in global_chain.chain:
+            for _, data in iter_block_events(block):
+                if isinstance(data, dict) and 'tender_id' in data:
+                    if data.get('local_chain_root_hash') is not None:
+                        anchors[data['tender_id']].append((block.index, data['local_chain_root_hash']))
+                    if data.get('action') == 'Tender Deleted (Global)':
+                        deleted_tender_ids.add(data['tender_id'])
+
+        mismatch_count = int(not global_result)
+        tender_count = 0
+        seen_tender_ids = set()
+
+        # Worker processes must not inherit open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+
+            def collect(future):
+                nonlocal mismatch_count
+                for mismatch in future.result():
+                    report(mismatch)
+                    mismatch_count += 1
+
+            for tenders, batch in self.iter_batches(batch_size, anchors):
+                tender_count += len(tenders)
+                for tender_id, link_hash in tenders:
+                    seen_tender_ids.add(tender_id)
+                    if link_hash and global_chain.get_block_by_hash(link_hash) is None:
+                        report({
+                            'type': 'global_link_missing',
+                            'tender_id': tender_id,
+                            'detail': f"global_chain_link_hash {link_hash} is not a block of the global chain",
+                        })
+                        mismatch_count += 1
+
+                pending.append(executor.submit(audit_tender_batch, batch))
+                # Keep a bounded number of batches in flight
+                if len(pending) >= workers * 2:
+                    collect(pending.popleft())
+
+            while pending:
+                collect(pending.popleft())
+
+        for tender_id in anchors.keys() - seen_tender_ids - deleted_tender_ids:
+            report({
+                'type': 'tender_missing',
+                'tender_id': tender_id,
+                'detail': "anchored in the global chain but not in the database",
+            })
+            mismatch_count += 1
+
+        summary = {
+            'type': 'summary',
+            'tenders': tender_count,
+            'global_blocks': len(global_chain.chain),
+            'mismatches': mismatch_count,
+        }
+        report(summary)
+        return summary
+
+    def iter_batches(self, batch_size, anchors):
+        """
+        Streams tenders by primary key and yields ([(id, link hash)], worker batch) pairs.
+        """
+        last_pk = 0
+        while True:
+            tenders = list(
+                Tender.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'local_chain_head_hash', 'local_chain_length', 'global_chain_link_hash'
+                )[:batch_size]
+            )
+            if not tenders:
+                return
+            last_pk = tenders[-1][0]
+
+            records = defaultdict(list)
+            blocks = TenderChainBlock.objects.filter(
+                tender_id__in=[row[0] for row in tenders]
+            ).order_by('tender_id', 'index').values_list('tender_id', *RECORD_FIELDS)
+            for row in blocks.iterator(chunk_size=2000):
+                records[row[0]].append(row[1:])
+
+            batch = [
+                (pk, head_hash, length, records.get(pk, []), anchors.get(pk, []))
+                for pk, head_hash, length, _ in tenders
+            ]
+            yield [(pk, link_hash) for pk, _, _, link_hash in tenders], batch
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from tenders.models import Bid, Tender
+from tenders.serializers import BidSerializer, TenderSerializer, ValuesReader
+from users.models import Bidder
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the model serializers with the ValuesReader fast path on large list pages. "
+        "Sample rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3, help="Best of this many runs is reported")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tenders, bids = self.create_rows(options['rows'])
+            context = {'request': Request(APIRequestFactory().get('/api/tenders/', SERVER_NAME='localhost'))}
+            self.compare('tenders', TenderSerializer, tenders, context, options['repeat'])
+            self.compare('bids', BidSerializer, bids, context, options['repeat'])
+            transaction.set_rollback(True)
+
+    def create_rows(self, rows):
+        creator = Bidder.objects.create(username='benchmark-creator', email='benchmark-creator@example.com')
+        bidder = Bidder.objects.create(username='benchmark-bidder', email='benchmark-bidder@example.com')
+        deadline = timezone.now() + timedelta(days=30)
+        tenders = Tender.objects.bulk_create([
+            Tender(title=f"Tender {i}", description="Supply of equipment", budget=1000 + i,
+                   deadline=deadline, creator=creator)
+            for i in range(rows)
+        ])
+        Bid.objects.bulk_create([
+            Bid(tender=tender, bidder=bidder, price=500 + i, proposal="Proposal")
+            for i, tender in enumerate(tenders)
+        ])
+        ids = [tender.pk for tender in tenders]
+        return (
+            Tender.objects.filter(pk__in=ids).select_related('creator').order_by('-id'),
+            Bid.objects.filter(tender_id__in=ids).select_related('bidder').order_by('-id'),
+        )
+
+    def compare(self, label, serializer_class, queryset, context, repeat):
+        renderer = JSONRenderer()
+
+        def model_serializer():
+            return renderer.render(serializer_class(queryset.all(), many=True, context=context).data)
+
+        def values_reader():
+            reader = ValuesReader(serializer_class(context=context))
+            return renderer.render(reader.to_representation(reader.values(queryset.all())))
+
+        timings = {}
+        outputs = {}
+        for name, run in (('ModelSerializer', model_serializer), ('ValuesReader', values_reader)):
+            best = None
+            for _ in range(repeat):
+                start = perf_counter()
+                outputs[name] = run()
+                elapsed = perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+
+        if outputs['ModelSerializer'] != outputs['ValuesReader']:
+            raise CommandError(f"{label}: ValuesReader output differs from {serializer_class.__name__}")
+        rows = queryset.count()
+        self.stdout.write(
+            f"{label} ({rows} rows, {len(outputs['ValuesReader'])} bytes): "
+            f"ModelSerializer {timings['ModelSerializer']:.3f}s, ValuesReader {timings['ValuesReader']:.3f}s, "
+            f"x{timings['ModelSerializer'] / timings['ValuesReader']:.1f}"
+        )
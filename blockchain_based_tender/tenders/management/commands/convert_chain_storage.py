@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blockchain.Storage import CHAIN_FILE_FORMATS, ChainStorageError, convert_chain_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Converts a chain file between the JSON array, append-only log and compact "
+        "binary formats. The source format is detected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Existing chain file")
+        parser.add_argument('destination', help="File to write")
+        parser.add_argument(
+            '--to', choices=CHAIN_FILE_FORMATS, default='log',
+            help="Target format (default: log)"
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        destination = options['destination']
+        if source == destination:
+            raise CommandError("Source and destination must be different files.")
+
+        try:
+            count = convert_chain_file(source, destination, options['to'])
+        except (OSError, ValueError, ChainStorageError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} blocks to {destination}."))
@@ -0,0 +1,29 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tenders.chain_writes import seal_pending_writes
+
+
+class Command(BaseCommand):
+    help = (
+        "Seals queued chain writes (tenders.ChainWrite) in order. "
+        "Use with BLOCKCHAIN_SEALING = 'worker'. Several instances may run: "
+        "each batch is claimed by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds between polls of an empty queue")
+        parser.add_argument('--once', action='store_true', help="Seal what is pending and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = seal_pending_writes()
+            close_old_connections()
+            if processed:
+                self.stdout.write(f"Processed {processed} chain writes.")
+            if options['once']:
+                return
+            if not processed:
+                sleep(options['interval'])
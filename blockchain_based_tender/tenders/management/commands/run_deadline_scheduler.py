@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from tenders.scheduler import DeadlineScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Closes tenders as their deadlines pass and selects the winners. "
+        "Run a single instance alongside the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval', type=float, default=5.0,
+            help="Seconds between checks for new or edited tenders"
+        )
+        parser.add_argument('--once', action='store_true', help="Process what is due now and exit (e.g. from cron)")
+
+    def handle(self, *args, **options):
+        scheduler = DeadlineScheduler(poll_interval=options['poll_interval'])
+        if options['once']:
+            processed = scheduler.run_once()
+            self.stdout.write(f"Processed {processed} tenders.")
+            return
+        scheduler.run_forever()
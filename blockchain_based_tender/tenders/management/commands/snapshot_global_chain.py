@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blockchain.GlobalChain import get_global_chain
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a snapshot of the global chain now, so workers start from it "
+        "instead of loading every block (see BLOCKCHAIN_SNAPSHOT_INTERVAL)."
+    )
+
+    def handle(self, *args, **options):
+        count = get_global_chain().write_snapshot()
+        if not count:
+            raise CommandError(
+                "No snapshot written: it needs BLOCKCHAIN_SNAPSHOT_INTERVAL, 'log', 'binary' "
+                "or 'database' BLOCKCHAIN_STORAGE and at least one stored block."
+            )
+        self.stdout.write(f"Snapshot of {count} blocks written.")
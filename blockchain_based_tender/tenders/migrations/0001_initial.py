@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Предлагаемая цена')),
+                ('proposal', models.TextField(blank=True, verbose_name='Предложение')),
+                ('quality_score', models.IntegerField(blank=True, null=True, verbose_name='Оценка качества (0-100)')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Дата подачи')),
+            ],
+            options={
+                'verbose_name': 'Заявка (Бид)',
+                'verbose_name_plural': 'Заявки (Биды)',
+                'ordering': ['price', '-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tender',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=200, null=True, verbose_name='Название тендера')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Описание')),
+                ('budget', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Бюджет')),
+                ('deadline', models.DateTimeField(blank=True, null=True, verbose_name='Срок подачи заявок')),
+                ('status', models.CharField(blank=True, choices=[('active', 'Активный'), ('closed', 'Закрыт'), ('awarded', 'Награжден'), ('cancelled', 'Отменен')], default='active', max_length=10, null=True, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Дата создания')),
+                ('blockchain_data', models.TextField(blank=True, default='[]', null=True, verbose_name='Данные локальной блокчейн-цепочки (Биды)')),
+                ('global_chain_link_hash', models.CharField(blank=True, max_length=64, null=True, verbose_name='Якорный хэш Глобальной Цепочки')),
+                ('currency', models.CharField(blank=True, choices=[('USD', 'USD ($)'), ('EUR', 'EUR (€)'), ('RUB', 'RUB (₽)'), ('UZS', 'UZS (сум)')], default='USD', max_length=3, null=True, verbose_name='Валюта')),
+            ],
+        ),
+    ]
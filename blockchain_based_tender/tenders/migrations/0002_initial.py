@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='bidder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='placed_bids', to=settings.AUTH_USER_MODEL, verbose_name='Участник'),
+        ),
+        migrations.AddField(
+            model_name='tender',
+            name='awarded_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tender_award', to='tenders.bid', verbose_name='Выигравшая заявка'),
+        ),
+        migrations.AddField(
+            model_name='tender',
+            name='creator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='created_tenders', to=settings.AUTH_USER_MODEL, verbose_name='Создатель'),
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='tender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='tenders.tender', verbose_name='Тендер'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bid',
+            unique_together={('tender', 'bidder')},
+        ),
+    ]
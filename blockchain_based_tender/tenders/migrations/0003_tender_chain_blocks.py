@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:46
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+RECORD_FIELDS = ('index', 'timestamp', 'data', 'previous_hash', 'hash', 'nonce')
+
+
+def copy_blobs_to_blocks(apps, schema_editor):
+    """Moves every Tender.blockchain_data JSON list into TenderChainBlock rows."""
+    Tender = apps.get_model('tenders', 'Tender')
+    TenderChainBlock = apps.get_model('tenders', 'TenderChainBlock')
+
+    tenders = Tender.objects.exclude(blockchain_data__isnull=True).exclude(blockchain_data__in=['', '[]'])
+    for tender in tenders.only('pk', 'blockchain_data').iterator(chunk_size=BATCH_SIZE):
+        try:
+            chain_list = json.loads(tender.blockchain_data)
+        except json.JSONDecodeError:
+            continue
+        if not chain_list:
+            continue
+        TenderChainBlock.objects.bulk_create(
+            [TenderChainBlock(tender_id=tender.pk, **{f: record[f] for f in RECORD_FIELDS}) for record in chain_list],
+            batch_size=BATCH_SIZE,
+        )
+        Tender.objects.filter(pk=tender.pk).update(
+            local_chain_head_hash=chain_list[-1]['hash'],
+            local_chain_length=len(chain_list),
+        )
+
+
+def copy_blocks_to_blobs(apps, schema_editor):
+    Tender = apps.get_model('tenders', 'Tender')
+    TenderChainBlock = apps.get_model('tenders', 'TenderChainBlock')
+
+    for tender in Tender.objects.filter(local_chain_length__gt=0).only('pk').iterator(chunk_size=BATCH_SIZE):
+        chain_list = list(
+            TenderChainBlock.objects.filter(tender_id=tender.pk).order_by('index').values(*RECORD_FIELDS)
+        )
+        Tender.objects.filter(pk=tender.pk).update(blockchain_data=json.dumps(chain_list))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tender',
+            name='local_chain_head_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Хэш последнего блока локальной цепочки'),
+        ),
+        migrations.AddField(
+            model_name='tender',
+            name='local_chain_length',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число блоков локальной цепочки'),
+        ),
+        migrations.CreateModel(
+            name='TenderChainBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Индекс блока')),
+                ('timestamp', models.FloatField(verbose_name='Время блока')),
+                ('data', models.JSONField(blank=True, null=True, verbose_name='Данные блока')),
+                ('previous_hash', models.CharField(max_length=64, verbose_name='Хэш предыдущего блока')),
+                ('hash', models.CharField(max_length=64, verbose_name='Хэш блока')),
+                ('nonce', models.PositiveBigIntegerField(default=0, verbose_name='Nonce')),
+                ('tender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chain_blocks', to='tenders.tender', verbose_name='Тендер')),
+            ],
+            options={
+                'verbose_name': 'Блок локальной цепочки',
+                'verbose_name_plural': 'Блоки локальной цепочки',
+                'ordering': ['tender', 'index'],
+                'unique_together': {('tender', 'index')},
+            },
+        ),
+        migrations.RunPython(copy_blobs_to_blocks, copy_blocks_to_blobs),
+        migrations.RemoveField(
+            model_name='tender',
+            name='blockchain_data',
+        ),
+    ]
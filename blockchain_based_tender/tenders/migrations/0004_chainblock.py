@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0003_tender_chain_blocks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(max_length=50, verbose_name='Цепочка')),
+                ('index', models.PositiveIntegerField(verbose_name='Индекс блока')),
+                ('timestamp', models.FloatField(verbose_name='Время блока')),
+                ('data', models.JSONField(blank=True, null=True, verbose_name='Данные блока')),
+                ('previous_hash', models.CharField(max_length=64, verbose_name='Хэш предыдущего блока')),
+                ('hash', models.CharField(max_length=64, verbose_name='Хэш блока')),
+                ('nonce', models.PositiveBigIntegerField(default=0, verbose_name='Nonce')),
+            ],
+            options={
+                'verbose_name': 'Блок цепочки',
+                'verbose_name_plural': 'Блоки цепочек',
+                'ordering': ['chain', 'index'],
+                'unique_together': {('chain', 'index')},
+            },
+        ),
+    ]
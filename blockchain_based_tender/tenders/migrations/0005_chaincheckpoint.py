@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0004_chainblock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain', models.CharField(max_length=50, unique=True, verbose_name='Цепочка')),
+                ('index', models.PositiveIntegerField(verbose_name='Индекс проверенного блока')),
+                ('hash', models.CharField(max_length=64, verbose_name='Хэш проверенного блока')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата проверки')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка цепочки',
+                'verbose_name_plural': 'Контрольные точки цепочек',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0005_chaincheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainWrite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('local', 'Локальная цепочка'), ('global', 'Глобальная цепочка')], max_length=10, verbose_name='Цепочка')),
+                ('data', models.JSONField(verbose_name='Данные события')),
+                ('anchor_local_chain', models.BooleanField(default=False, verbose_name='Якорить локальную цепочку')),
+                ('link_tender', models.BooleanField(default=False, verbose_name='Обновить якорный хэш тендера')),
+                ('anchor_fallback', models.CharField(blank=True, max_length=64, verbose_name='Якорь на момент постановки')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('sealed', 'Запечатан'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Статус')),
+                ('block_index', models.PositiveIntegerField(blank=True, null=True, verbose_name='Индекс блока')),
+                ('block_hash', models.CharField(blank=True, max_length=64, null=True, verbose_name='Хэш блока')),
+                ('receipt', models.JSONField(blank=True, null=True, verbose_name='Квитанция включения')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Поставлено в очередь')),
+                ('sealed_at', models.DateTimeField(blank=True, null=True, verbose_name='Запечатано')),
+                ('tender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chain_writes', to='tenders.tender', verbose_name='Тендер')),
+            ],
+            options={
+                'verbose_name': 'Запись в цепочку',
+                'verbose_name_plural': 'Очередь записей в цепочки',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0006_chainwrite'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['tender', 'price'], name='bid_tender_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['status', 'deadline'], name='tender_status_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['awarded_bid', 'status'], name='tender_awarded_bid_status_idx'),
+        ),
+    ]
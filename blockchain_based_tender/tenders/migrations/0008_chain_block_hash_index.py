@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tenderchainblock',
+            index=models.Index(fields=['tender', 'hash'], name='tender_chain_block_hash_idx'),
+        ),
+    ]
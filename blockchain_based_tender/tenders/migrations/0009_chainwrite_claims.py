@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0008_chain_block_hash_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chainwrite',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Захвачено'),
+        ),
+        migrations.AddField(
+            model_name='chainwrite',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Захвачено обработчиком'),
+        ),
+        migrations.AlterField(
+            model_name='chainwrite',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает'), ('sealing', 'Запечатывается'), ('sealed', 'Запечатан'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0009_chainwrite_claims'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chainwrite',
+            name='kind',
+            field=models.CharField(choices=[('local', 'Локальная цепочка'), ('global', 'Глобальная цепочка'), ('delete', 'Удаление тендера')], max_length=10, verbose_name='Цепочка'),
+        ),
+    ]
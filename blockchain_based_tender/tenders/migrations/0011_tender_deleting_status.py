@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenders', '0010_chainwrite_delete_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tender',
+            name='status',
+            field=models.CharField(blank=True, choices=[('active', 'Активный'), ('closed', 'Закрыт'), ('awarded', 'Награжден'), ('cancelled', 'Отменен'), ('deleting', 'Удаляется')], default='active', max_length=10, null=True, verbose_name='Статус'),
+        ),
+    ]
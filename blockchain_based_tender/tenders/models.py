@@ -1,8 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings 
 from django.utils import timezone
-import json
 from django.core.exceptions import ValidationError
+from time import time
 
 User = settings.AUTH_USER_MODEL
 
@@ -12,6 +12,9 @@ class Tender(models.Model):
         ('closed', 'Закрыт'),
         ('awarded', 'Награжден'),
         ('cancelled', 'Отменен'),
+        # Удаление поставлено в очередь (см. chain_writes.enqueue_tender_deletion):
+        # заявки и правки не принимаются
+        ('deleting', 'Удаляется'),
     ]
 
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tenders', verbose_name="Создатель", null=True, blank=True)
@@ -25,7 +28,9 @@ class Tender(models.Model):
     awarded_bid = models.ForeignKey('Bid', on_delete=models.SET_NULL, null=True, blank=True, related_name='tender_award', verbose_name="Выигравшая заявка")
 
     # --- Цепочка 1 (Локальная цепочка тендера) ---
-    blockchain_data = models.TextField(default='[]', verbose_name="Данные локальной блокчейн-цепочки (Биды)", blank=True, null=True)
+    # Блоки хранятся построчно в TenderChainBlock; здесь только голова цепочки
+    local_chain_head_hash = models.CharField(max_length=64, blank=True, null=True, verbose_name="Хэш последнего блока локальной цепочки")
+    local_chain_length = models.PositiveIntegerField(default=0, verbose_name="Число блоков локальной цепочки")
     
     # --- Цепочка 2 (Глобальная цепочка) ---
     # Хэш, связывающий этот тендер с блоком в Глобальной Цепочке
@@ -43,39 +48,71 @@ class Tender(models.Model):
         return self.deadline < timezone.now()
 
     # --- МЕТОДЫ ДЛЯ ЦЕПОЧКИ 1 (Локальная) ---
+    LOCAL_CHAIN_DIFFICULTY = 2
+
+    def get_local_chain_records(self):
+        """Возвращает блоки локальной цепочки в виде списка словарей (по порядку индексов)."""
+        return list(
+            self.chain_blocks.order_by('index').values(*TenderChainBlock.RECORD_FIELDS)
+        )
+
     def get_blockchain_instance(self):
-        """Возвращает экземпляр локальной цепочки, загруженный из blockchain_data."""
+        """Возвращает экземпляр локальной цепочки, загруженный из TenderChainBlock."""
         from blockchain.Chain import Blockchain
-        
-        try:
-            chain_list = json.loads(self.blockchain_data)
-        except json.JSONDecodeError:
-            chain_list = []
-        
+
+        chain_list = self.get_local_chain_records()
+
         # Если данные сохранены, загружаем из них
         if chain_list:
-             return Blockchain.load_from_list_of_dicts(chain_list)
+             return Blockchain.load_from_list_of_dicts(chain_list, difficulty=self.LOCAL_CHAIN_DIFFICULTY)
 
-        # Иначе, создаем новый экземпляр
+        # Иначе, создаем новый экземпляр в памяти
         # Для нового экземпляра Chain.py автоматически добавит генезис-блок
-        return Blockchain(genesis_data={'message': f'Tender {self.pk} Bids Chain initialized (Chain 1)'})
-
-    def save_blockchain(self, blockchain_instance):
-        """Сохраняет экземпляр локальной цепочки обратно в blockchain_data."""
-        self.blockchain_data = json.dumps(blockchain_instance.to_list_of_dicts())
-        self.save()
+        return Blockchain(
+            difficulty=self.LOCAL_CHAIN_DIFFICULTY,
+            genesis_data={'message': f'Tender {self.pk} Bids Chain initialized (Chain 1)'},
+            storage='memory',
+        )
 
     def add_block_to_chain(self, data):
-        """Загружает, добавляет блок и сохраняет локальную цепочку."""
-        blockchain = self.get_blockchain_instance()
-        blockchain.add_block(data)
-        self.save_blockchain(blockchain)
+        """
+        Добыть и добавить блок в локальную цепочку.
+        Читает только голову цепочки и вставляет одну строку, сколько бы блоков уже ни было.
+        """
+        from blockchain.Block import Block
+        from blockchain.Chain import mine_genesis_block
+
+        with transaction.atomic():
+            length, head_hash = (
+                Tender.objects.select_for_update()
+                .values_list('local_chain_length', 'local_chain_head_hash')
+                .get(pk=self.pk)
+            )
+            new_blocks = []
+            if not length:
+                # Первый блок цепочки - генезис, как в Blockchain.create_genesis_block
+                genesis_block = mine_genesis_block(self.LOCAL_CHAIN_DIFFICULTY)
+                new_blocks.append(genesis_block)
+                head_hash = genesis_block.hash
+
+            new_block = Block(length + len(new_blocks), time(), data, head_hash)
+            new_block.mine_block(self.LOCAL_CHAIN_DIFFICULTY)
+            new_blocks.append(new_block)
+
+            TenderChainBlock.objects.bulk_create(
+                [TenderChainBlock.from_block(self, block) for block in new_blocks]
+            )
+            self._set_local_chain_head(new_block.hash, new_block.index + 1)
+        return new_block
+
+    def _set_local_chain_head(self, head_hash, length):
+        Tender.objects.filter(pk=self.pk).update(local_chain_head_hash=head_hash, local_chain_length=length)
+        self.local_chain_head_hash = head_hash
+        self.local_chain_length = length
         
     def get_local_chain_root_hash(self):
         """Возвращает хэш последнего блока локальной цепочки (для якорения)."""
-        blockchain = self.get_blockchain_instance()
-        # Возвращаем хэш последнего блока
-        return blockchain.chain[-1].hash if blockchain.chain else '0'
+        return self.local_chain_head_hash or '0'
     
     # In Tender model, add this method
     def get_budget_currency_display(self):
@@ -101,6 +138,167 @@ class Tender(models.Model):
     )
     # ---------------------------------
 
+    class Meta:
+        indexes = [
+            # Планировщик сроков и список тендеров: status = ? AND deadline < ? / ORDER BY deadline
+            models.Index(fields=['status', 'deadline'], name='tender_status_deadline_idx'),
+            # Bidder.get_won_tenders: awarded_bid -> bidder, status = 'awarded'
+            models.Index(fields=['awarded_bid', 'status'], name='tender_awarded_bid_status_idx'),
+        ]
+
+class TenderChainBlock(models.Model):
+    """Один блок локальной цепочки тендера (Цепочка 1)."""
+    RECORD_FIELDS = ('index', 'timestamp', 'data', 'previous_hash', 'hash', 'nonce')
+
+    tender = models.ForeignKey(
+        Tender,
+        on_delete=models.CASCADE,
+        related_name='chain_blocks',
+        verbose_name="Тендер"
+    )
+    index = models.PositiveIntegerField(verbose_name="Индекс блока")
+    # Время в секундах (float), как в Block.timestamp - участвует в хэше
+    timestamp = models.FloatField(verbose_name="Время блока")
+    data = models.JSONField(verbose_name="Данные блока", null=True, blank=True)
+    previous_hash = models.CharField(max_length=64, verbose_name="Хэш предыдущего блока")
+    hash = models.CharField(max_length=64, verbose_name="Хэш блока")
+    nonce = models.PositiveBigIntegerField(default=0, verbose_name="Nonce")
+
+    class Meta:
+        verbose_name = "Блок локальной цепочки"
+        verbose_name_plural = "Блоки локальной цепочки"
+        unique_together = ('tender', 'index')
+        ordering = ['tender', 'index']
+        indexes = [
+            # API страниц блоков: ?before_hash= внутри цепочки тендера
+            models.Index(fields=['tender', 'hash'], name='tender_chain_block_hash_idx'),
+        ]
+
+    def __str__(self):
+        return f"Block {self.index} of tender {self.tender_id}"
+
+    @classmethod
+    def from_block(cls, tender, block):
+        return cls(
+            tender=tender,
+            index=block.index,
+            timestamp=block.timestamp,
+            data=block.data,
+            previous_hash=block.previous_hash,
+            hash=block.hash,
+            nonce=block.nonce,
+        )
+
+
+class ChainBlock(models.Model):
+    """
+    Блок произвольной цепочки, хранимой в БД (Storage.DatabaseStorage),
+    например глобальной при BLOCKCHAIN_STORAGE = 'database'.
+    """
+    chain = models.CharField(max_length=50, verbose_name="Цепочка")
+    index = models.PositiveIntegerField(verbose_name="Индекс блока")
+    timestamp = models.FloatField(verbose_name="Время блока")
+    data = models.JSONField(verbose_name="Данные блока", null=True, blank=True)
+    previous_hash = models.CharField(max_length=64, verbose_name="Хэш предыдущего блока")
+    hash = models.CharField(max_length=64, verbose_name="Хэш блока")
+    nonce = models.PositiveBigIntegerField(default=0, verbose_name="Nonce")
+
+    class Meta:
+        verbose_name = "Блок цепочки"
+        verbose_name_plural = "Блоки цепочек"
+        unique_together = ('chain', 'index')
+        ordering = ['chain', 'index']
+
+    def __str__(self):
+        return f"Block {self.index} of {self.chain} chain"
+
+
+class ChainCheckpoint(models.Model):
+    """Последний проверенный блок цепочки из ChainBlock (см. Blockchain.validate)."""
+    chain = models.CharField(max_length=50, unique=True, verbose_name="Цепочка")
+    index = models.PositiveIntegerField(verbose_name="Индекс проверенного блока")
+    hash = models.CharField(max_length=64, verbose_name="Хэш проверенного блока")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата проверки")
+
+    class Meta:
+        verbose_name = "Контрольная точка цепочки"
+        verbose_name_plural = "Контрольные точки цепочек"
+
+    def __str__(self):
+        return f"{self.chain} verified up to block {self.index}"
+
+
+class ChainWrite(models.Model):
+    """
+    Запись в очереди на запечатывание (см. tenders.chain_writes).
+    Представления ставят события в очередь и сразу получают квитанцию;
+    блоки добываются фоновым обработчиком строго в порядке id.
+    Перед добычей обработчик захватывает записи (status = 'sealing', claimed_by),
+    поэтому несколько процессов не запечатают одну запись дважды.
+    """
+    KIND_CHOICES = [
+        ('local', 'Локальная цепочка'),
+        ('global', 'Глобальная цепочка'),
+        # Не блок: удаление тендера после запечатывания записей data['after']
+        ('delete', 'Удаление тендера'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('sealing', 'Запечатывается'),
+        ('sealed', 'Запечатан'),
+        ('failed', 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Цепочка")
+    # SET_NULL: квитанция об удалении тендера должна пережить сам тендер
+    tender = models.ForeignKey(
+        Tender,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='chain_writes',
+        verbose_name="Тендер"
+    )
+    data = models.JSONField(verbose_name="Данные события")
+    # Подставить local_chain_root_hash в момент запечатывания (голова к тому времени уже известна)
+    anchor_local_chain = models.BooleanField(default=False, verbose_name="Якорить локальную цепочку")
+    # Сохранить хэш блока в Tender.global_chain_link_hash
+    link_tender = models.BooleanField(default=False, verbose_name="Обновить якорный хэш тендера")
+    # Используется, если тендер удален до запечатывания
+    anchor_fallback = models.CharField(max_length=64, blank=True, verbose_name="Якорь на момент постановки")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Статус")
+    # Обработчик, захвативший запись, и время последнего продления захвата
+    claimed_by = models.CharField(max_length=32, blank=True, verbose_name="Захвачено обработчиком")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Захвачено")
+    block_index = models.PositiveIntegerField(null=True, blank=True, verbose_name="Индекс блока")
+    block_hash = models.CharField(max_length=64, blank=True, null=True, verbose_name="Хэш блока")
+    receipt = models.JSONField(null=True, blank=True, verbose_name="Квитанция включения")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Поставлено в очередь")
+    sealed_at = models.DateTimeField(null=True, blank=True, verbose_name="Запечатано")
+
+    class Meta:
+        verbose_name = "Запись в цепочку"
+        verbose_name_plural = "Очередь записей в цепочки"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.kind} write {self.pk} ({self.status})"
+
+    def to_receipt(self):
+        """Квитанция для ответа API: пока запись не запечатана, хэша блока еще нет."""
+        return {
+            'id': self.pk,
+            'kind': self.kind,
+            'tender_id': self.tender_id,
+            'status': self.status,
+            'block_index': self.block_index,
+            'block_hash': self.block_hash,
+            'error': self.error or None,
+        }
+
+
 # === NEW MODEL: Bid ===
 class Bid(models.Model):
     tender = models.ForeignKey(
@@ -137,9 +335,14 @@ class Bid(models.Model):
         verbose_name = "Заявка (Бид)"
         verbose_name_plural = "Заявки (Биды)"
         # Ensure a user can only place one bid per tender (optional, but good practice)
+        # The unique index also serves the (tender, bidder) lookups in tender_detail and BidViewSet
         unique_together = ('tender', 'bidder')
         # We sort by price ascending (lowest bid first)
         ordering = ['price', '-timestamp']
+        indexes = [
+            # Bids of a tender by price: tender_detail and winner selection
+            models.Index(fields=['tender', 'price'], name='bid_tender_price_idx'),
+        ]
 
     def __str__(self):
         return f"Bid of {self.price} by {self.bidder.username} for {self.tender.title}"
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class NewestFirstCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, newest first. The cursor holds the
+    last id seen, so every page is one index range scan however deep it is,
+    and rows added meanwhile do not shift the pages.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
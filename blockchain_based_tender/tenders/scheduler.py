@@ -0,0 +1,171 @@
+"""
+Deadline scheduler: closes tenders when their deadline passes and awards
+them to the lowest bid. Runs outside the web requests, as
+
+    python manage.py run_deadline_scheduler
+"""
+import heapq
+from time import sleep
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .chain_writes import build_tender_event_writes, enqueue_writes
+from .models import Bid, Tender
+
+
+def lowest_bids(tender_ids):
+    """
+    Returns {tender_id: lowest bid} for the given tenders in one windowed
+    query; ties on price go to the earlier bid. Each bid has `bidder__username`.
+    """
+    ranked = Bid.objects.filter(tender_id__in=tender_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('tender_id'), order_by=[F('price').asc(), F('pk').asc()])
+    ).filter(rank=1).values('pk', 'tender_id', 'price', 'bidder__username')
+    return {bid['tender_id']: bid for bid in ranked}
+
+
+def close_and_award_tenders(tender_ids):
+    """
+    Closes the given tenders whose deadline has passed and awards every
+    closed one to its lowest bid. Uses the same handful of queries however
+    many tenders there are: one to load them, one for the winning bids, one
+    bulk_update and one insert of the queued chain writes.
+    """
+    now = timezone.now()
+    tenders = list(
+        Tender.objects.filter(pk__in=tender_ids).filter(
+            Q(status='active', deadline__lte=now) | Q(status='closed')
+        ).order_by('pk')
+    )
+    if not tenders:
+        return 0
+    best_bids = lowest_bids([tender.pk for tender in tenders])
+
+    writes = []
+    for tender in tenders:
+        if tender.status == 'active':
+            tender.status = 'closed'
+            # Локальная и глобальная записи (с якорем) ставятся в очередь
+            writes += build_tender_event_writes(
+                tender,
+                {'action': 'Tender Closed (Local)', 'reason': 'Deadline Expired'},
+                {'action': 'Tender Closed (Global)', 'tender_id': tender.pk},
+            )
+            print(f"Tender {tender.pk} closed.")
+
+        best_bid = best_bids.get(tender.pk)
+        if best_bid:
+            tender.awarded_bid_id = best_bid['pk']
+            tender.status = 'awarded'
+            writes += build_tender_event_writes(
+                tender,
+                {
+                    'action': 'Tender Awarded (Local)',
+                    'winner_bid_id': best_bid['pk'],
+                    'final_price': str(best_bid['price']),
+                },
+                # Якорь на локальную цепочку подставляется при запечатывании
+                {
+                    'action': 'Tender Awarded (Global)',
+                    'tender_id': tender.pk,
+                    'winner': best_bid['bidder__username'],
+                    'final_price': str(best_bid['price']),
+                },
+            )
+            print(f"Tender {tender.pk} awarded. Award queued for sealing.")
+
+    with transaction.atomic():
+        Tender.objects.bulk_update(tenders, ['status', 'awarded_bid'])
+        enqueue_writes(writes)
+    return len(tenders)
+
+
+class DeadlineScheduler:
+    """
+    Keeps active tenders in a priority queue ordered by deadline and sleeps
+    until the earliest one passes.
+
+    The database is polled every `poll_interval` seconds. A poll reads the
+    (id, deadline) pairs of the active tenders from the (status, deadline)
+    index and reschedules every tender whose deadline differs from its
+    queue entry: new tenders, deadlines set or moved either way, tenders
+    reopened after closing. Tenders no longer active are dropped. It also
+    finds tenders closed by hand that still need a winner.
+    """
+    def __init__(self, poll_interval=5.0):
+        self.poll_interval = poll_interval
+        # (deadline, tender id); entries that no longer match _scheduled are stale
+        self._heap = []
+        self._scheduled = {}
+
+    def schedule(self, pk, deadline):
+        if self._scheduled.get(pk) != deadline:
+            self._scheduled[pk] = deadline
+            heapq.heappush(self._heap, (deadline, pk))
+
+    def next_deadline(self):
+        while self._heap:
+            deadline, pk = self._heap[0]
+            if self._scheduled.get(pk) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def poll(self):
+        """
+        Picks up changes made since the last poll. Returns the ids of closed
+        tenders that still have to be awarded.
+        """
+        active = dict(Tender.objects.filter(status='active', deadline__isnull=False).values_list('pk', 'deadline'))
+        for pk, deadline in active.items():
+            self.schedule(pk, deadline)
+        # Их записи в куче становятся устаревшими и пропускаются
+        for pk in [pk for pk in self._scheduled if pk not in active]:
+            del self._scheduled[pk]
+
+        return list(
+            Tender.objects.filter(status='closed', awarded_bid__isnull=True, bids__isnull=False)
+            .values_list('pk', flat=True).distinct()
+        )
+
+    def pop_due(self, now):
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, pk = heapq.heappop(self._heap)
+            del self._scheduled[pk]
+            due.append(pk)
+        return due
+
+    def run_once(self):
+        """
+        Polls, then closes and awards everything that is due. Returns the
+        number of tenders processed.
+        """
+        to_award = self.poll()
+        due = self.pop_due(timezone.now())
+        tender_ids = due + [pk for pk in to_award if pk not in due]
+        if not tender_ids:
+            return 0
+        processed = close_and_award_tenders(tender_ids)
+        # Deadlines extended since they were scheduled
+        for pk, deadline in Tender.objects.filter(pk__in=due, status='active').values_list('pk', 'deadline'):
+            self.schedule(pk, deadline)
+        return processed
+
+    def seconds_until_next_run(self):
+        deadline = self.next_deadline()
+        if deadline is None:
+            return self.poll_interval
+        wait = (deadline - timezone.now()).total_seconds()
+        return max(0.0, min(wait, self.poll_interval))
+
+    def run_forever(self):
+        while True:
+            try:
+                self.run_once()
+            finally:
+                close_old_connections()
+            sleep(self.seconds_until_next_run())
@@ -1,5 +1,7 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import Tender, Bid
+from rest_framework.relations import HyperlinkedIdentityField, PrimaryKeyRelatedField
+from .models import Tender, Bid, ChainWrite
 
 class TenderSerializer(serializers.ModelSerializer):
     # Field to show the creator's username (read-only)
@@ -15,12 +17,12 @@ class TenderSerializer(serializers.ModelSerializer):
             'title', 
             'description', 
             'budget', 
-            'start_date', 
+            'created_at', 
             'deadline', 
             'status'
         ]
-        # 'creator' is set by the view on creation, 'start_date' is auto-added
-        read_only_fields = ('creator', 'start_date')
+        # 'creator' is set by the view on creation, 'created_at' is auto-added
+        read_only_fields = ('creator', 'created_at')
 
 class BidSerializer(serializers.ModelSerializer):
     bidder_username = serializers.ReadOnlyField(source='bidder.username')
@@ -34,4 +36,104 @@ class BidSerializer(serializers.ModelSerializer):
             'bidder_username',
             'price'
         ]
-        read_only_fields = ('bidder')
\ No newline at end of file
+        read_only_fields = ('bidder',)
+
+class ChainWriteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChainWrite
+        fields = [
+            'id',
+            'kind',
+            'tender',
+            'status',
+            'block_index',
+            'block_hash',
+            'receipt',
+            'error',
+            'created_at',
+            'sealed_at'
+        ]
+        read_only_fields = fields
+
+
+class ValuesReader:
+    """
+    Read-only fast path for list actions. Built once from a serializer
+    instance, it maps every field to a `.values()` lookup and a converter
+    (the field's own to_representation, so the output matches the
+    serializer's), then turns each row dict into the same representation
+    without creating model instances or per-row serializer state.
+
+    Supports plain model fields, dotted `source`s, primary-key relations and
+    the `url` identity field. A dotted source that goes through a nullable
+    relation is left out of the item when the relation is empty, as the
+    serializer does (its get_attribute raises SkipField there).
+    """
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, HyperlinkedIdentityField):
+                self.columns.append((name, field.lookup_field, self._url_builder(field), ()))
+                continue
+            path = '__'.join(field.source_attrs)
+            relations = self._nullable_relations(model, field.source_attrs)
+            if isinstance(field, PrimaryKeyRelatedField):
+                # values() already yields the related object's id
+                self.columns.append((name, path, None, relations))
+            elif isinstance(field, serializers.ReadOnlyField):
+                self.columns.append((name, path, None, relations))
+            else:
+                self.columns.append((name, path, field.to_representation, relations))
+        self.paths = list(dict.fromkeys(
+            path for _, column_path, _, relations in self.columns for path in (*relations, column_path)
+        ))
+
+    @staticmethod
+    def _nullable_relations(model, source_attrs):
+        """
+        `.values()` paths of the nullable relations a dotted source passes
+        through before its last attribute (each yields the related id).
+        """
+        relations = []
+        for depth, attr in enumerate(source_attrs[:-1], start=1):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+            if model_field.null:
+                relations.append('__'.join(source_attrs[:depth]))
+            model = model_field.related_model
+        return tuple(relations)
+
+    def _url_builder(self, field):
+        # Same arguments HyperlinkedIdentityField.get_url() reverses with; only
+        # the view and kwarg names are looked up once
+        view_name, lookup_url_kwarg = field.view_name, field.lookup_url_kwarg
+        request = field.context['request']
+        url_format = field.context.get('format')
+        if url_format and field.format and field.format != url_format:
+            url_format = field.format
+        return lambda lookup_value: field.reverse(
+            view_name, kwargs={lookup_url_kwarg: lookup_value}, request=request, format=url_format
+        )
+
+    def values(self, queryset):
+        return queryset.values(*self.paths)
+
+    def to_representation(self, rows):
+        result = []
+        for row in rows:
+            item = {}
+            for name, path, convert, relations in self.columns:
+                if relations and any(row[relation] is None for relation in relations):
+                    continue
+                value = row[path]
+                # Like Serializer.to_representation, None is passed through unconverted
+                item[name] = value if value is None or convert is None else convert(value)
+            result.append(item)
+        return result
@@ -1,3 +1,1356 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import timedelta
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blockchain.Block import Block, compute_block_hash, hash_template
+from blockchain import GlobalChain
+from blockchain.Chain import Blockchain, find_invalid_block
+from blockchain.Columnar import ColumnarBlockList
+from blockchain.Batcher import EventBatcher
+from blockchain.Merkle import hash_leaf, merkle_root, verify_merkle_proof
+from blockchain.Miner import ParallelMiner
+from blockchain.Proofs import verify_anchor_proof, verify_inclusion_proof
+from blockchain.Encoding import (
+    CorruptRecord, IncompleteRecord, decode_block_record, decode_block_records, encode_block_record,
+)
+from blockchain.Storage import (
+    AppendLogStorage, ChainStorageError, DatabaseStorage, JSONFileStorage, block_to_record,
+    convert_chain_file, detect_chain_format, encode_log_record,
+)
+from blockchain.Snapshot import LazyBlockList
+from blockchain.benchmarks import run_append_stress
+from users.models import Bidder
+from . import chain_writes
+from .models import Bid, ChainBlock, ChainCheckpoint, ChainWrite, Tender, TenderChainBlock
+from . import views
+from .scheduler import DeadlineScheduler, close_and_award_tenders
+from .serializers import BidSerializer, ChainWriteSerializer, TenderSerializer, ValuesReader
+
+
+class ConcurrentChainAppendTests(SimpleTestCase):
+    """
+    Several processes (e.g. gunicorn workers) appending to one chain file
+    must end up with a single valid chain holding every block.
+    """
+    PROCESSES = 6
+    BLOCKS = 15
+
+    def run_stress(self, storage, file_name):
+        with tempfile.TemporaryDirectory() as directory:
+            problems = run_append_stress(
+                os.path.join(directory, file_name), storage, self.PROCESSES, self.BLOCKS
+            )
+        self.assertEqual(problems, [])
+
+    def test_append_log(self):
+        self.run_stress('log', 'chain.jsonl')
+
+    def test_json_file(self):
+        self.run_stress('json', 'chain.json')
+
+    def test_binary_log(self):
+        self.run_stress('binary', 'chain.bin')
+
+
+class AppendLogStorageTests(SimpleTestCase):
+    """
+    The append-only log cuts off a record torn by a crash, refuses damage
+    in the middle, and imports the old JSON array file on first open.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'chain.jsonl')
+
+    def open_chain(self):
+        with redirect_stdout(io.StringIO()):
+            return Blockchain(chain_file=self.path, difficulty=0, storage='log', fsync='never')
+
+    def add_blocks(self, chain, count):
+        with redirect_stdout(io.StringIO()):
+            for i in range(count):
+                chain.add_block({'action': 'Tender Created (Global)', 'tender_id': i})
+
+    def records(self, chain):
+        return [block_to_record(block) for block in chain.chain]
+
+    def test_torn_tail_is_truncated(self):
+        self.add_blocks(self.open_chain(), 3)
+        intact_size = os.path.getsize(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(b'{"data":{"action":"Tender Cre')
+
+        reopened = self.open_chain()
+        self.assertEqual(len(reopened.chain), 4)
+        self.assertEqual(os.path.getsize(self.path), intact_size)
+
+        # The log keeps working after the recovery
+        self.add_blocks(reopened, 1)
+        recovered = self.open_chain()
+        self.assertEqual(len(recovered.chain), 5)
+        self.assertTrue(recovered.validate(full=True))
+
+    def test_corrupt_record_in_the_middle(self):
+        self.add_blocks(self.open_chain(), 2)
+        with open(self.path, 'rb') as f:
+            lines = f.read().split(b'\n')
+        lines[1] = lines[1][:20]
+        with open(self.path, 'wb') as f:
+            f.write(b'\n'.join(lines))
+
+        with self.assertRaises(ChainStorageError):
+            AppendLogStorage(self.path).load()
+
+    def test_legacy_json_file_is_imported(self):
+        with redirect_stdout(io.StringIO()):
+            legacy = Blockchain(chain_file=os.path.join(self.directory, 'chain.json'), difficulty=0)
+        self.add_blocks(legacy, 2)
+
+        imported = self.open_chain()
+        self.assertEqual(self.records(imported), self.records(legacy))
+        self.assertEqual(len(AppendLogStorage(self.path).load()), 3)
+
+
+class LazyGlobalChainTests(SimpleTestCase):
+    """
+    The global chain is loaded on first use, once, even when several
+    threads ask for it at the same time.
+    """
+    def test_loaded_once_on_first_use(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', None), \
+                mock.patch.object(GlobalChain, 'GLOBAL_EVENT_BATCHER', None), \
+                mock.patch.object(GlobalChain, 'GLOBAL_CHAIN_STORAGE', 'json'), \
+                mock.patch.object(GlobalChain, 'GLOBAL_CHAIN_FILE', os.path.join(directory, 'chain.json')), \
+                mock.patch.object(GlobalChain, 'Blockchain', wraps=Blockchain) as blockchain, \
+                redirect_stdout(io.StringIO()):
+            GlobalChain.flush_global_chain_events()
+            blockchain.assert_not_called()
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                chains = list(executor.map(lambda _: GlobalChain.get_global_chain(), range(8)))
+            self.assertEqual(blockchain.call_count, 1)
+            self.assertTrue(all(chain is chains[0] for chain in chains))
+            self.assertIs(GlobalChain.GLOBAL_TENDER_CHAIN, chains[0])
+
+
+class BinaryEncodingTests(SimpleTestCase):
+    """
+    The binary format must give back exactly the records it was given, so
+    every block hashes the same as in the JSON files.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        genesis = Block(0, 1700000000, {'message': 'Genesis'}, '0')
+        blocks = [genesis]
+        for i, data in enumerate([
+            {'action': 'Bid Submitted', 'bid_data': {'price': 123456.78, 'proposal': 'Поставка оборудования'}},
+            {'action': 'Event Batch', 'events': [{'tender_id': 7}, {'tender_id': '8'}], 'merkle_root': 'ab' * 32},
+            'plain text',
+            None,
+        ], start=1):
+            block = Block(i, 1700000000.123456 + i, data, blocks[-1].hash)
+            block.nonce = 300 * i
+            block.hash = block.calculate_hash()
+            blocks.append(block)
+        self.records = [block_to_record(block) for block in blocks]
+
+    def test_round_trip(self):
+        raw = b''.join(encode_block_record(record) for record in self.records)
+        records, last_start, end = decode_block_records(raw)
+        self.assertEqual(records, self.records)
+        self.assertEqual(end, len(raw))
+        self.assertEqual(decode_block_record(raw, last_start)[0], self.records[-1])
+        for record in records:
+            self.assertEqual(type(record['timestamp']), type(self.records[record['index']]['timestamp']))
+            self.assertEqual(Block.from_dict(record).calculate_hash(), record['hash'])
+
+        self.assertLess(len(raw), len(b''.join(encode_log_record(record) for record in self.records)))
+        with self.assertRaises(CorruptRecord):
+            decode_block_record(raw[:10] + bytes([raw[10] ^ 1]) + raw[11:])
+        with self.assertRaises(IncompleteRecord):
+            decode_block_record(raw[:len(encode_block_record(self.records[0])) - 1])
+
+    def test_convert_both_ways(self):
+        json_path = os.path.join(self.directory, 'chain.json')
+        binary_path = os.path.join(self.directory, 'chain.bin')
+        back_path = os.path.join(self.directory, 'back.json')
+        JSONFileStorage(json_path).save(self.records)
+
+        self.assertEqual(convert_chain_file(json_path, binary_path, 'binary', fsync='never'), len(self.records))
+        self.assertEqual(detect_chain_format(binary_path), 'binary')
+        convert_chain_file(binary_path, back_path, 'json')
+        self.assertEqual(JSONFileStorage(back_path).load(), self.records)
+        self.assertLess(os.path.getsize(binary_path), os.path.getsize(json_path))
+
+    def test_chain_on_binary_storage(self):
+        path = os.path.join(self.directory, 'chain.bin')
+        JSONFileStorage(os.path.join(self.directory, 'chain.json')).save(self.records)
+        with redirect_stdout(io.StringIO()):
+            chain = Blockchain(chain_file=path, difficulty=1, storage='binary', fsync='never')
+            chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 9})
+        self.assertEqual(len(chain.chain), len(self.records) + 1)
+
+        # Недописанная последняя запись отрезается при загрузке
+        with open(path, 'ab') as f:
+            f.write(encode_block_record(block_to_record(chain.get_latest_block()))[:-3])
+        with redirect_stdout(io.StringIO()):
+            reopened = Blockchain(chain_file=path, difficulty=1, storage='binary')
+        self.assertEqual([block_to_record(b) for b in reopened.chain], [block_to_record(b) for b in chain.chain])
+        self.assertTrue(reopened.validate(full=True))
+
+
+class ParallelMinerTests(SimpleTestCase):
+    """
+    Mining over the process pool finds the same nonce and hash as the
+    sequential loop, even when the answer lies several chunks in.
+    """
+    def test_matches_sequential_mining(self):
+        miner = ParallelMiner(workers=2, chunk_size=64)
+        self.addCleanup(miner.shutdown)
+        for i in range(4):
+            sequential = Block(i, 1700000000 + i, {'action': 'Bid Submitted', 'bid_id': i}, 'ab' * 32)
+            parallel = Block(i, 1700000000 + i, {'action': 'Bid Submitted', 'bid_id': i}, 'ab' * 32)
+            with redirect_stdout(io.StringIO()):
+                sequential.mine_block(3)
+                parallel.mine_block(3, miner)
+            self.assertEqual((parallel.nonce, parallel.hash), (sequential.nonce, sequential.hash))
+            self.assertEqual(parallel.hash, parallel.calculate_hash())
+            self.assertTrue(parallel.hash.startswith('000'))
+
+
+class BlockPayloadCacheTests(SimpleTestCase):
+    """
+    Hashing, mining and JSON output reuse one cached encoding of the payload,
+    and give the same bytes and hashes as serializing the block from scratch.
+    """
+    def setUp(self):
+        self.block = Block(3, 1700000000.25, {'action': 'Bid Submitted', 'note': 'Поставка', 'price': 10.5}, 'ab' * 32)
+
+    def test_hash_matches_full_serialization(self):
+        block = self.block
+        for timestamp in (1700000000.25, 1700000000):
+            block.timestamp = timestamp
+            block.nonce = 41
+            self.assertEqual(block.calculate_hash(),
+                             compute_block_hash(block.index, timestamp, block.data, block.previous_hash, 41))
+        self.assertEqual(block.mining_template(), hash_template(block.index, block.timestamp, block.data, block.previous_hash))
+        self.assertEqual(json.loads(block.to_json()), block.to_dict())
+
+    def test_cache_invalidated_when_data_changes(self):
+        payload = self.block.canonical_data
+        self.assertIs(self.block.canonical_data, payload)
+        self.block.data = {'action': 'Bid Withdrawn'}
+        self.assertNotEqual(self.block.canonical_data, payload)
+        self.assertEqual(self.block.calculate_hash(),
+                         compute_block_hash(3, 1700000000.25, {'action': 'Bid Withdrawn'}, 'ab' * 32, 0))
+
+    def test_stored_blocks_hash_without_decoding(self):
+        chain = ColumnarBlockList([self.block])
+        with mock.patch('json.loads', side_effect=AssertionError("payload decoded")):
+            self.assertEqual(chain[0].calculate_hash(), self.block.hash)
+            chain[0].to_json()
+        self.assertEqual(chain[0].data, self.block.data)
+
+
+class ColumnarBlockListTests(SimpleTestCase):
+    """
+    The columnar store gives back blocks equal to the ones stored, including
+    values its columns cannot hold (the genesis "0", an int timestamp).
+    """
+    def setUp(self):
+        self.blocks = [Block(0, 1700000000, 'Genesis Block', '0')]
+        for i in range(1, 6):
+            self.blocks.append(Block(i, 1700000000.5 + i, {'action': 'Bid Submitted', 'bid_data': {'id': i, 'price': 10.5 * i}},
+                                     self.blocks[-1].hash))
+        self.chain = ColumnarBlockList(self.blocks)
+
+    def test_blocks_read_back(self):
+        self.assertEqual(len(self.chain), 6)
+        self.assertEqual(list(self.chain), self.blocks)
+        self.assertEqual(self.chain[-1], self.blocks[-1])
+        self.assertIsInstance(self.chain[0].timestamp, int)
+        self.assertEqual(self.chain[0].previous_hash, '0')
+        self.assertEqual(list(self.chain[3].data), ['action', 'bid_data'])
+        self.assertEqual(self.chain.to_records(), [block_to_record(block) for block in self.blocks])
+        self.assertIsNone(find_invalid_block(self.chain))
+
+    def test_slices_and_concatenation(self):
+        tail = self.chain[2:]
+        self.assertIsInstance(tail, ColumnarBlockList)
+        self.assertEqual(list(tail), self.blocks[2:])
+        self.assertEqual(list(self.chain[:2] + tail), self.blocks)
+        self.assertEqual(self.chain[::2], self.blocks[::2])
+
+        extra = Block(6, 1700000010.0, {'action': 'Tender Closed (Global)'}, self.blocks[-1].hash)
+        tail.append(extra)
+        self.assertEqual(list(tail), self.blocks[2:] + [extra])
+        self.assertEqual(len(self.chain), 6)
+
+    def test_from_records(self):
+        records = [block_to_record(block) for block in self.blocks]
+        # Значения, которые колонки не вмещают: верхний регистр, огромный nonce, не-hex
+        records[2]['hash'] = records[2]['hash'].upper()
+        records[3]['nonce'] = 2 ** 70
+        records[4]['previous_hash'] = 'z' * 64
+        chain = ColumnarBlockList.from_records(records)
+        self.assertEqual(chain.to_records(), records)
+        self.assertEqual(chain[3].nonce, 2 ** 70)
+        self.assertEqual(list(ColumnarBlockList.from_records(records[:2]) + chain[2:]), list(chain))
+
+
+class TrustedLoadTests(SimpleTestCase):
+    """
+    Stored blocks are loaded without rehashing; tampering only shows up when
+    the caller asks for verification, synchronously or in the background.
+    """
+    def setUp(self):
+        with redirect_stdout(io.StringIO()):
+            chain = Blockchain(difficulty=1, storage='memory')
+            for i in range(3):
+                chain.add_block({'action': 'Bid Submitted', 'bid_id': i})
+        self.records = chain.to_list_of_dicts()
+        self.records[2]['data']['bid_id'] = 99
+
+    def load(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return Blockchain.load_from_list_of_dicts(self.records, difficulty=1, **kwargs)
+
+    def test_stored_hashes_are_trusted(self):
+        chain = self.load()
+        self.assertIsNone(chain.verification)
+        self.assertEqual([block.hash for block in chain.chain], [record['hash'] for record in self.records])
+        self.assertNotEqual(chain.chain[2].hash, chain.chain[2].calculate_hash())
+
+    def test_verify_on_demand(self):
+        result = self.load().verify()
+        self.assertFalse(result)
+        self.assertEqual(result.failed_index, 2)
+
+    def test_deferred_verification(self):
+        chain = self.load(verify='deferred')
+        self.assertEqual(chain.verification.result(timeout=10).failed_index, 2)
+        self.assertEqual(self.load().verify(deferred=True).result(timeout=10).failed_index, 2)
+
+    def test_refresh_reads_blocks_from_another_instance(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chain.jsonl')
+            with redirect_stdout(io.StringIO()):
+                writer = Blockchain(chain_file=path, difficulty=0, storage='log', fsync='never')
+                writer.add_block({'action': 'Tender Created (Global)', 'tender_id': 1})
+                reader = Blockchain(chain_file=path, difficulty=0, storage='log', fsync='never')
+                writer.add_block({'action': 'Bid Submitted (Global)', 'tender_id': 1})
+                writer.add_block({'action': 'Tender Closed (Global)', 'tender_id': 1})
+            self.assertEqual(reader.refresh(), 2)
+            self.assertEqual(reader.refresh(), 0)
+            self.assertEqual(reader.to_list_of_dicts(), writer.to_list_of_dicts())
+            self.assertEqual([block.index for block in reader.get_blocks_for_tender(1)], [1, 2, 3])
+
+
+class CheckpointValidationTests(SimpleTestCase):
+    """
+    validate() checks only the blocks after the persisted checkpoint, moves
+    it forward, and names the first bad block; full=True rechecks them all.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'chain.jsonl')
+        self.chain = self.open_chain()
+        self.add_blocks(3)
+
+    def open_chain(self):
+        with redirect_stdout(io.StringIO()):
+            return Blockchain(chain_file=self.path, difficulty=0, storage='log', fsync='never')
+
+    def add_blocks(self, count):
+        with redirect_stdout(io.StringIO()):
+            for i in range(count):
+                self.chain.add_block({'action': 'Bid Submitted', 'bid_id': i})
+
+    def rewrite_block(self, index, **changes):
+        records = self.chain.to_list_of_dicts()
+        records[index].update(changes)
+        self.chain.storage.save(records)
+
+    def test_checkpoint_moves_forward(self):
+        result = self.chain.validate()
+        self.assertTrue(result)
+        self.assertEqual(result.checked, 3)
+        self.assertEqual(self.chain.storage.load_checkpoint(), (3, self.chain.chain[3].hash))
+
+        self.add_blocks(2)
+        result = self.open_chain().validate()
+        self.assertEqual(result.to_dict(), {'valid': True, 'failed_index': None, 'reason': None, 'checked': 2})
+        self.assertEqual(self.chain.storage.load_checkpoint(), (5, self.chain.chain[5].hash))
+
+    def test_failed_block_is_reported(self):
+        self.rewrite_block(2, data={'action': 'Bid Submitted', 'bid_id': 99})
+        result = self.open_chain().validate()
+        self.assertFalse(result)
+        self.assertEqual((result.failed_index, result.reason), (2, "stored hash does not match block contents"))
+        self.assertIsNone(self.chain.storage.load_checkpoint())
+
+    def test_blocks_before_the_checkpoint_need_a_full_check(self):
+        self.assertTrue(self.chain.validate())
+        self.rewrite_block(2, data={'action': 'Bid Submitted', 'bid_id': 99})
+
+        self.assertTrue(self.open_chain().validate())
+        result = self.open_chain().validate(full=True)
+        self.assertEqual((result.failed_index, result.reason), (2, "stored hash does not match block contents"))
+
+    def test_replaced_checkpoint_block(self):
+        self.assertTrue(self.chain.validate())
+        self.rewrite_block(3, hash='f' * 64)
+        result = self.open_chain().validate()
+        self.assertEqual((result.failed_index, result.reason), (3, "block no longer matches the validation checkpoint"))
+
+
+class ChainIndexTests(SimpleTestCase):
+    """
+    Lookups by hash, tender, action and time answer from the secondary
+    indexes and stay in step with the chain as it grows or is reloaded.
+    """
+    def setUp(self):
+        self.chain = Blockchain(difficulty=1, storage='memory')
+        self.created = self.chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 7})
+        self.other = self.chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 8})
+        self.batch = self.chain.add_block({
+            'action': 'Event Batch',
+            'merkle_root': '0',
+            'events': [
+                {'action': 'Bid Submitted (Global)', 'tender_id': 7},
+                {'action': 'Tender Closed (Global)', 'tender_id': 7},
+            ],
+        })
+
+    def test_lookups(self):
+        self.assertEqual(self.chain.get_block_by_hash(self.other.hash), self.other)
+        self.assertIsNone(self.chain.get_block_by_hash('missing'))
+        self.assertEqual(self.chain.get_blocks_for_tender(7), [self.created, self.batch])
+        self.assertEqual(self.chain.get_blocks_for_tender('8'), [self.other])
+        self.assertEqual(self.chain.get_blocks_by_action('Tender Closed (Global)'), [self.batch])
+        self.assertEqual(self.chain.get_blocks_by_action('Event Batch'), [self.batch])
+        self.assertEqual(
+            self.chain.get_blocks_between(self.created.timestamp, self.batch.timestamp),
+            [block for block in self.chain.chain if self.created.timestamp <= block.timestamp < self.batch.timestamp],
+        )
+        self.assertEqual(self.chain.get_blocks_between(start=self.batch.timestamp), [self.batch])
+
+    def test_blocks_appended_or_reloaded(self):
+        appended = Block(4, self.batch.timestamp + 1, {'action': 'Tender Awarded (Global)', 'tender_id': 7}, self.batch.hash)
+        self.chain.chain.append(appended)
+        self.assertEqual(self.chain.get_blocks_for_tender(7), [self.created, self.batch, appended])
+
+        # Хранилище перечитано заново: другие объекты блоков
+        self.chain.chain = [Block.from_dict(block_to_record(block)) for block in self.chain.chain[:2]]
+        self.assertEqual([block.index for block in self.chain.get_blocks_for_tender(7)], [1])
+        self.assertIsNone(self.chain.get_block_by_hash(self.batch.hash))
+
+
+class EventBatcherTests(SimpleTestCase):
+    """
+    Events submitted together share a block, each with a receipt that proves
+    its inclusion; a batch that cannot be sealed fails for its callers only.
+    """
+    def setUp(self):
+        self.chain = Blockchain(difficulty=1, storage='memory')
+        self.batcher = EventBatcher(self.chain, window=60, max_events=10)
+
+    def seal(self, events):
+        futures = [self.batcher.submit(event) for event in events]
+        self.batcher.flush()
+        return futures
+
+    def test_receipts_prove_inclusion(self):
+        events = [{'action': 'Bid Submitted', 'tender_id': i} for i in range(5)]
+        with redirect_stdout(io.StringIO()):
+            receipts = [future.result(timeout=10) for future in self.seal(events)]
+        block = self.chain.chain[-1]
+        self.assertEqual(len(self.chain.chain), 2)
+        for event, receipt in zip(events, receipts):
+            self.assertEqual(receipt['block_hash'], block.hash)
+            self.assertTrue(verify_merkle_proof(hash_leaf(event), receipt['merkle_proof'], block.data['merkle_root']))
+        self.assertFalse(verify_merkle_proof(hash_leaf(events[0]), receipts[1]['merkle_proof'], block.data['merkle_root']))
+
+    def test_failing_batch_raises_to_callers(self):
+        # Не сериализуется в JSON: ошибка уже при построении дерева Меркла
+        futures = self.seal([{'action': 'ok'}, {'action': object()}])
+        for future in futures:
+            with self.assertRaises(TypeError):
+                future.result(timeout=10)
+
+        with redirect_stdout(io.StringIO()):
+            receipt = self.seal([{'action': 'next'}])[0].result(timeout=10)
+        self.assertEqual(receipt['block_index'], 1)
+
+
+def build_anchor_chain(tender_id, blocks=12):
+    """Memory chain with single-event blocks and a batch holding the tender's anchor."""
+    chain = Blockchain(difficulty=1, storage='memory')
+    for i in range(blocks):
+        chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 1000 + i, 'local_chain_root_hash': f"{i:064x}"})
+    events = [
+        {'action': 'Bid Submitted (Global)', 'tender_id': 1000, 'local_chain_root_hash': 'a' * 64},
+        {'action': 'Tender Awarded (Global)', 'tender_id': tender_id, 'local_chain_root_hash': 'b' * 64},
+        {'action': 'Tender Closed (Global)', 'tender_id': 1001, 'local_chain_root_hash': 'c' * 64},
+    ]
+    chain.add_block({
+        'action': 'Event Batch',
+        'merkle_root': merkle_root([hash_leaf(event) for event in events]),
+        'events': events,
+    })
+    chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 2000})
+    return chain
+
+
+class InclusionProofTests(SimpleTestCase):
+    """
+    An anchor proof checks out against the published chain root with
+    O(log n) hashes and fails for any other event, header or root.
+    """
+    def setUp(self):
+        self.chain = build_anchor_chain(tender_id=7)
+        self.root = self.chain.get_proof_root()
+        self.batch = self.chain.get_blocks_for_tender(7)[0]
+        self.proof = self.chain.get_inclusion_proof(self.batch.hash, event_index=1)
+
+    def test_valid_proof(self):
+        self.assertEqual(self.root['chain_length'], len(self.chain.chain))
+        self.assertTrue(verify_anchor_proof(self.proof, 7, 'b' * 64, self.root['chain_root']))
+        self.assertLessEqual(len(self.proof['block_proof']), (len(self.chain.chain) - 1).bit_length())
+        self.assertEqual(len(self.proof['event_proof']), 2)
+        for block in self.chain.chain:
+            self.assertTrue(verify_inclusion_proof(self.chain.get_inclusion_proof(block.hash), self.root['chain_root']))
+
+    def test_tampered_proofs(self):
+        self.assertFalse(verify_anchor_proof(self.proof, 7, 'c' * 64, self.root['chain_root']))
+        self.assertFalse(verify_anchor_proof(self.proof, 8, 'b' * 64, self.root['chain_root']))
+        self.assertFalse(verify_inclusion_proof(self.proof, '0' * 64))
+
+        tampered_event = json.loads(json.dumps(self.proof))
+        tampered_event['event']['tender_id'] = 8
+        self.assertFalse(verify_inclusion_proof(tampered_event, self.root['chain_root']))
+        tampered_header = json.loads(json.dumps(self.proof))
+        tampered_header['block']['timestamp'] += 1
+        self.assertFalse(verify_inclusion_proof(tampered_header, self.root['chain_root']))
+        self.assertFalse(verify_inclusion_proof({'event': {}}, self.root['chain_root']))
+
+    def test_chain_grows(self):
+        self.chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 3000})
+        new_root = self.chain.get_proof_root()
+        self.assertEqual(new_root['chain_length'], self.root['chain_length'] + 1)
+        self.assertFalse(verify_inclusion_proof(self.proof, new_root['chain_root']))
+        proof = self.chain.get_inclusion_proof(self.batch.hash, event_index=1)
+        self.assertTrue(verify_inclusion_proof(proof, new_root['chain_root']))
+
+
+class SnapshotStartupTests(SimpleTestCase):
+    """
+    A chain opened from a snapshot replays only the newer blocks, reads the
+    older ones on demand and ends up identical to a full load.
+    """
+    STORAGE = 'log'
+    FILE_NAME = 'chain.jsonl'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, self.FILE_NAME)
+        with redirect_stdout(io.StringIO()):
+            self.writer = self.open_chain()
+            for i in range(299):
+                self.writer.add_block({'action': 'Tender Created (Global)', 'tender_id': i % 5})
+
+    def open_chain(self, snapshot_interval=100):
+        with redirect_stdout(io.StringIO()):
+            return Blockchain(chain_file=self.path, difficulty=0, storage=self.STORAGE, fsync='never',
+                              snapshot_interval=snapshot_interval)
+
+    def records(self, chain):
+        return [block_to_record(block) for block in chain.chain]
+
+    def test_resume_and_replay(self):
+        with redirect_stdout(io.StringIO()):
+            self.writer.add_block({'action': 'Tender Awarded (Global)', 'tender_id': 3})
+        resumed = self.open_chain()
+        self.assertIsInstance(resumed.chain, LazyBlockList)
+        self.assertGreater(resumed.chain.lazy_count, 0)
+        self.assertEqual(len(resumed.chain), 301)
+        self.assertEqual(resumed.get_latest_block().hash, self.writer.get_latest_block().hash)
+
+        with redirect_stdout(io.StringIO()):
+            block = resumed.add_block({'action': 'Tender Closed (Global)', 'tender_id': 3})
+        self.assertTrue(resumed.chain.lazy_count)
+        self.assertEqual(
+            [found.index for found in resumed.get_blocks_for_tender(3)],
+            [found.index for found in self.writer.get_blocks_for_tender(3)] + [block.index],
+        )
+        self.assertEqual(self.records(resumed), self.records(self.open_chain(snapshot_interval=None)))
+        self.assertTrue(resumed.validate(full=True))
+
+    def test_replaced_log_is_loaded_in_full(self):
+        with redirect_stdout(io.StringIO()):
+            self.writer.chain = self.writer.chain[:50]
+            self.writer.save_chain()
+        reopened = self.open_chain()
+        self.assertNotIsInstance(reopened.chain, LazyBlockList)
+        self.assertEqual(len(reopened.chain), 50)
+
+
+class BinarySnapshotStartupTests(SnapshotStartupTests):
+    STORAGE = 'binary'
+    FILE_NAME = 'chain.bin'
+
+
+class CloseAndAwardTests(TestCase):
+    """
+    The close/award pipeline runs a fixed number of queries per cycle.
+    """
+    def setUp(self):
+        self.bidders = [
+            Bidder.objects.create(username=f"bidder{i}", email=f"bidder{i}@example.com") for i in range(3)
+        ]
+
+    def create_expired_tenders(self, count):
+        past = timezone.now() - timedelta(minutes=1)
+        tenders = []
+        for i in range(count):
+            tender = Tender.objects.create(title=f"Tender {i}", deadline=past)
+            for price, bidder in zip((300, 100 + i, 200), self.bidders):
+                Bid.objects.create(tender=tender, bidder=bidder, price=price)
+            tenders.append(tender)
+        return tenders
+
+    def count_queries(self, tender_ids):
+        with CaptureQueriesContext(connection) as queries:
+            close_and_award_tenders(tender_ids)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_tenders(self):
+        # Kept below the size at which SQLite splits the bulk insert into batches
+        few = [tender.pk for tender in self.create_expired_tenders(2)]
+        many = [tender.pk for tender in self.create_expired_tenders(15)]
+        self.assertEqual(self.count_queries(few), self.count_queries(many))
+
+    def test_lowest_bid_wins(self):
+        tenders = self.create_expired_tenders(3)
+        close_and_award_tenders([tender.pk for tender in tenders])
+        for tender in tenders:
+            tender.refresh_from_db()
+            self.assertEqual(tender.status, 'awarded')
+            self.assertEqual(tender.awarded_bid.bidder, self.bidders[1])
+        # Closed and Awarded, each on both chains, in order
+        actions = [write.data['action'] for write in ChainWrite.objects.filter(tender=tenders[0])]
+        self.assertEqual(actions, [
+            'Tender Closed (Local)', 'Tender Closed (Global)',
+            'Tender Awarded (Local)', 'Tender Awarded (Global)',
+        ])
+
+
+class DeadlineSchedulerTests(TestCase):
+    """
+    The scheduler follows every change of an active tender's deadline, and
+    closes and awards tenders once their deadline passes.
+    """
+    def setUp(self):
+        self.now = timezone.now()
+        self.scheduler = DeadlineScheduler()
+
+    def create_tender(self, hours=None, **fields):
+        deadline = None if hours is None else self.now + timedelta(hours=hours)
+        return Tender.objects.create(title='Tender', deadline=deadline, **fields)
+
+    def test_poll_follows_edits(self):
+        head = self.create_tender(hours=1)
+        undated = self.create_tender()
+        closed = self.create_tender(hours=2, status='closed')
+        self.scheduler.poll()
+        self.assertEqual(self.scheduler.next_deadline(), head.deadline)
+
+        # Срок задан позже, тендер открыт снова, срок головы очереди продлен
+        Tender.objects.filter(pk=undated.pk).update(deadline=self.now + timedelta(hours=3))
+        Tender.objects.filter(pk=closed.pk).update(status='active')
+        Tender.objects.filter(pk=head.pk).update(deadline=self.now + timedelta(hours=4))
+        self.scheduler.poll()
+        self.assertEqual(self.scheduler.pop_due(self.now + timedelta(days=1)), [closed.pk, undated.pk, head.pk])
+
+        self.scheduler.poll()
+        Tender.objects.filter(pk=undated.pk).update(status='cancelled')
+        self.scheduler.poll()
+        self.assertEqual(self.scheduler.pop_due(self.now + timedelta(days=1)), [closed.pk, head.pk])
+
+    def test_pop_due(self):
+        later = self.create_tender(hours=2)
+        earlier = self.create_tender(hours=1)
+        self.scheduler.poll()
+        self.assertEqual(self.scheduler.pop_due(self.now), [])
+        self.assertEqual(self.scheduler.pop_due(self.now + timedelta(hours=1)), [earlier.pk])
+        self.assertEqual(self.scheduler.next_deadline(), later.deadline)
+
+    def test_run_once(self):
+        bidder = Bidder.objects.create(username='bidder', email='bidder@example.com')
+        expired = self.create_tender(hours=-1)
+        closed_by_hand = self.create_tender(status='closed')
+        upcoming = self.create_tender(hours=1)
+        for tender in (expired, closed_by_hand, upcoming):
+            Bid.objects.create(tender=tender, bidder=bidder, price=100)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.scheduler.run_once(), 2)
+        statuses = dict(Tender.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {expired.pk: 'awarded', closed_by_hand.pk: 'awarded', upcoming.pk: 'active'})
+        self.assertEqual(self.scheduler.next_deadline(), upcoming.deadline)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.scheduler.run_once(), 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', "checks SQLite's EXPLAIN QUERY PLAN output")
+class HotQueryPlanTests(TestCase):
+    """
+    The hot tender/bid filters must be answered from their composite indexes.
+    """
+    def setUp(self):
+        self.bidder = Bidder.objects.create(username='bidder', email='bidder@example.com')
+        self.tender = Tender.objects.create(title='Tender', deadline=timezone.now() + timedelta(days=1))
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index_name}", plan.replace('COVERING INDEX', 'INDEX'), plan)
+
+    def test_expired_tenders(self):
+        # DeadlineScheduler.poll / close_and_award_tenders
+        queryset = Tender.objects.filter(status='active', deadline__lt=timezone.now())
+        self.assertUsesIndex(queryset, 'tender_status_deadline_idx')
+
+    def test_tender_list(self):
+        queryset = Tender.objects.filter(status__in=['active', 'closed', 'awarded']).order_by('-deadline')
+        self.assertUsesIndex(queryset, 'tender_status_deadline_idx')
+
+    def test_bids_by_price(self):
+        # tender_detail and lowest_bids
+        self.assertUsesIndex(Bid.objects.filter(tender=self.tender).order_by('price'), 'bid_tender_price_idx')
+
+    def test_bid_of_bidder(self):
+        # "already placed a bid" checks in tender_detail and BidViewSet
+        queryset = Bid.objects.filter(tender=self.tender, bidder=self.bidder)
+        self.assertIn('(tender_id=? AND bidder_id=?)', queryset.explain())
+
+    def test_won_tenders(self):
+        self.assertUsesIndex(self.bidder.get_won_tenders(), 'tender_awarded_bid_status_idx')
+
+    def test_bid_api_page(self):
+        # BidViewSet list: ?tender= with the cursor's keyset condition, no sort step
+        queryset = Bid.objects.filter(tender=self.tender, pk__lt=1000).order_by('-pk')[:50]
+        plan = queryset.explain()
+        self.assertIn('tender_id=?', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class HotViewQueryCountTests(TestCase):
+    """
+    Page views run the same number of queries however many rows they show.
+    """
+    def setUp(self):
+        self.creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        self.client.force_login(self.creator)
+        session = self.client.session
+        session['mfa_verified'] = True
+        session.save()
+
+    def create_tender(self, bids=0):
+        tender = Tender.objects.create(
+            title='Tender', creator=self.creator, deadline=timezone.now() + timedelta(days=1)
+        )
+        for i in range(bids):
+            bidder = Bidder.objects.create(username=f"b{tender.pk}-{i}", email=f"b{tender.pk}-{i}@example.com")
+            Bid.objects.create(tender=tender, bidder=bidder, price=100 + i)
+        return tender
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_tender_list(self):
+        self.create_tender()
+        one = self.count_queries(reverse('tender_list'))
+        for _ in range(9):
+            self.create_tender()
+        self.assertEqual(self.count_queries(reverse('tender_list')), one)
+
+    def test_tender_detail(self):
+        few = self.create_tender(bids=1)
+        many = self.create_tender(bids=10)
+        self.assertEqual(
+            self.count_queries(reverse('tender_detail', args=[many.pk])),
+            self.count_queries(reverse('tender_detail', args=[few.pk])),
+        )
+
+    def test_bid_api(self):
+        few = self.create_tender(bids=1)
+        many = self.create_tender(bids=10)
+        url = reverse('bid-list')
+        self.assertEqual(
+            self.count_queries(f"{url}?tender={many.pk}"),
+            self.count_queries(f"{url}?tender={few.pk}"),
+        )
+
+        response = self.client.get(f"{url}?tender={many.pk}&page_size=4")
+        self.assertEqual([bid['price'] for bid in response.data['results']], ['109.00', '108.00', '107.00', '106.00'])
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 4)
+        self.assertEqual(next_page.data['results'][0]['price'], '105.00')
+
+    def create_chain(self, blocks):
+        tender = self.create_tender(bids=1)
+        TenderChainBlock.objects.bulk_create(
+            TenderChainBlock(
+                tender=tender, index=i, timestamp=i, previous_hash='0' * 64, hash=f"{i:064x}",
+                data='Genesis Block' if i == 0 else {'action': 'Bid Submitted', 'bid_id': i},
+            )
+            for i in range(blocks)
+        )
+        Tender.objects.filter(pk=tender.pk).update(local_chain_length=blocks)
+
+    def test_blockchain_view(self):
+        self.create_chain(blocks=3)
+        few = self.count_queries(reverse('blockchain_view'))
+        for _ in range(views.VISUALIZER_MAX_TENDERS + 5):
+            self.create_chain(blocks=views.VISUALIZER_MAX_BLOCKS + 10)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(self.count_queries(reverse('blockchain_view')), few)
+        self.assertEqual(output.getvalue(), '')
+
+        response = self.client.get(reverse('blockchain_view'))
+        local_chains = json.loads(response.context['local_chains_json'])
+        self.assertEqual(len(local_chains), views.VISUALIZER_MAX_TENDERS)
+        self.assertEqual(response.context['local_chains_total'], views.VISUALIZER_MAX_TENDERS + 6)
+        for chain in local_chains:
+            self.assertEqual(chain['bid_count'], 1)
+            self.assertEqual(chain['tender']['bid_count'], 1)
+            indexes = [block['index'] for block in chain['page']['blocks']]
+            self.assertEqual(indexes, list(range(views.VISUALIZER_MAX_BLOCKS + 9, 9, -1)))
+            self.assertEqual(chain['page']['next_before'], 10)
+
+    def test_tender_chain_blocks(self):
+        self.create_chain(blocks=30)
+        tender = Tender.objects.get()
+        url = reverse('tender_chain_blocks', args=[tender.pk])
+
+        page = self.client.get(url, {'limit': 12}).json()
+        self.assertEqual(page['length'], 30)
+        self.assertEqual([block['index'] for block in page['blocks']], list(range(29, 17, -1)))
+        self.assertEqual(page['next_before'], 18)
+
+        older = self.client.get(url, {'before': page['next_before'], 'limit': 12}).json()
+        self.assertEqual([block['index'] for block in older['blocks']], list(range(17, 5, -1)))
+        by_hash = self.client.get(url, {'before_hash': page['blocks'][-1]['hash'], 'limit': 12}).json()
+        self.assertEqual(by_hash, older)
+
+        oldest = self.client.get(url, {'before': 6, 'limit': 12}).json()
+        self.assertEqual([block['index'] for block in oldest['blocks']], list(range(5, -1, -1)))
+        self.assertIsNone(oldest['next_before'])
+
+        with mock.patch.object(views, 'MAX_BLOCK_PAGE_SIZE', 5):
+            self.assertEqual(len(self.client.get(url, {'limit': 10 ** 6}).json()['blocks']), 5)
+        self.assertEqual(self.client.get(url, {'before': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'before_hash': 'missing'}).status_code, 404)
+
+    def test_global_chain_blocks(self):
+        with redirect_stdout(io.StringIO()):
+            chain = build_anchor_chain(tender_id=1)
+        patcher = mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', chain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        url = reverse('global_chain_blocks')
+
+        def expected(indexes):
+            return [chain.chain[i].to_dict() for i in indexes]
+
+        page = self.client.get(url, {'limit': 6}).json()
+        self.assertEqual(page, {'blocks': expected(range(14, 8, -1)), 'length': 15, 'next_before': 9})
+
+        older = self.client.get(url, {'before': page['next_before'], 'limit': 6}).json()
+        self.assertEqual(older, {'blocks': expected(range(8, 2, -1)), 'length': 15, 'next_before': 3})
+
+        oldest = self.client.get(url, {'before_hash': older['blocks'][-1]['hash'], 'limit': 6}).json()
+        self.assertEqual(oldest, {'blocks': expected(range(2, -1, -1)), 'length': 15, 'next_before': None})
+
+
+class ValuesReaderTests(TestCase):
+    """
+    The values() fast path of the list endpoints renders exactly the JSON the
+    model serializers would.
+    """
+    def setUp(self):
+        creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        bidder = Bidder.objects.create(username='bidder', email='bidder@example.com')
+        tender = Tender.objects.create(
+            title='Tender', description='Desk chairs', budget='1500.50', creator=creator,
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        Tender.objects.create(title='No deadline', creator=creator)
+        # Без создателя и без участника: *_username отсутствует в выдаче сериализатора
+        Tender.objects.create(title='No creator')
+        Bid.objects.create(tender=tender, bidder=bidder, price='99.90', proposal='Cheap')
+        Bid.objects.create(tender=tender, price='120.00', proposal='Anonymous')
+        ChainWrite.objects.create(kind='local', tender=tender, data={'action': 'Tender Created'})
+        self.context = {'request': Request(APIRequestFactory().get('/api/tenders/'))}
+
+    def assertSameJSON(self, serializer_class, queryset):
+        reader = ValuesReader(serializer_class(context=self.context))
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(reader.to_representation(reader.values(queryset))),
+            renderer.render(serializer_class(queryset, many=True, context=self.context).data),
+        )
+
+    def test_tenders(self):
+        self.assertSameJSON(TenderSerializer, Tender.objects.select_related('creator').order_by('-id'))
+
+    def test_bids(self):
+        self.assertSameJSON(BidSerializer, Bid.objects.select_related('bidder').order_by('-id'))
+
+    def test_chain_writes(self):
+        self.assertSameJSON(ChainWriteSerializer, ChainWrite.objects.order_by('-id'))
+
+    def test_url_format_suffix(self):
+        self.context['format'] = 'json'
+        self.assertSameJSON(TenderSerializer, Tender.objects.select_related('creator').order_by('-id'))
+
+
+class StorageBackendTests(TestCase):
+    """
+    Each chain picks its own storage: a chain built from records in memory
+    never touches the disk, and the database backend keeps chains apart by
+    scope.
+    """
+    def database_chain(self, name, **kwargs):
+        storage = DatabaseStorage(ChainBlock, checkpoint_model=ChainCheckpoint, chain=name)
+        with redirect_stdout(io.StringIO()):
+            return Blockchain(difficulty=1, storage=storage, **kwargs)
+
+    def test_memory_chain_does_no_io(self):
+        with redirect_stdout(io.StringIO()):
+            records = Blockchain(difficulty=1, storage='memory').to_list_of_dicts()
+            with mock.patch('builtins.open', side_effect=AssertionError("file opened")):
+                chain = Blockchain.load_from_list_of_dicts(records, difficulty=1)
+                chain.add_block({'action': 'Bid Submitted', 'bid_id': 1})
+                self.assertTrue(chain.validate())
+        self.assertEqual(len(chain.chain), 2)
+
+    def test_database_storage(self):
+        chain = self.database_chain('first')
+        with redirect_stdout(io.StringIO()):
+            chain.add_block({'action': 'Tender Created (Global)', 'tender_id': 1})
+            chain.add_block({'action': 'Tender Closed (Global)', 'tender_id': 1})
+        self.database_chain('second')
+
+        self.assertEqual(ChainBlock.objects.filter(chain='first').count(), 3)
+        self.assertFalse(ChainBlock.objects.filter(chain='second').exists())
+        self.assertEqual(self.database_chain('first').to_list_of_dicts(), chain.to_list_of_dicts())
+
+    def test_sync_verification_rejects_tampered_chain(self):
+        chain = self.database_chain('tampered')
+        with redirect_stdout(io.StringIO()):
+            chain.add_block({'action': 'Bid Submitted', 'bid_id': 1})
+        records = chain.to_list_of_dicts()
+
+        ChainBlock.objects.filter(chain='tampered', index=1).update(data={'action': 'Bid Submitted', 'bid_id': 2})
+        with self.assertRaisesMessage(ValueError, 'block 1: stored hash does not match block contents'):
+            self.database_chain('tampered', verify='sync')
+
+        records[1]['nonce'] += 1
+        with self.assertRaisesMessage(ValueError, 'block 1: stored hash does not match block contents'):
+            Blockchain.load_from_list_of_dicts(records, difficulty=1, verify='sync')
+
+
+class LocalChainRowsTests(TestCase):
+    """
+    A tender's local chain is stored one row per block: appending reads only
+    the head, and an empty tender gets its genesis block first.
+    """
+    def test_add_block_to_empty_tender(self):
+        tender = Tender.objects.create(title='Поставка')
+        with redirect_stdout(io.StringIO()):
+            first = tender.add_block_to_chain({'action': 'Bid Submitted', 'bid_id': 1})
+            second = tender.add_block_to_chain({'action': 'Bid Submitted', 'bid_id': 2})
+
+        self.assertEqual((first.index, second.index), (1, 2))
+        records = tender.get_local_chain_records()
+        self.assertEqual([record['index'] for record in records], [0, 1, 2])
+        self.assertEqual(records[0]['data'], 'Genesis Block')
+        self.assertEqual(records[1]['previous_hash'], records[0]['hash'])
+
+        tender.refresh_from_db()
+        self.assertEqual((tender.local_chain_length, tender.local_chain_head_hash), (3, second.hash))
+        with redirect_stdout(io.StringIO()):
+            local_chain = tender.get_blockchain_instance()
+        self.assertTrue(local_chain.validate(full=True))
+
+
+class TenderChainBlocksMigrationTests(TransactionTestCase):
+    """
+    Migration 0003 moves each Tender.blockchain_data JSON list into
+    TenderChainBlock rows and records the chain head.
+    """
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(target)
+        return executor.loader.project_state(target).apps
+
+    def test_blobs_are_copied_to_rows(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        with redirect_stdout(io.StringIO()):
+            chain = Blockchain(difficulty=1, storage='memory')
+            chain.add_block({'action': 'Bid Submitted', 'bid_id': 1})
+        records = chain.to_list_of_dicts()
+
+        old_apps = self.migrate([('tenders', '0002_initial')])
+        OldTender = old_apps.get_model('tenders', 'Tender')
+        with_chain = OldTender.objects.create(title='С цепочкой', blockchain_data=json.dumps(records))
+        empty = OldTender.objects.create(title='Без цепочки', blockchain_data='[]')
+
+        new_apps = self.migrate([('tenders', '0003_tender_chain_blocks')])
+        NewTender = new_apps.get_model('tenders', 'Tender')
+        NewBlock = new_apps.get_model('tenders', 'TenderChainBlock')
+        self.assertEqual(
+            list(NewBlock.objects.filter(tender_id=with_chain.pk).order_by('index')
+                 .values(*TenderChainBlock.RECORD_FIELDS)),
+            records,
+        )
+        self.assertEqual(
+            NewTender.objects.filter(pk=with_chain.pk).values_list('local_chain_head_hash', 'local_chain_length').get(),
+            (records[-1]['hash'], 2),
+        )
+        self.assertFalse(NewBlock.objects.filter(tender_id=empty.pk).exists())
+        self.assertEqual(NewTender.objects.get(pk=empty.pk).local_chain_length, 0)
+
+
+class ChainWriteClaimTests(TransactionTestCase):
+    """
+    Sealers in different processes claim writes before mining them, so every
+    write is sealed exactly once and the chains keep the queue order.
+    """
+    def setUp(self):
+        creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        self.tenders = [Tender.objects.create(title=f'Tender {i}', creator=creator) for i in range(2)]
+        self.global_chain = Blockchain(difficulty=1, storage='memory')
+        for patcher in (
+            mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', self.global_chain),
+            mock.patch.object(GlobalChain, 'GLOBAL_EVENT_BATCHER', None),
+            mock.patch.object(chain_writes, 'SEALING_MODE', 'worker'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for i in range(3):
+            for tender in self.tenders:
+                chain_writes.record_tender_event(tender, {'action': 'Bid Submitted', 'n': i},
+                                                 {'action': 'Bid Submitted (Global)', 'tender_id': tender.pk, 'n': i})
+
+    def assertSealedOnce(self):
+        writes = list(ChainWrite.objects.order_by('pk'))
+        self.assertEqual({write.status for write in writes}, {'sealed'})
+        for tender in self.tenders:
+            blocks = list(TenderChainBlock.objects.filter(tender=tender).order_by('index'))
+            # Генезис и по блоку на каждую запись, в порядке очереди
+            self.assertEqual([block.data.get('n') for block in blocks[1:]], [0, 1, 2])
+            local = [write for write in writes if write.kind == 'local' and write.tender_id == tender.pk]
+            self.assertEqual([write.block_hash for write in local], [block.hash for block in blocks[1:]])
+        global_writes = [write for write in writes if write.kind == 'global']
+        self.assertEqual(
+            [write.block_hash for write in global_writes],
+            [block.hash for block in self.global_chain.chain[1:]],
+        )
+
+    def test_concurrent_sealers(self):
+        add_block_to_chain = Tender.add_block_to_chain
+        started = threading.Event()
+        second = []
+
+        def seal_in_other_process():
+            # Другой процесс: свой _seal_lock и свое подключение к БД
+            with mock.patch.object(chain_writes, '_seal_lock', threading.Lock()):
+                second.append(chain_writes.seal_pending_writes())
+
+        def add_block_while_other_sealer_runs(tender, data):
+            if not started.is_set():
+                started.set()
+                thread = threading.Thread(target=seal_in_other_process)
+                thread.start()
+                thread.join()
+            return add_block_to_chain(tender, data)
+
+        with mock.patch.object(Tender, 'add_block_to_chain', add_block_while_other_sealer_runs), \
+                redirect_stdout(io.StringIO()):
+            processed = chain_writes.seal_pending_writes()
+            # Записи, добавленные, пока обработчик работает, он же и запечатает
+            chain_writes.record_tender_event(self.tenders[0], {'action': 'Late', 'n': 3})
+            processed += chain_writes.seal_pending_writes()
+
+        self.assertEqual(second, [0])
+        self.assertEqual(processed, 13)
+        TenderChainBlock.objects.filter(data__action='Late').delete()
+        ChainWrite.objects.filter(data__action='Late').delete()
+        self.assertSealedOnce()
+
+    def test_abandoned_claim_is_taken_over(self):
+        claimed_at = timezone.now() - timedelta(seconds=chain_writes.SEAL_CLAIM_TIMEOUT + 1)
+        first = ChainWrite.objects.order_by('pk')[:4]
+        ChainWrite.objects.filter(pk__in=first).update(status='sealing', claimed_by='dead', claimed_at=claimed_at)
+
+        with redirect_stdout(io.StringIO()):
+            # Живой захват другого обработчика: ждем его, а не обгоняем
+            ChainWrite.objects.filter(claimed_by='dead').update(claimed_at=timezone.now())
+            self.assertEqual(chain_writes.seal_pending_writes(), 0)
+            self.assertEqual(ChainWrite.objects.filter(status='sealed').count(), 0)
+
+            ChainWrite.objects.filter(claimed_by='dead').update(claimed_at=claimed_at)
+            self.assertEqual(chain_writes.seal_pending_writes(), 12)
+        self.assertSealedOnce()
+
+
+class TenderDeletionQueueTests(TestCase):
+    """
+    Deleting a tender does not wait for mining: the deletion is queued after
+    its chain writes and only happens if they are sealed. Until then the
+    tender takes no bids or edits; a refused deletion is recorded as aborted.
+    """
+    def setUp(self):
+        self.creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        self.bidder = Bidder.objects.create(username='bidder', email='bidder@example.com')
+        self.login(self.creator)
+        self.tender = Tender.objects.create(title='Tender', creator=self.creator)
+        with redirect_stdout(io.StringIO()):
+            self.global_chain = Blockchain(difficulty=1, storage='memory')
+        for patcher in (
+            mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', self.global_chain),
+            mock.patch.object(GlobalChain, 'GLOBAL_EVENT_BATCHER', None),
+            mock.patch.object(chain_writes, 'SEALING_MODE', 'worker'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def login(self, user):
+        self.client.force_login(user)
+        session = self.client.session
+        session['mfa_verified'] = True
+        session.save()
+
+    def seal(self):
+        with redirect_stdout(io.StringIO()):
+            chain_writes.seal_pending_writes()
+
+    def delete(self, via='api'):
+        with redirect_stdout(io.StringIO()):
+            if via == 'api':
+                return self.client.delete(reverse('tender-detail', args=[self.tender.pk]))
+            return self.client.post(reverse('tender_delete', args=[self.tender.pk]))
+
+    def writes(self):
+        return list(ChainWrite.objects.order_by('pk').values_list('kind', 'status'))
+
+    def test_api_delete_is_queued(self):
+        response = self.delete()
+        self.assertEqual(response.status_code, 202)
+        receipts = response.json()['chain_writes']
+        self.assertEqual([receipt['kind'] for receipt in receipts], ['local', 'global', 'delete'])
+        self.assertEqual({receipt['status'] for receipt in receipts}, {'pending'})
+        self.assertEqual(Tender.objects.get(pk=self.tender.pk).status, 'deleting')
+
+        self.seal()
+        self.assertFalse(Tender.objects.filter(pk=self.tender.pk).exists())
+        self.assertEqual(self.writes(), [('local', 'sealed'), ('global', 'sealed'), ('delete', 'sealed')])
+
+    def test_queued_tender_takes_no_bids_or_edits(self):
+        self.delete(via='form')
+        detail = reverse('tender-detail', args=[self.tender.pk])
+        self.assertEqual(self.client.patch(detail, {'title': 'Renamed'}, content_type='application/json').status_code, 404)
+        self.assertEqual(list(self.client.get(reverse('tender_list')).context['tenders']), [])
+        # Повторное удаление не ставит новых записей
+        self.delete(via='form')
+        self.assertEqual(ChainWrite.objects.count(), 3)
+
+        self.login(self.bidder)
+        with redirect_stdout(io.StringIO()):
+            response = self.client.post(reverse('bid-list'), {'tender': self.tender.pk, 'price': '10.00'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_bid_between_enqueue_and_sealing(self):
+        self.delete()
+        # Заявка, проверившая статус тендера до постановки удаления в очередь
+        Bid.objects.create(tender=self.tender, bidder=self.bidder, price='10.00')
+        self.seal()
+
+        tender = Tender.objects.get(pk=self.tender.pk)
+        self.assertEqual(tender.status, 'active')
+        self.assertEqual(self.writes(), [
+            ('local', 'sealed'), ('global', 'sealed'), ('delete', 'failed'), ('local', 'sealed'), ('global', 'sealed'),
+        ])
+        self.assertIn("the tender has bids", ChainWrite.objects.get(kind='delete').error)
+        actions = [record['data']['action'] for record in tender.get_local_chain_records()[1:]]
+        self.assertEqual(actions, ['Tender Deleted (Local)', 'Tender Deletion Aborted (Local)'])
+        self.assertEqual(
+            [block.data['action'] for block in self.global_chain.get_blocks_for_tender(tender.pk)],
+            ['Tender Deleted (Global)', 'Tender Deletion Aborted (Global)'],
+        )
+
+    def test_failed_write_keeps_tender(self):
+        self.delete(via='form')
+        with mock.patch.object(chain_writes, 'submit_tender_event_to_global_chain', side_effect=OSError('disk full')), \
+                redirect_stdout(io.StringIO()):
+            chain_writes.seal_pending_writes()
+
+        self.assertEqual(Tender.objects.get(pk=self.tender.pk).status, 'active')
+        local, global_write, deletion = ChainWrite.objects.order_by('pk')[:3]
+        self.assertEqual((local.status, global_write.status, deletion.status), ('sealed', 'failed', 'failed'))
+        self.assertIn(str(global_write.pk), deletion.error)
+        # Локальная цепочка уже записала удаление: за ним ставится отмена
+        self.assertEqual(self.writes()[3:], [('local', 'sealed'), ('global', 'failed')])
+
+
+class TenderDeletionSyncTests(TransactionTestCase):
+    """With BLOCKCHAIN_SEALING = 'sync' the deletion is done before the response."""
+    def setUp(self):
+        creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        self.client.force_login(creator)
+        session = self.client.session
+        session['mfa_verified'] = True
+        session.save()
+        self.tender = Tender.objects.create(title='Tender', creator=creator)
+        with redirect_stdout(io.StringIO()):
+            global_chain = Blockchain(difficulty=1, storage='memory')
+        for patcher in (
+            mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', global_chain),
+            mock.patch.object(GlobalChain, 'GLOBAL_EVENT_BATCHER', None),
+            mock.patch.object(chain_writes, 'SEALING_MODE', 'sync'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def delete(self):
+        with redirect_stdout(io.StringIO()):
+            return self.client.delete(reverse('tender-detail', args=[self.tender.pk]))
+
+    def test_deleted_tender(self):
+        self.assertEqual(self.delete().status_code, 204)
+        self.assertFalse(Tender.objects.filter(pk=self.tender.pk).exists())
+
+    def test_refused_deletion_reports_sealed_receipts(self):
+        with mock.patch.object(chain_writes, 'submit_tender_event_to_global_chain', side_effect=OSError('disk full')):
+            response = self.delete()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            [(receipt['kind'], receipt['status']) for receipt in response.json()['chain_writes']],
+            [('local', 'sealed'), ('global', 'failed'), ('delete', 'failed')],
+        )
+        self.assertEqual(Tender.objects.get(pk=self.tender.pk).status, 'active')
+
+
+class AuditChainsCommandTests(TestCase):
+    """
+    audit_chains writes one JSON line per mismatch and a summary, and fails
+    when anything is wrong.
+    """
+    def setUp(self):
+        self.tender = Tender.objects.create(title='Поставка')
+        with redirect_stdout(io.StringIO()):
+            self.tender.add_block_to_chain({'action': 'Bid Submitted', 'bid_id': 1})
+            self.global_chain = Blockchain(difficulty=1, storage='memory')
+            link = self.global_chain.add_block({
+                'action': 'Tender Created (Global)',
+                'tender_id': self.tender.pk,
+                'local_chain_root_hash': self.tender.local_chain_head_hash,
+            })
+        Tender.objects.filter(pk=self.tender.pk).update(global_chain_link_hash=link.hash)
+        patcher = mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', self.global_chain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def audit(self):
+        out = io.StringIO()
+        try:
+            call_command('audit_chains', workers=1, stdout=out)
+        except CommandError as error:
+            failure = str(error)
+        else:
+            failure = None
+        return [json.loads(line) for line in out.getvalue().splitlines()], failure
+
+    def test_consistent_chains(self):
+        report, failure = self.audit()
+        self.assertIsNone(failure)
+        self.assertEqual(report, [{'type': 'summary', 'tenders': 1, 'global_blocks': 2, 'mismatches': 0}])
+
+    def test_mismatches_are_reported(self):
+        TenderChainBlock.objects.filter(tender=self.tender, index=1).update(
+            data={'action': 'Bid Submitted', 'bid_id': 2}
+        )
+        with redirect_stdout(io.StringIO()):
+            self.global_chain.add_block({
+                'action': 'Tender Updated (Global)', 'tender_id': self.tender.pk, 'local_chain_root_hash': 'f' * 64,
+            })
+            self.global_chain.add_block({
+                'action': 'Tender Created (Global)', 'tender_id': self.tender.pk + 1, 'local_chain_root_hash': '0',
+            })
+
+        report, failure = self.audit()
+        self.assertEqual(failure, "3 mismatches found.")
+        self.assertEqual(
+            [(entry['type'], entry['tender_id']) for entry in report[:-1]],
+            [
+                ('local_chain_invalid', self.tender.pk),
+                ('anchor_not_found', self.tender.pk),
+                ('tender_missing', self.tender.pk + 1),
+            ],
+        )
+        self.assertEqual(report[0]['block_index'], 1)
+        self.assertEqual(report[1]['global_block_index'], 2)
+        self.assertEqual(report[-1], {'type': 'summary', 'tenders': 1, 'global_blocks': 4, 'mismatches': 3})
+
+
+class AnchorProofViewTests(TestCase):
+    def setUp(self):
+        creator = Bidder.objects.create(username='creator', email='creator@example.com')
+        self.tender = Tender.objects.create(title='Tender', creator=creator, local_chain_head_hash='b' * 64)
+        chain = build_anchor_chain(tender_id=self.tender.pk)
+        patcher = mock.patch.object(GlobalChain, 'GLOBAL_TENDER_CHAIN', chain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_anchor_proof(self):
+        root = self.client.get(reverse('global_chain_root')).json()
+        response = self.client.get(reverse('tender_anchor_proof', args=[self.tender.pk])).json()
+        self.assertEqual(response['local_chain_root_hash'], 'b' * 64)
+        self.assertEqual(response['proof']['chain_length'], root['chain_length'])
+        self.assertTrue(verify_anchor_proof(response['proof'], self.tender.pk, 'b' * 64, root['chain_root']))
+
+        url = reverse('tender_anchor_proof', args=[self.tender.pk])
+        self.assertEqual(self.client.get(url, {'local_chain_root_hash': 'f' * 64}).status_code, 404)
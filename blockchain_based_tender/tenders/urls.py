@@ -6,6 +6,8 @@ from .utils import download_contract
 # Router for the Tender API ViewSet 
 router = DefaultRouter()
 router.register(r'tenders', views.TenderViewSet, basename='tender')
+router.register(r'bids', views.BidViewSet, basename='bid')
+router.register(r'chain-writes', views.ChainWriteViewSet, basename='chain-write')
 
 # Template URL patterns
 template_urlpatterns = [
@@ -22,6 +24,14 @@ template_urlpatterns = [
 
     path('blockchain/', views.blockchain_view, name='blockchain_view'),
 
+    # Pages of blocks for the visualizer (?before=, ?before_hash=, ?limit=)
+    path('blockchain/global/blocks/', views.global_chain_blocks, name='global_chain_blocks'),
+    path('<int:pk>/blockchain/blocks/', views.tender_chain_blocks, name='tender_chain_blocks'),
+
+    # Inclusion proofs of tender anchors and the root they are checked against
+    path('blockchain/global/root/', views.global_chain_root, name='global_chain_root'),
+    path('<int:pk>/blockchain/anchor-proof/', views.tender_anchor_proof, name='tender_anchor_proof'),
+
     path('<int:tender_id>/contract/', download_contract, name='download_contract'),
 ]
 
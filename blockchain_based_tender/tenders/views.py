@@ -1,24 +1,29 @@
 import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden, HttpResponse 
+from django.http import HttpResponseForbidden, HttpResponse, JsonResponse
+from django.urls import reverse
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Tender, Bid 
-from .serializers import TenderSerializer, BidSerializer 
+from .models import Tender, Bid, ChainWrite, TenderChainBlock
+from .serializers import TenderSerializer, BidSerializer, ChainWriteSerializer, ValuesReader
 from .forms import TenderForm, BidForm 
 from .permissions import IsCreatorOrReadOnly
+from .pagination import NewestFirstCursorPagination
 from django.utils import timezone 
 from rest_framework import serializers 
 from datetime import datetime 
 from django.core.exceptions import ValidationError
 from django.contrib import messages 
 from decimal import Decimal
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 # --- BLOCKCHAIN INTEGRATION IMPORT ---
 from blockchain.Block import Block, serialize_model_data 
-from blockchain.GlobalChain import add_tender_event_to_global_chain, get_global_chain_data
+from blockchain.GlobalChain import get_global_chain, get_global_chain_data, get_tender_anchor_proof
+from .chain_writes import enqueue_local_block, enqueue_tender_deletion, record_tender_event
 # ------------------------------------
 
 class BlockChainJSONEncoder(json.JSONEncoder):
@@ -45,7 +50,8 @@ class BlockChainJSONEncoder(json.JSONEncoder):
                 'title': obj.title,
                 'creator': obj.creator.username if obj.creator else None,
                 'status': obj.status,
-                'bid_count': obj.bids.count()
+                # Только аннотированное значение: кодировщик не делает запросов
+                'bid_count': getattr(obj, 'bid_count', None)
             }
 
         return json.JSONEncoder.default(self, obj)
@@ -53,13 +59,44 @@ class BlockChainJSONEncoder(json.JSONEncoder):
 
 # --- DRF ViewSets ---
 
-class TenderViewSet(viewsets.ModelViewSet):
+class ValuesListMixin:
+    """
+    Read-only fast path for list(): rows are fetched with .values() and
+    converted by serializers.ValuesReader, instead of building a model
+    instance and running the serializer for every row. The JSON is the same.
+    """
+    def list(self, request, *args, **kwargs):
+        reader = ValuesReader(self.get_serializer())
+        queryset = reader.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(queryset))
+
+
+class TenderViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """
     Provides full CRUD operations for Tender objects via API at /api/tenders/.
+    The list is cursor-paginated and can be filtered with ?status=.
+    Tenders queued for deletion are left out (and so cannot be edited).
     """
     queryset = Tender.objects.all()
     serializer_class = TenderSerializer
     permission_classes = [IsAuthenticated, IsCreatorOrReadOnly] 
+    pagination_class = NewestFirstCursorPagination
+
+    def get_queryset(self):
+        queryset = Tender.objects.exclude(status='deleting').select_related('creator')
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Блоки еще добываются: отдаем квитанции, по которым можно узнать результат
+        response.data['chain_writes'] = [write.to_receipt() for write in self.chain_writes]
+        return response
 
     def perform_create(self, serializer):
         
@@ -68,28 +105,47 @@ class TenderViewSet(viewsets.ModelViewSet):
             
         tender = serializer.save(creator=self.request.user)
         
-        # 1. Записываем событие в ЛОКАЛЬНУЮ цепочку (Цепочка 1: Тендер/Биды)
+        # 1. Событие для ЛОКАЛЬНОЙ цепочки (Цепочка 1: Тендер/Биды)
         tender_data_local = serialize_model_data(tender, ['id', 'title', 'budget', 'deadline', 'creator'])
-        tender.add_block_to_chain({'action': 'Tender Created (Local)', 'data': tender_data_local})
         
-        # 2. Формируем данные для ГЛОБАЛЬНОЙ цепочки (Цепочка 2: Реестр Тендеров)
+        # 2. Событие для ГЛОБАЛЬНОЙ цепочки (Цепочка 2: Реестр Тендеров).
+        # ЯКОРЕНИЕ: local_chain_root_hash подставляется при запечатывании,
+        # когда блок локальной цепочки уже добыт; тогда же сохраняется global_chain_link_hash
         tender_data_global = {
             'action': 'Tender Created (Global)',
             'tender_id': tender.pk,
             'title': tender.title,
-            # ЯКОРЕНИЕ: Ссылаемся на хэш последнего блока локальной цепочки
-            'local_chain_root_hash': tender.get_local_chain_root_hash()
         }
         
-        # 3. Добавляем блок в ГЛОБАЛЬНУЮ цепочку и сохраняем ЯКОРНЫЙ ХЭШ
-        global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-        tender.global_chain_link_hash = global_link_hash
-        tender.save()
+        self.chain_writes = record_tender_event(
+            tender, {'action': 'Tender Created (Local)', 'data': tender_data_local}, tender_data_global
+        )
         
-        print(f"Tender {tender.pk} created. Local Root: {tender.get_local_chain_root_hash()[:10]}, Global Link: {global_link_hash[:10]}")
+        print(f"Tender {tender.pk} created. Chain writes queued: {[write.pk for write in self.chain_writes]}")
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        204 if the tender is already gone (BLOCKCHAIN_SEALING = 'sync'),
+        otherwise the receipts of the deletion's writes: 202 while it is
+        queued, 409 if it was refused.
+        """
+        self.perform_destroy(self.get_object())
+        # При 'sync' записи запечатаны еще при commit: берем их состояние из БД
+        for write in self.chain_writes:
+            write.refresh_from_db()
+        deletion = self.chain_writes[-1]
+        if deletion.status == 'sealed':
+            return Response(status=204)
+        return Response(
+            {'chain_writes': [write.to_receipt() for write in self.chain_writes]},
+            status=409 if deletion.status == 'failed' else 202,
+        )
 
     def perform_destroy(self, instance):
-        """Override delete to add blockchain recording."""
+        """
+        Override delete to add blockchain recording. The deletion is queued
+        behind its chain writes and happens once they are sealed.
+        """
         # Check if tender has bids
         if instance.bids.exists():
             from rest_framework.exceptions import ValidationError
@@ -97,32 +153,58 @@ class TenderViewSet(viewsets.ModelViewSet):
         
         # Record deletion in blockchain before actual deletion
         tender_data_local = serialize_model_data(instance, ['id', 'title', 'budget', 'deadline', 'creator'])
-        instance.add_block_to_chain({'action': 'Tender Deleted (Local)', 'data': tender_data_local})
         
         tender_data_global = {
             'action': 'Tender Deleted (Global)',
             'tender_id': instance.pk,
             'title': instance.title,
-            'local_chain_root_hash': instance.get_local_chain_root_hash()
         }
         
-        global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-        print(f"Tender {instance.pk} deleted via API. Global Link: {global_link_hash[:10]}")
-        
-        # Perform the actual deletion
-        super().perform_destroy(instance)
+        # The local block needs the tender row, so the deletion itself is queued after it
+        try:
+            self.chain_writes = enqueue_tender_deletion(
+                instance, {'action': 'Tender Deleted (Local)', 'data': tender_data_local}, tender_data_global
+            )
+        except ValueError as exc:
+            from rest_framework.exceptions import ValidationError
+            raise ValidationError(f"Cannot delete tender: {exc}.")
+        print(f"Tender {instance.pk} deletion queued via API. Chain writes: {[write.pk for write in self.chain_writes]}")
+
+
+class ChainWriteViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Receipts of queued chain writes at /api/chain-writes/: poll one until
+    its status is 'sealed' to get the block hash.
+    """
+    queryset = ChainWrite.objects.all()
+    serializer_class = ChainWriteSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NewestFirstCursorPagination
 
 
-class BidViewSet(viewsets.ModelViewSet):
+class BidViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """
-    Provides CRUD operations for Bid objects. Users can only create bids.
+    Provides CRUD operations for Bid objects at /api/bids/. Users can only create bids.
+    The list is cursor-paginated and can be filtered with ?tender=.
     """
     queryset = Bid.objects.all()
     serializer_class = BidSerializer
     permission_classes = [IsAuthenticated] 
+    pagination_class = NewestFirstCursorPagination
 
     def get_queryset(self):
-        return Bid.objects.all() 
+        queryset = Bid.objects.select_related('bidder')
+        tender_id = self.request.query_params.get('tender')
+        if tender_id:
+            if not tender_id.isdigit():
+                raise serializers.ValidationError({'tender': "Must be a tender id."})
+            queryset = queryset.filter(tender_id=tender_id)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.data['chain_writes'] = [write.to_receipt() for write in self.chain_writes]
+        return response
 
     def perform_create(self, serializer):
         tender = serializer.validated_data.get('tender')
@@ -139,95 +221,19 @@ class BidViewSet(viewsets.ModelViewSet):
         
         # --- БЛОКЧЕЙН ДЕЙСТВИЕ: ТОЛЬКО ЦЕПОЧКА 1 (Локальная) ---
         bid_data_local = serialize_model_data(new_bid, ['id', 'tender', 'bidder', 'price', 'proposal', 'timestamp'])
-        tender.add_block_to_chain({'action': 'Bid Submitted', 'bid_data': bid_data_local})
-        print(f"Bid {new_bid.pk} sealed as a block in Tender {tender.pk} local chain (Chain 1).")
+        self.chain_writes = [enqueue_local_block(tender, {'action': 'Bid Submitted', 'bid_data': bid_data_local})]
+        print(f"Bid {new_bid.pk} queued for Tender {tender.pk} local chain (Chain 1), write {self.chain_writes[0].pk}.")
         # -------------------------------------------------
 
 
-# =========================================================
-# === AUTOMATION FUNCTIONS: Auto-Close & Winner Decision ===
-# =========================================================
-
-def automatic_winner_selection(tender):
-    """
-    Automates the winner selection process and seals the award decision on both chains.
-    """
-    if tender.status != 'closed':
-        return False
-    
-    best_bid = tender.bids.order_by('price').first()
-    
-    if best_bid:
-        tender.awarded_bid = best_bid
-        tender.status = 'awarded'
-        tender.save()
-        
-        # 1. Записываем событие в ЛОКАЛЬНУЮ цепочку (Цепочка 1: Тендер/Биды)
-        award_data_local = {
-            'action': 'Tender Awarded (Local)',
-            'winner_bid_id': best_bid.pk,
-            'final_price': str(best_bid.price),
-        }
-        tender.add_block_to_chain(award_data_local)
-        
-        # 2. Формируем данные для ГЛОБАЛЬНОЙ цепочки (Цепочка 2: Реестр Тендеров)
-        tender_data_global = {
-            'action': 'Tender Awarded (Global)',
-            'tender_id': tender.pk,
-            'winner': best_bid.bidder.username,
-            'final_price': str(best_bid.price),
-            # ЯКОРЕНИЕ: Ссылаемся на хэш последнего блока локальной цепочки
-            'local_chain_root_hash': tender.get_local_chain_root_hash() 
-        }
-        
-        # 3. Добавляем блок в ГЛОБАЛЬНУЮ цепочку и обновляем ЯКОРНЫЙ ХЭШ
-        global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-        tender.global_chain_link_hash = global_link_hash
-        tender.save()
-        
-        print(f"Tender {tender.pk} awarded. Local Root: {tender.get_local_chain_root_hash()[:10]}, Global Link: {global_link_hash[:10]}")
-        return True
-    
-    return True
-
-
-def auto_process_tenders():
-    """Checks all active tenders, closes expired ones, and selects winners."""
-    
-    expired_tenders = Tender.objects.filter(status='active', deadline__lt=timezone.now())
-    for tender in expired_tenders:
-        tender.status = 'closed'
-        tender.save()
-        
-        # 1. Локальная запись
-        tender.add_block_to_chain({'action': 'Tender Closed (Local)', 'reason': 'Deadline Expired'})
-        
-        # 2. Глобальная запись
-        tender_data_global = {
-            'action': 'Tender Closed (Global)',
-            'tender_id': tender.pk,
-            'local_chain_root_hash': tender.get_local_chain_root_hash() 
-        }
-        global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-        tender.global_chain_link_hash = global_link_hash
-        tender.save()
-        
-        print(f"Tender {tender.pk} closed.")
-    
-    newly_closed_tenders = Tender.objects.filter(status='closed')
-    for tender in newly_closed_tenders:
-        # Убедимся, что все закрытые тендеры имеют победителей (и якоря)
-        automatic_winner_selection(tender)
-
 # =========================================================
 # === TEMPLATE VIEWS ===
 # =========================================================
 
 @login_required
 def tender_list(request):
-    """Lists all tenders after running the auto-process functions."""
-    auto_process_tenders() 
-    tenders = Tender.objects.filter(status__in=['active', 'closed', 'awarded']).order_by('-deadline')
+    """Lists all tenders. Deadlines are handled by run_deadline_scheduler, not here."""
+    tenders = Tender.objects.filter(status__in=['active', 'closed', 'awarded']).select_related('creator').order_by('-deadline')
     return render(request, 'tenders/tender_list.html', {'tenders': tenders})
 
 
@@ -244,20 +250,18 @@ def tender_create(request):
             
             # --- БЛОКЧЕЙН ДЕЙСТВИЕ: Запускаем ту же логику, что и в DRF
             tender_data_local = serialize_model_data(tender, ['id', 'title', 'budget', 'deadline', 'creator'])
-            tender.add_block_to_chain({'action': 'Tender Created (Local)', 'data': tender_data_local})
             
             tender_data_global = {
                 'action': 'Tender Created (Global)',
                 'tender_id': tender.pk,
                 'title': tender.title,
-                'local_chain_root_hash': tender.get_local_chain_root_hash()
             }
             
-            global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-            tender.global_chain_link_hash = global_link_hash
-            tender.save()
+            writes = record_tender_event(
+                tender, {'action': 'Tender Created (Local)', 'data': tender_data_local}, tender_data_global
+            )
             
-            print(f"Tender {tender.pk} created via Form. Global Link: {global_link_hash[:10]}")
+            print(f"Tender {tender.pk} created via Form. Chain writes queued: {[write.pk for write in writes]}")
             
             return redirect('tender_detail', pk=tender.pk)
     else:
@@ -271,9 +275,6 @@ def tender_detail(request, pk):
     """Shows the detail of one tender, handles editing by creator, and bidding by others."""
     tender = get_object_or_404(Tender, pk=pk)
     
-    auto_process_tenders() 
-    tender = get_object_or_404(Tender, pk=pk) 
-    
     is_creator = (request.user == tender.creator)
     
     # --- TENDER EDITING (CREATOR) ---
@@ -287,20 +288,18 @@ def tender_detail(request, pk):
                 
                 # 1. Локальная запись
                 tender_data_local = serialize_model_data(tender, ['id', 'title', 'budget', 'deadline', 'creator', 'status'])
-                tender.add_block_to_chain({'action': 'Tender Updated (Local)', 'data': tender_data_local})
                 
-                # 2. Глобальная запись
+                # 2. Глобальная запись (якорь подставит обработчик очереди)
                 tender_data_global = {
                     'action': 'Tender Updated (Global)',
                     'tender_id': tender.pk,
                     'title': tender.title,
-                    'local_chain_root_hash': tender.get_local_chain_root_hash()
                 }
-                global_link_hash = add_tender_event_to_global_chain(tender_data_global)
-                tender.global_chain_link_hash = global_link_hash
-                tender.save()
+                writes = record_tender_event(
+                    tender, {'action': 'Tender Updated (Local)', 'data': tender_data_local}, tender_data_global
+                )
                 
-                print(f"Tender {tender.pk} updated. Global Link: {global_link_hash[:10]}")
+                print(f"Tender {tender.pk} updated. Chain writes queued: {[write.pk for write in writes]}")
                 
                 return redirect('tender_detail', pk=tender.pk)
         else:
@@ -313,7 +312,8 @@ def tender_detail(request, pk):
     bid_form = None
     bid_placed = Bid.objects.filter(tender=tender, bidder=request.user).exists()
     
-    if tender.status == 'active' and not is_creator:
+    # The scheduler may not have closed an expired tender yet
+    if tender.status == 'active' and not tender.is_expired() and not is_creator:
         if request.method == 'POST' and 'bid_submit' in request.POST:
             bid_form = BidForm(request.POST)
             if bid_form.is_valid():
@@ -324,8 +324,8 @@ def tender_detail(request, pk):
                 
                 # --- БЛОКЧЕЙН ДЕЙСТВИЕ: ТОЛЬКО ЛОКАЛЬНАЯ ЦЕПОЧКА (Цепочка 1) ---
                 bid_data_local = serialize_model_data(new_bid, ['id', 'tender', 'bidder', 'price', 'proposal', 'timestamp'])
-                tender.add_block_to_chain({'action': 'Bid Submitted', 'bid_data': bid_data_local})
-                print(f"Bid {new_bid.pk} sealed in Tender {tender.pk} local chain.")
+                write = enqueue_local_block(tender, {'action': 'Bid Submitted', 'bid_data': bid_data_local})
+                print(f"Bid {new_bid.pk} queued for Tender {tender.pk} local chain, write {write.pk}.")
                 # -------------------------------------------------
                 
                 return redirect('tender_detail', pk=tender.pk)
@@ -334,9 +334,9 @@ def tender_detail(request, pk):
     
     
     if is_creator or tender.status != 'active':
-        bids = Bid.objects.filter(tender=tender).order_by('price')
+        bids = Bid.objects.filter(tender=tender).select_related('bidder').order_by('price')
     else:
-        bids = Bid.objects.filter(tender=tender).order_by('timestamp') 
+        bids = Bid.objects.filter(tender=tender).select_related('bidder').order_by('timestamp') 
     
     winner_bid = None
     if tender.status == 'awarded' and hasattr(tender, 'awarded_bid'):
@@ -369,112 +369,222 @@ def tender_delete(request, pk):
     if request.method == 'POST':
         # --- БЛОКЧЕЙН ДЕЙСТВИЕ: Record deletion in both chains ---
         
-        # 1. Локальная запись
-        tender.add_block_to_chain({'action': 'Tender Deleted (Local)', 'reason': 'Creator deleted tender'})
-        
-        # 2. Глобальная запись
+        # 1. Локальная запись, 2. Глобальная запись
         tender_data_global = {
             'action': 'Tender Deleted (Global)',
             'tender_id': tender.pk,
             'title': tender.title,
-            'local_chain_root_hash': tender.get_local_chain_root_hash()
         }
-        global_link_hash = add_tender_event_to_global_chain(tender_data_global)
+        # Локальный блок требует строку тендера: сам тендер удаляется после запечатывания записей
+        try:
+            writes = enqueue_tender_deletion(
+                tender, {'action': 'Tender Deleted (Local)', 'reason': 'Creator deleted tender'}, tender_data_global
+            )
+        except ValueError as exc:
+            messages.error(request, f"Cannot delete tender: {exc}.")
+            return redirect('tender_detail', pk=tender.pk)
         
-        print(f"Tender {tender.pk} deleted. Global Link: {global_link_hash[:10]}")
+        print(f"Tender {tender.pk} deletion queued. Chain writes: {[write.pk for write in writes]}")
         
-        # Delete the tender
-        tender.delete()
-        messages.success(request, "Tender deleted successfully.")
+        messages.success(request, "Tender deletion queued. It is removed once recorded in the blockchain.")
         return redirect('tender_list')
     
     # If GET request, show confirmation page
     return render(request, 'tenders/tender_confirm_delete.html', {'tender': tender})
 
-def blockchain_view(request):
+# Пределы визуализатора: страница остается быстрой при тысячах тендеров
+VISUALIZER_MAX_TENDERS = 20
+VISUALIZER_MAX_BLOCKS = 50
+
+# Размер страницы API блоков (?limit=)
+MAX_BLOCK_PAGE_SIZE = 200
+
+
+class BlockPageError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _block_window(request, length, index_of_hash):
     """
-    Отображает страницу визуализатора блокчейна. 
-    Показывает ГЛОБАЛЬНУЮ цепочку (Цепочка 2) и ЛОКАЛЬНУЮ цепочку (Цепочка 1)
-    самого свежего тендера.
+    Turns ?before=<index> or ?before_hash=<hash>, plus ?limit=, into the
+    index window [start, end) of one page, counting back from the end of
+    the chain. `index_of_hash` returns the index of the block with a given
+    hash, or None.
     """
     try:
-        tender = Tender.objects.latest('created_at')
-        # Локальная цепочка
-        local_blockchain_instance = tender.get_blockchain_instance()
-        local_chain_data = local_blockchain_instance.chain
-        local_chain_title = f"Local Bids Chain (Chain 1) for Tender #{tender.pk} - {tender.title}"
-    except Tender.DoesNotExist:
-        local_chain_data = []
-        local_chain_title = "Local Bids Chain (Chain 1) - No Tenders Found"
-        tender = None
-        
-    # Глобальная цепочка
-    global_chain_data = get_global_chain_data()
-    
-    context = {
-        'global_chain_json': json.dumps(global_chain_data, cls=BlockChainJSONEncoder, indent=4),
-        'local_chain_json': json.dumps(local_chain_data, cls=BlockChainJSONEncoder, indent=4),
-        'tender': tender,
-        'local_chain_title': local_chain_title,
-        'global_chain_title': "Global Tender Registry (Chain 2) - All Tenders"
-    }
-    
-    return render(request, 'tenders/blockchain_visualizer.html', context)
+        limit = int(request.GET.get('limit', VISUALIZER_MAX_BLOCKS))
+        before = int(request.GET['before']) if 'before' in request.GET else length
+    except ValueError:
+        raise BlockPageError("'before' and 'limit' must be integers.")
+    if 'before_hash' in request.GET:
+        before = index_of_hash(request.GET['before_hash'])
+        if before is None:
+            raise BlockPageError("No block with this hash.", status=404)
+    if limit < 1:
+        raise BlockPageError("'limit' must be positive.")
+    end = max(0, min(before, length))
+    return max(0, end - min(limit, MAX_BLOCK_PAGE_SIZE)), end
+
+
+def _block_page(blocks, length, start):
+    """One page of blocks, newest first; `next_before` is the cursor of the older page."""
+    return {'blocks': blocks, 'length': length, 'next_before': start if start > 0 else None}
+
+
+def _global_chain_page_json(chain, start, end):
+    """
+    _block_page() of the global chain as JSON bytes. Each block is written by
+    Block.to_json(), so block payloads are not serialized again.
+    """
+    blocks = b', '.join(block.to_json() for block in reversed(chain[start:end]))
+    page = _block_page(None, len(chain), start)
+    del page['blocks']
+    return b'{"blocks": [' + blocks + b'], ' + json.dumps(page)[1:].encode()
+
+
+def _local_block_dict(record):
+    # Время в том же формате, что и Block.to_dict
+    return dict(record, timestamp=datetime.fromtimestamp(record['timestamp']).isoformat())
+
+
+def _block_page_response(build_page):
+    try:
+        page = build_page()
+    except BlockPageError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    if isinstance(page, bytes):
+        return HttpResponse(page, content_type='application/json')
+    return JsonResponse(page, encoder=BlockChainJSONEncoder)
+
+
+def global_chain_blocks(request):
+    """
+    JSON page of global chain blocks (Chain 2), newest first:
+    ?before=<index> or ?before_hash=<hash>, and ?limit= (at most MAX_BLOCK_PAGE_SIZE).
+    """
+    def build_page():
+        global_chain = get_global_chain()
+        chain = global_chain.chain
+
+        def index_of_hash(block_hash):
+            block = global_chain.get_block_by_hash(block_hash)
+            return None if block is None else block.index
+
+        start, end = _block_window(request, len(chain), index_of_hash)
+        return _global_chain_page_json(chain, start, end)
+
+    return _block_page_response(build_page)
+
+
+def tender_chain_blocks(request, pk):
+    """
+    JSON page of a tender's local chain blocks (Chain 1), newest first, with
+    the same parameters as global_chain_blocks. Reads only the requested rows.
+    """
+    tender = get_object_or_404(Tender.objects.only('pk', 'local_chain_length'), pk=pk)
+
+    def build_page():
+        def index_of_hash(block_hash):
+            return tender.chain_blocks.filter(hash=block_hash).values_list('index', flat=True).first()
+
+        start, end = _block_window(request, tender.local_chain_length, index_of_hash)
+        records = tender.chain_blocks.filter(index__gte=start, index__lt=end).order_by('-index')
+        blocks = [_local_block_dict(record) for record in records.values(*TenderChainBlock.RECORD_FIELDS)]
+        return _block_page(blocks, tender.local_chain_length, start)
+
+    return _block_page_response(build_page)
+
 
-def debug_blockchain_data(tender):
-    """Debug function to see what's actually in the blockchain"""
-    blockchain = tender.get_blockchain_instance()
-    print(f"\n=== DEBUG Tender {tender.id} - {tender.title} ===")
-    print(f"Total blocks: {len(blockchain.chain)}")
-    for i, block in enumerate(blockchain.chain):
-        print(f"Block {i}: {block.data}")
-    print("=== END DEBUG ===\n")
 
+def global_chain_root(request):
+    """
+    The global chain's current length and header Merkle root, the value
+    auditors check anchor proofs against.
+    """
+    global_chain = get_global_chain()
+    root = global_chain.get_proof_root()
+    root['head_hash'] = global_chain.get_latest_block().hash
+    return JsonResponse(root)
+
+
+def tender_anchor_proof(request, pk):
+    """
+    Compact proof that the global chain anchors a local chain head of the
+    tender: ?local_chain_root_hash= (defaults to the tender's current head).
+    Check it with blockchain.Proofs.verify_anchor_proof against the root
+    from global_chain_root; no other blocks are needed.
+    """
+    local_chain_root_hash = request.GET.get('local_chain_root_hash')
+    if local_chain_root_hash is None:
+        # Удаленный тендер тоже можно проверить, если хэш указан явно
+        tender = get_object_or_404(Tender.objects.only('pk', 'local_chain_head_hash'), pk=pk)
+        local_chain_root_hash = tender.get_local_chain_root_hash()
+
+    proof = get_tender_anchor_proof(pk, local_chain_root_hash)
+    if proof is None:
+        return JsonResponse({'error': "This local chain head is not anchored in the global chain."}, status=404)
+    return JsonResponse({'tender_id': pk, 'local_chain_root_hash': local_chain_root_hash, 'proof': proof})
 
 def blockchain_view(request):
     """
-    Отображает страницу визуализатора блокчейна. 
+    Отображает страницу визуализатора блокчейна.
+
+    The page carries the first page (VISUALIZER_MAX_BLOCKS newest blocks) of
+    the global chain and of the local chains of the VISUALIZER_MAX_TENDERS
+    newest tenders; older blocks are fetched from global_chain_blocks and
+    tender_chain_blocks as the user scrolls. The number of queries is fixed:
+    the tenders with annotated bid counts, their first pages in one windowed
+    query, and the total count.
     """
-    # Глобальная цепочка (все тендеры)
-    global_chain_data = get_global_chain_data()
-    
-    # Get tenders that should have meaningful local chains
+    # Глобальная цепочка (все тендеры) - только первая страница
+    global_chain = get_global_chain_data()
+    global_chain_page_json = _global_chain_page_json(
+        global_chain, max(0, len(global_chain) - VISUALIZER_MAX_BLOCKS), len(global_chain)
+    )
+
     meaningful_tenders = Tender.objects.filter(
-        status__in=['active', 'closed', 'awarded']
-    ).exclude(blockchain_data='[]').order_by('-created_at')
-    
+        status__in=['active', 'closed', 'awarded'],
+        local_chain_length__gt=0
+    )
+    tenders = list(
+        meaningful_tenders.select_related('creator')
+        .annotate(bid_count=Count('bids'))
+        .order_by('-created_at')[:VISUALIZER_MAX_TENDERS]
+    )
+
+    # Первые страницы всех цепочек одним запросом
+    latest_blocks = TenderChainBlock.objects.filter(
+        tender_id__in=[tender.pk for tender in tenders]
+    ).annotate(
+        rank=Window(RowNumber(), partition_by=F('tender_id'), order_by=F('index').desc())
+    ).filter(rank__lte=VISUALIZER_MAX_BLOCKS).values('tender_id', *TenderChainBlock.RECORD_FIELDS)
+
+    blocks_by_tender = {}
+    for block in sorted(latest_blocks, key=lambda block: -block['index']):
+        blocks_by_tender.setdefault(block.pop('tender_id'), []).append(_local_block_dict(block))
+
     local_chains = []
-    for tender in meaningful_tenders:
-        # Debug the blockchain data
-        debug_blockchain_data(tender)
-        
-        local_blockchain_instance = tender.get_blockchain_instance()
-        
-        # Filter only meaningful blocks (remove system messages)
-        meaningful_blocks = []
-        for block in local_blockchain_instance.chain:
-            data = block.data
-            # Skip genesis blocks and system initialization messages
-            if (isinstance(data, dict) and 
-                data.get('action') in ['Bid Submitted', 'Tender Awarded', 'Tender Created']):
-                meaningful_blocks.append(block)
-            elif isinstance(data, str) and 'Genesis' not in data and 'initialized' not in data:
-                meaningful_blocks.append(block)
-        
-        if meaningful_blocks:
-            local_chains.append({
-                'tender': tender,
-                'chain_data': meaningful_blocks,
-                'title': f"Tender #{tender.pk} - {tender.title}",
-                'bid_count': tender.bids.count(),
-                'status': tender.status
-            })
-    
+    for tender in tenders:
+        blocks = blocks_by_tender.get(tender.pk, [])
+        local_chains.append({
+            'tender': tender,
+            'page': _block_page(blocks, tender.local_chain_length, blocks[-1]['index'] if blocks else 0),
+            'blocks_url': reverse('tender_chain_blocks', args=[tender.pk]),
+            'title': f"Tender #{tender.pk} - {tender.title}",
+            'bid_count': tender.bid_count,
+            'status': tender.status
+        })
+
     context = {
-        'global_chain_json': json.dumps(global_chain_data, cls=BlockChainJSONEncoder, indent=4),
-        'local_chains_json': json.dumps(local_chains, cls=BlockChainJSONEncoder, indent=4),
+        'global_chain_json': global_chain_page_json.decode(),
+        'local_chains_json': json.dumps(local_chains, cls=BlockChainJSONEncoder),
         'global_chain_title': "Global Tender Registry (Chain 2) - All Tenders",
-        'local_chains_count': len(local_chains)
+        'global_chain_length': len(global_chain),
+        'local_chains_count': len(local_chains),
+        'local_chains_total': meaningful_tenders.count(),
+        'max_blocks': VISUALIZER_MAX_BLOCKS,
     }
-    
+
     return render(request, 'tenders/blockchain_visualizer.html', context)
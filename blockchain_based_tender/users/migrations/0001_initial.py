@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bidder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('company_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='Company name')),
+                ('contact_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('bidder_role', models.CharField(default='bidder', max_length=50)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('address', models.TextField(blank=True, null=True, verbose_name='Company Address')),
+                ('tax_id', models.CharField(blank=True, max_length=50, null=True, verbose_name='Tax ID')),
+                ('website', models.URLField(blank=True, null=True)),
+                ('avatar', models.ImageField(blank=True, null=True, upload_to='avatars/')),
+                ('bio', models.TextField(blank=True, null=True, verbose_name='Company Description')),
+                ('digital_signature', models.FileField(blank=True, null=True, upload_to='signatures/', validators=[django.core.validators.FileExtensionValidator(['p12', 'pfx'])])),
+                ('signature_certificate', models.TextField(blank=True, null=True)),
+                ('otp_secret', models.CharField(blank=True, help_text='Base32 secret for TOTP', max_length=64, null=True)),
+                ('mfa_enabled', models.BooleanField(default=False, help_text='Whether user has MFA enabled')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='bidder_set', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='bidder_permission_set', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+    ]
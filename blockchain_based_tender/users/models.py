@@ -53,9 +53,10 @@ class Bidder(AbstractUser):
     
     def get_won_tenders(self):
         """Get all tenders won by this user"""
-        from tenders.models import Tender
+        from tenders.models import Bid, Tender
+        # Start from this user's bids, then match tenders on (awarded_bid, status)
         return Tender.objects.filter(
-            awarded_bid__bidder=self,
+            awarded_bid__in=Bid.objects.filter(bidder=self).values('pk'),
             status='awarded'
         )
     